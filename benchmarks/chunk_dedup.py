@@ -0,0 +1,99 @@
+"""
+Benchmark the deduplicating chunk store over repeated pipeline runs.
+
+Every simulated run stores the Arrow file of a byte-identical `raw_data` and
+of a `cleaned_data` in which a small fraction of the prices changed, the way
+`DedupArrowDataFrameMaterializer` does. The chunk store lives in a temporary
+directory of the active artifact store.
+
+Usage:
+    python -m benchmarks.chunk_dedup
+    python -m benchmarks.chunk_dedup --rows 1000000 --runs 10
+"""
+
+import os
+import tempfile
+
+import click
+import numpy as np
+from zenml.client import Client
+
+from materializers.arrow_materializer import dataframe_to_ipc
+from materializers.chunk_store import ChunkStore
+from utils.utils import mock_data
+
+
+def _dir_size(path: str) -> int:
+    """Total size of the files below a directory."""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+@click.command()
+@click.option(
+    "--rows",
+    type=int,
+    default=100_000,
+    show_default=True,
+    help="Dataset size.",
+)
+@click.option(
+    "--runs",
+    type=int,
+    default=5,
+    show_default=True,
+    help="Number of simulated pipeline runs.",
+)
+@click.option(
+    "--changed",
+    type=float,
+    default=0.001,
+    show_default=True,
+    help="Fraction of prices that change in `cleaned_data` between runs.",
+)
+def main(rows: int, runs: int, changed: float):
+    """Print dedup ratio and write throughput per run and artifact."""
+    np.random.seed(42)
+    raw_data = mock_data(rows)
+    rng = np.random.default_rng(0)
+
+    artifact_store = Client().active_stack.artifact_store
+    logical_bytes = 0
+
+    click.echo(
+        f"{'run':>3} {'artifact':<12} {'MB':>7} {'new MB':>7} "
+        f"{'dedup':>6} {'MB/s':>6}"
+    )
+    with tempfile.TemporaryDirectory(dir=artifact_store.path) as tmp_dir:
+        store = ChunkStore(artifact_store, root=tmp_dir)
+        for run in range(runs):
+            cleaned_data = raw_data.copy()
+            rows_changed = rng.random(rows) < changed
+            cleaned_data.loc[rows_changed, "price"] *= 1.01
+
+            for name, df in (
+                ("raw_data", raw_data),
+                ("cleaned_data", cleaned_data),
+            ):
+                _, stats = store.put(dataframe_to_ipc(df))
+                logical_bytes += stats.total_bytes
+                click.echo(
+                    f"{run:>3} {name:<12} {stats.total_bytes / 1e6:>7.2f} "
+                    f"{stats.new_bytes / 1e6:>7.2f} "
+                    f"{stats.dedup_ratio:>6.1%} {stats.throughput_mb_s:>6.1f}"
+                )
+
+        stored_bytes = _dir_size(tmp_dir)
+
+    click.echo(
+        f"Stored {stored_bytes / 1e6:.2f} MB of chunks for "
+        f"{logical_bytes / 1e6:.2f} MB of artifacts "
+        f"({1 - stored_bytes / logical_bytes:.1%} deduplicated)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark the cold start of the command line entry points.
+
+Every entry point runs with `--help` in a fresh interpreter with
+`python -X importtime`, the way a user or a CI job invokes it. The reported
+time is the best wall time over the repetitions, together with the slowest
+top-level imports of that run.
+
+`promote.py --help` should start in under a second. The command exits with
+a non-zero status if an entry point exceeds its budget.
+
+Usage:
+    python -m benchmarks.cli_startup
+    python -m benchmarks.cli_startup --repeat 5 --top 10
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import click
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Cold start budget in seconds, entry points without one are only reported
+ENTRY_POINTS: Dict[str, Optional[float]] = {
+    "promote.py": 1.0,
+    "run.py": None,
+    "build.py": None,
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, float]]:
+    """
+    Parse the output of `-X importtime` into top-level imports.
+
+    Args:
+        stderr: The standard error of the process.
+
+    Returns:
+        The top-level modules and their cumulative import time in seconds.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Nested imports are indented below the module importing them
+        if not name[1:].startswith(" "):
+            imports.append((name.strip(), int(cumulative) / 1e6))
+    return imports
+
+
+def measure(script: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Run `<script> --help` in a fresh interpreter.
+
+    Args:
+        script: The entry point, relative to the project root.
+
+    Returns:
+        The wall time in seconds and the top-level imports.
+
+    Raises:
+        RuntimeError: If the entry point fails.
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", script, "--help"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    wall_s = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"`{script} --help` failed:\n{result.stderr}")
+    return wall_s, parse_importtime(result.stderr)
+
+
+@click.command()
+@click.option(
+    "--repeat",
+    type=int,
+    default=3,
+    show_default=True,
+    help="Runs per entry point, the fastest one is reported.",
+)
+@click.option(
+    "--top",
+    type=int,
+    default=5,
+    show_default=True,
+    help="Number of slowest top-level imports to list.",
+)
+def main(repeat: int, top: int):
+    """Print the cold start time and slowest imports per entry point."""
+    over_budget = []
+    for script, budget in ENTRY_POINTS.items():
+        wall_s, imports = min(
+            (measure(script) for _ in range(repeat)), key=lambda run: run[0]
+        )
+        imports_s = sum(seconds for _, seconds in imports)
+        status = ""
+        if budget is not None:
+            within = wall_s <= budget
+            status = f" (budget {budget:.1f}s: {'ok' if within else 'over'})"
+            if not within:
+                over_budget.append(script)
+
+        click.echo(
+            f"{script:<11} {wall_s:>6.3f}s wall, {imports_s:>6.3f}s imports"
+            f"{status}"
+        )
+        for name, seconds in sorted(imports, key=lambda i: -i[1])[:top]:
+            click.echo(f"    {seconds:>6.3f}s  {name}")
+
+    if over_budget:
+        raise click.ClickException(
+            f"Cold start over budget: {', '.join(over_budget)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark loading DataFrame artifacts: default pandas vs. Arrow IPC.
+
+Every load runs in a fresh process, so the RSS increase it reports is not
+polluted by earlier loads. The loaded columns are summed afterwards, which
+pages in memory-mapped data the way a consuming step would.
+
+The `train` and `report` cases load the columns declared by `train_model`
+and `generate_data_analysis_report`. With the default materializer these
+steps load the full file and then select columns; the Arrow materializer
+only materializes the declared columns.
+
+Usage:
+    python -m benchmarks.dataframe_loading
+    python -m benchmarks.dataframe_loading --rows 1000000
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import click
+import numpy as np
+import pandas as pd
+import psutil
+import pyarrow.parquet  # noqa: F401, imported upfront to not time it
+from zenml.client import Client
+from zenml.integrations.pandas.materializers.pandas_materializer import (
+    PandasMaterializer,
+)
+
+from materializers.arrow_materializer import (
+    INPUT_COLUMNS_KEY,
+    ArrowDataFrameMaterializer,
+)
+from steps.generate_data_analysis_report import generate_data_analysis_report
+from steps.train_model import train_model
+from utils.utils import mock_data
+
+MATERIALIZERS = {
+    "pandas": PandasMaterializer,
+    "arrow": ArrowDataFrameMaterializer,
+}
+
+
+def _rss_mb() -> float:
+    """Resident set size of this process in MB."""
+    return psutil.Process().memory_info().rss / 1e6
+
+
+def _load(kind: str, uri: str, columns: Optional[List[str]]):
+    """Load an artifact in the current (fresh) process and measure it."""
+    materializer = MATERIALIZERS[kind](uri)
+    materializer.artifact_store.exists(uri)
+    baseline = _rss_mb()
+
+    start = time.perf_counter()
+    if kind == "arrow":
+        df = materializer.load_columns(columns)
+    else:
+        df = materializer.load(pd.DataFrame)
+        if columns is not None:
+            df = df[columns]
+    load_s = time.perf_counter() - start
+
+    df.select_dtypes(include=[np.number]).sum()
+    return load_s, _rss_mb() - baseline
+
+
+def _measure(kind: str, uri: str, columns: Optional[List[str]]):
+    """Run `_load` in a new process."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_load, kind, uri, columns).result()
+
+
+def _declared_columns(step, input_name: str) -> List[str]:
+    """Columns a step declares for one of its inputs."""
+    return step.configuration.extra[INPUT_COLUMNS_KEY][input_name]
+
+
+def _dir_size(path: str) -> int:
+    """Total size of the files in a directory."""
+    return sum(
+        os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+    )
+
+
+@click.command()
+@click.option(
+    "--rows",
+    type=int,
+    multiple=True,
+    default=[100_000, 1_000_000],
+    show_default=True,
+    help="Dataset sizes to benchmark.",
+)
+def main(rows):
+    """Print write/load time, file size and RSS per materializer."""
+    cases = {
+        "all": None,
+        "train": _declared_columns(train_model, "data"),
+        "report": _declared_columns(
+            generate_data_analysis_report, "cleaned_data"
+        ),
+    }
+    # Materializers can only write inside the artifact store
+    artifact_store = Client().active_stack.artifact_store
+
+    click.echo(
+        f"{'rows':>9} {'format':<7} {'case':<7} {'file MB':>8} "
+        f"{'write s':>8} {'load s':>7} {'RSS MB':>7}"
+    )
+    for n_rows in rows:
+        np.random.seed(42)
+        data = mock_data(n_rows)
+
+        with tempfile.TemporaryDirectory(dir=artifact_store.path) as tmp_dir:
+            for kind, materializer_class in MATERIALIZERS.items():
+                uri = os.path.join(tmp_dir, kind)
+                os.makedirs(uri)
+                materializer = materializer_class(uri)
+
+                start = time.perf_counter()
+                materializer.save(data)
+                write_s = time.perf_counter() - start
+                size_mb = _dir_size(uri) / 1e6
+
+                for case, columns in cases.items():
+                    load_s, rss_mb = _measure(kind, uri, columns)
+                    click.echo(
+                        f"{n_rows:>9} {kind:<7} {case:<7} {size_mb:>8.1f} "
+                        f"{write_s:>8.3f} {load_s:>7.3f} {rss_mb:>7.1f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark the size and build time of the HTML reports.
+
+Compares the plain-text encoding of numeric series against base64 typed
+arrays, and reports what the gzip-compressed artifact would store.
+
+Usage:
+    python -m benchmarks.report_payloads
+    python -m benchmarks.report_payloads --rows 1000 --rows 1000000
+"""
+
+import time
+import warnings
+
+import click
+import numpy as np
+
+from materializers.compressed_html_materializer import compress_html
+from utils.evaluation import segment_metrics
+from utils.utils import (
+    downsample_predictions,
+    generate_data_report,
+    generate_model_report,
+    mock_data,
+)
+
+
+def _model_inputs(data):
+    """Build a model summary and noisy predictions for the model report."""
+    actual = data["price"].to_numpy()
+    predicted = actual * np.random.uniform(0.9, 1.1, len(actual))
+    model = {
+        "metrics": {"r2_score": 0.9, "mse": 100.0, "rmse": 10.0, "mae": 8.0},
+        "feature_importance": {"competitors_price": 0.9, "category": 0.1},
+        "segment_metrics": {
+            "category": segment_metrics(actual, predicted, data["category"])
+        },
+        "learning_curve": {
+            "train_fraction": [0.1, 0.25, 0.5, 0.75, 1.0],
+            "train_rows": [800, 2000, 4000, 6000, 8000],
+            "train_loss": [50.0, 40.0, 30.0, 20.0, 10.0],
+            "val_loss": [55.0, 45.0, 35.0, 25.0, 15.0],
+        },
+        "prediction_range": float(max(actual.max(), predicted.max())),
+        "model_params": {"epochs": 10},
+    }
+    predictions = downsample_predictions(actual, predicted, data["category"])
+    return model, predictions
+
+
+def _measure(build):
+    """Run a report builder and return its output size and duration."""
+    start = time.perf_counter()
+    html = build()
+    duration = time.perf_counter() - start
+    return len(html.encode("utf-8")), duration, html
+
+
+@click.command()
+@click.option(
+    "--rows",
+    type=int,
+    multiple=True,
+    default=[1_000, 10_000, 100_000, 1_000_000],
+    show_default=True,
+    help="Dataset sizes to benchmark.",
+)
+def main(rows):
+    """Print report size and build time for text vs. binary payloads."""
+    warnings.filterwarnings("ignore")
+    click.echo(
+        f"{'report':<8} {'rows':>9} {'text B':>9} {'binary B':>9} "
+        f"{'gzip B':>8} {'text s':>7} {'binary s':>8}"
+    )
+    for n_rows in rows:
+        np.random.seed(42)
+        data = mock_data(n_rows)
+        model, predictions = _model_inputs(data)
+
+        builders = {
+            "data": lambda binary: generate_data_report(
+                cleaned_data=data,
+                raw_data=data,
+                analysis={},
+                binary_arrays=binary,
+            ),
+            "model": lambda binary: generate_model_report(
+                model=model, predictions=predictions, binary_arrays=binary
+            ),
+        }
+        for name, build in builders.items():
+            text_bytes, text_time, _ = _measure(lambda: build(False))
+            binary_bytes, binary_time, html = _measure(lambda: build(True))
+            gzip_bytes = len(compress_html(html).encode("utf-8"))
+            click.echo(
+                f"{name:<8} {n_rows:>9} {text_bytes:>9} {binary_bytes:>9} "
+                f"{gzip_bytes:>8} {text_time:>7.3f} {binary_time:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
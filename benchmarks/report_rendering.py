@@ -0,0 +1,139 @@
+"""
+Benchmark report build time and browser first paint per asset mode.
+
+Build times are always measured. First paint and time-to-all-charts are
+measured in headless Chromium when `playwright` is installed (`pip install
+playwright && playwright install chromium`), and skipped otherwise.
+
+Usage:
+    python -m benchmarks.report_rendering
+    python -m benchmarks.report_rendering --rows 100000 --mode inline
+"""
+
+import os
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import click
+import numpy as np
+
+from benchmarks.report_payloads import _model_inputs
+from utils.report_assets import (
+    ASSET_MODES,
+    ASSETS_BASE_URL_ENV,
+    ASSETS_MODE_ENV,
+    get_assets_dir,
+    vendor_plotly,
+)
+from utils.utils import generate_data_report, generate_model_report, mock_data
+
+PAINT_SCRIPT = """() => {
+    const paint = performance.getEntriesByName('first-contentful-paint')[0];
+    return paint ? paint.startTime : null;
+}"""
+
+
+def _paint_times(page, path: Path, n_charts: int):
+    """Load a report and return first-contentful-paint and all-charts times."""
+    start = time.perf_counter()
+    page.goto(path.as_uri(), wait_until="load")
+    page.wait_for_function(
+        f"document.querySelectorAll('.js-plotly-plot').length >= {n_charts}",
+        timeout=60_000,
+    )
+    charts_ms = (time.perf_counter() - start) * 1000
+    return page.evaluate(PAINT_SCRIPT), charts_ms
+
+
+@click.command()
+@click.option(
+    "--rows",
+    type=int,
+    default=100_000,
+    show_default=True,
+    help="Dataset size used for the reports.",
+)
+@click.option(
+    "--mode",
+    "modes",
+    type=click.Choice(ASSET_MODES),
+    multiple=True,
+    default=ASSET_MODES,
+    help="Asset modes to benchmark (default: all).",
+)
+def main(rows: int, modes):
+    """Print build time, size and paint times of both reports per mode."""
+    warnings.filterwarnings("ignore")
+    np.random.seed(42)
+    data = mock_data(rows)
+    model, predictions = _model_inputs(data)
+
+    start = time.perf_counter()
+    vendor_plotly()
+    click.echo(f"Vendoring plotly.js: {time.perf_counter() - start:.3f}s")
+
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        sync_playwright = None
+        click.echo("playwright is not installed, skipping paint timings.")
+
+    builders = {
+        "data": (
+            lambda: generate_data_report(
+                cleaned_data=data, raw_data=data, analysis={}
+            ),
+            5,
+        ),
+        "model": (
+            lambda: generate_model_report(model=model, predictions=predictions),
+            5,
+        ),
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode in modes:
+            os.environ[ASSETS_MODE_ENV] = mode
+            os.environ.setdefault(
+                ASSETS_BASE_URL_ENV, get_assets_dir().as_uri()
+            )
+            for name, (build, n_charts) in builders.items():
+                start = time.perf_counter()
+                html = build()
+                build_s = time.perf_counter() - start
+                path = Path(tmp_dir) / f"{name}_{mode}.html"
+                path.write_text(html, encoding="utf-8")
+                results.append([name, mode, len(html), build_s, path, n_charts])
+
+        if sync_playwright is not None:
+            with sync_playwright() as playwright:
+                browser = playwright.chromium.launch()
+                for result in results:
+                    page = browser.new_page()
+                    try:
+                        result.extend(_paint_times(page, *result[4:]))
+                    except Exception as e:
+                        click.echo(f"{result[0]}/{result[1]}: {e}")
+                    finally:
+                        page.close()
+                browser.close()
+
+    click.echo(
+        f"{'report':<6} {'mode':<7} {'bytes':>9} {'build s':>8} "
+        f"{'FCP ms':>8} {'charts ms':>10}"
+    )
+    for name, mode, size, build_s, _, _, *paint in results:
+        fcp, charts = paint if len(paint) == 2 else (None, None)
+        fcp = f"{fcp:.0f}" if fcp is not None else "n/a"
+        charts = f"{charts:.0f}" if charts is not None else "n/a"
+        click.echo(
+            f"{name:<6} {mode:<7} {size:>9} {build_s:>8.3f} "
+            f"{fcp:>8} {charts:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
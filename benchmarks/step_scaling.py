@@ -0,0 +1,362 @@
+"""
+Benchmark how every step scales with the number of rows.
+
+The plain step functions (without the ZenML step and the metadata and
+instrumentation wrappers) are called directly, so no server or stack is
+involved. Every dataset size runs in a fresh process, which chains the steps
+the way the pipeline does: `load_data` generates the data, `clean_data`
+cleans it, and so on. Each step is measured with
+`utils.instrumentation.Instrumentation`: wall and CPU time, the peak RSS
+increase while it runs (`memory_mb`) and the timings of its phases.
+
+The results are compared against a JSON baseline. A step regresses when its
+wall time or memory grows by more than the tolerance and by more than a
+noise floor (`NOISE_FLOORS`), in which case the command exits with a
+non-zero status. The `scaling` column is the log-log slope of the wall time
+against the previous size (1.0 is linear).
+
+The baseline is machine-specific, record it again with `--save-baseline`
+on the machine that runs the comparison. Sizes and steps that are not
+benchmarked keep their baseline entries.
+
+Usage:
+    python -m benchmarks.step_scaling
+    python -m benchmarks.step_scaling --rows 1000 --rows 10000 \\
+        --step train_model
+    python -m benchmarks.step_scaling --save-baseline
+"""
+
+import datetime
+import gc
+import inspect
+import json
+import math
+import multiprocessing
+import os
+import platform
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import click
+import numpy as np
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "step_scaling.json"
+SCHEMA_VERSION = 1
+
+STEPS = (
+    "load_data",
+    "clean_data",
+    "validate_data",
+    "analyze_data",
+    "train_model",
+    "generate_data_analysis_report",
+    "generate_model_report",
+)
+
+# Regressions smaller than these are measurement noise
+NOISE_FLOORS = {"wall_seconds": 0.05, "memory_mb": 10.0}
+
+
+def _step_functions() -> Dict[str, Callable[..., Any]]:
+    """The plain functions of the steps, imported in the worker process."""
+    from steps.analyze_data import analyze_data
+    from steps.clean_data import clean_data
+    from steps.generate_data_analysis_report import (
+        generate_data_analysis_report,
+    )
+    from steps.load_data import load_data
+    from steps.train_model import train_model
+    from steps.validate_data import validate_data
+
+    return {
+        step.name: inspect.unwrap(step.entrypoint)
+        for step in (
+            load_data,
+            clean_data,
+            validate_data,
+            analyze_data,
+            train_model,
+            generate_data_analysis_report,
+        )
+    }
+
+
+def _model_report(cleaned_data, epochs: int) -> Tuple[Any, ...]:
+    """The model report builder and its inputs, like `train_model` calls it."""
+    from benchmarks.report_payloads import _model_inputs
+    from utils.utils import generate_model_report
+
+    np.random.seed(42)
+    model, predictions = _model_inputs(cleaned_data)
+    model["model_params"]["epochs"] = epochs
+    return generate_model_report, model, predictions
+
+
+def _measure(func: Callable[..., Any], args: Tuple, repeat: int):
+    """Call a function repeatedly, return its output and best measurement."""
+    from utils.instrumentation import Instrumentation
+
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        instrumentation = Instrumentation(trace_allocations=False)
+        with instrumentation.measure():
+            output = func(*args)
+        result = instrumentation.result
+        result["memory_mb"] = round(
+            result["peak_rss_mb"] - result["rss_start_mb"], 1
+        )
+        if best is None or result["wall_seconds"] < best["wall_seconds"]:
+            best = result
+    return output, best
+
+
+def run_size(
+    rows: int, steps: List[str], epochs: int, repeat: int
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the steps on one dataset size, in the order of the pipeline.
+
+    Steps that are not selected but produce inputs of selected ones are run
+    once without being recorded.
+
+    Args:
+        rows: Number of rows.
+        steps: Names of the steps to measure.
+        epochs: The `epochs` parameter of `train_model`.
+        repeat: Number of runs per step, the fastest one is kept.
+
+    Returns:
+        The measurements per step.
+    """
+    warnings.filterwarnings("ignore")
+    functions = _step_functions()
+    results = {}
+
+    def run(name: str, func: Callable[..., Any], *args: Any) -> Any:
+        output, result = _measure(func, args, repeat if name in steps else 1)
+        if name in steps:
+            results[name] = {
+                key: result[key]
+                for key in (
+                    "wall_seconds",
+                    "cpu_seconds",
+                    "memory_mb",
+                    "phases",
+                )
+            }
+        return output
+
+    selected = set(steps)
+    raw_data, _ = run("load_data", functions["load_data"], rows)
+    if selected - {"load_data", "analyze_data"}:
+        cleaned_data = run("clean_data", functions["clean_data"], raw_data)
+    if "validate_data" in selected:
+        run("validate_data", functions["validate_data"], cleaned_data)
+    if selected & {"analyze_data", "generate_data_analysis_report"}:
+        analysis = run("analyze_data", functions["analyze_data"], raw_data)
+    if "train_model" in selected:
+        run("train_model", functions["train_model"], cleaned_data, epochs)
+    if "generate_data_analysis_report" in selected:
+        run(
+            "generate_data_analysis_report",
+            functions["generate_data_analysis_report"],
+            raw_data,
+            cleaned_data,
+            analysis,
+        )
+    if "generate_model_report" in selected:
+        run("generate_model_report", *_model_report(cleaned_data, epochs))
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    """
+    Compare results against a baseline.
+
+    Args:
+        results: Measurements per step and number of rows.
+        baseline: Baseline measurements in the same format.
+        tolerance: Allowed relative increase, e.g. 0.25 for 25%.
+
+    Returns:
+        A description of every regression.
+    """
+    regressions = []
+    for step, sizes in results.items():
+        for rows, result in sizes.items():
+            reference = baseline.get(step, {}).get(rows)
+            if reference is None:
+                continue
+            for metric, floor in NOISE_FLOORS.items():
+                current, previous = result[metric], reference[metric]
+                if (
+                    current > previous * (1 + tolerance)
+                    and current - previous > floor
+                ):
+                    change = current / max(previous, 1e-9) - 1
+                    regressions.append(
+                        f"{step} at {rows} rows: {metric} {previous:g} -> "
+                        f"{current:g} ({change:+.0%})"
+                    )
+    return regressions
+
+
+def _environment() -> Dict[str, Any]:
+    """Description of the machine and library versions."""
+    import pandas
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def _load_baseline(path: Path) -> Dict[str, Any]:
+    """Load a baseline file, empty if it does not exist."""
+    if not path.exists():
+        return {"schema_version": SCHEMA_VERSION, "results": {}}
+    return json.loads(path.read_text())
+
+
+@click.command()
+@click.option(
+    "--rows",
+    type=int,
+    multiple=True,
+    default=[1_000, 10_000, 100_000, 1_000_000],
+    show_default=True,
+    help="Dataset sizes to benchmark.",
+)
+@click.option(
+    "--step",
+    "steps",
+    type=click.Choice(STEPS),
+    multiple=True,
+    default=STEPS,
+    help="Steps to benchmark (default: all).",
+)
+@click.option(
+    "--epochs",
+    type=int,
+    default=5,
+    show_default=True,
+    help="The `epochs` parameter of `train_model`.",
+)
+@click.option(
+    "--repeat",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Runs per step and size, the fastest one is kept.",
+)
+@click.option(
+    "--baseline",
+    "baseline_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=BASELINE_PATH,
+    show_default=True,
+    help="JSON baseline to compare against.",
+)
+@click.option(
+    "--tolerance",
+    type=float,
+    default=0.25,
+    show_default=True,
+    help="Allowed relative increase of wall time and memory.",
+)
+@click.option(
+    "--save-baseline",
+    is_flag=True,
+    help="Store the results in the baseline instead of comparing.",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Also write the results to this JSON file.",
+)
+def main(
+    rows, steps, epochs, repeat, baseline_path, tolerance, save_baseline, output
+):
+    """Print time and memory per step and size, and check for regressions."""
+    baseline = _load_baseline(baseline_path)
+    results: Dict[str, Dict[str, Any]] = {step: {} for step in steps}
+
+    click.echo(
+        f"{'rows':>9} {'step':<30} {'wall s':>8} {'cpu s':>8} "
+        f"{'mem MB':>7} {'scaling':>7} {'baseline s':>10}"
+    )
+    context = multiprocessing.get_context("spawn")
+    previous: Dict[str, Tuple[int, float]] = {}
+    for n_rows in sorted(rows):
+        # A fresh process per size, so earlier sizes do not inflate the RSS
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            size_results = pool.submit(
+                run_size, n_rows, list(steps), epochs, repeat
+            ).result()
+
+        for step in (name for name in STEPS if name in size_results):
+            result = size_results[step]
+            results[step][str(n_rows)] = result
+            scaling = "n/a"
+            if step in previous and previous[step][1] > 0:
+                previous_rows, previous_seconds = previous[step]
+                ratio = result["wall_seconds"] / previous_seconds
+                if ratio > 0:
+                    slope = math.log(ratio) / math.log(n_rows / previous_rows)
+                    scaling = f"{slope:.2f}"
+            previous[step] = n_rows, result["wall_seconds"]
+            reference = baseline["results"].get(step, {}).get(str(n_rows))
+            click.echo(
+                f"{n_rows:>9} {step:<30} {result['wall_seconds']:>8.3f} "
+                f"{result['cpu_seconds']:>8.3f} {result['memory_mb']:>7.1f} "
+                f"{scaling:>7} "
+                f"{reference['wall_seconds'] if reference else 'n/a':>10}"
+            )
+
+    report = {
+        "schema_version": SCHEMA_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "epochs": epochs,
+        "environment": _environment(),
+        "results": results,
+    }
+    if output is not None:
+        output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if save_baseline:
+        for step, sizes in baseline["results"].items():
+            for n_rows, result in sizes.items():
+                results.setdefault(step, {}).setdefault(n_rows, result)
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        click.echo(f"Saved the baseline to {baseline_path}.")
+        return
+
+    if baseline["results"] and baseline.get("epochs", epochs) != epochs:
+        raise click.ClickException(
+            f"The baseline was recorded with {baseline['epochs']} epochs."
+        )
+    regressions = find_regressions(results, baseline["results"], tolerance)
+    if regressions:
+        raise click.ClickException(
+            f"{len(regressions)} regressions over {tolerance:.0%}:\n"
+            + "\n".join(regressions)
+        )
+    if baseline["results"]:
+        click.echo(f"No regressions over {tolerance:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,265 @@
+import json
+import multiprocessing
 import os
-from typing import Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
 
 import click
-from zenml import add_tags
-from zenml.client import Client
+import yaml
 
-from pipeline.training_pipeline import price_prediction_pipeline
 from utils.project_config import get_snapshot_name, get_pipeline_tags, get_config
 
+# Environments with a snapshot, `smoke` is the scaled-down pull request check
+ENVIRONMENTS = ("staging", "production", "smoke")
+
+
+def docker_settings_key(environment: str, stack: str) -> str:
+    """
+    Identify the Docker image a target needs.
+
+    Targets on the same stack whose config files declare the same Docker
+    settings (for the pipeline and for every step) build the same image.
+
+    Args:
+        environment: The environment of the target.
+        stack: The stack of the target.
+
+    Returns:
+        A key that is equal for targets that can share a Docker build.
+    """
+    with open(f"configs/{environment}.yml") as f:
+        run_config = yaml.safe_load(f) or {}
+
+    docker_settings = {
+        "pipeline": (run_config.get("settings") or {}).get("docker"),
+        "steps": {
+            name: (step_config.get("settings") or {}).get("docker")
+            for name, step_config in (run_config.get("steps") or {}).items()
+        },
+    }
+    return json.dumps([stack, docker_settings], sort_keys=True, default=str)
+
+
+def _activate_stack(stack: str) -> None:
+    """Make `stack` the active stack of this process."""
+    from zenml.client import Client
+
+    remote_stack = Client().get_stack(stack)
+    os.environ["ZENML_ACTIVE_STACK_ID"] = str(remote_stack.id)
+
+
+def build_image(environment: str, stack: str) -> Tuple[Optional[str], float]:
+    """
+    Build (or reuse) the Docker images of the pipeline for a target.
+
+    Args:
+        environment: The environment of the target.
+        stack: The stack of the target.
+
+    Returns:
+        The ID of the pipeline build, None if the stack needs no images, and
+        the time the build took.
+    """
+    from pipeline.training_pipeline import get_price_prediction_pipeline
+
+    start = time.perf_counter()
+    _activate_stack(stack)
+    build = get_price_prediction_pipeline().build(
+        config_path=f"configs/{environment}.yml"
+    )
+    build_id = str(build.id) if build is not None else None
+    return build_id, time.perf_counter() - start
+
+
+def create_snapshot(
+    environment: str,
+    stack: str,
+    name: Optional[str] = None,
+    git_sha: Optional[str] = None,
+    run: bool = False,
+    build_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Create, tag and optionally run the pipeline snapshot of a target.
+
+    Args:
+        environment: The environment of the snapshot.
+        stack: The stack of the snapshot.
+        name: Name of the snapshot, generated from the config if None.
+        git_sha: Git SHA used in generated snapshot names.
+        run: Whether to trigger a run of the snapshot.
+        build_id: ID of an existing pipeline build to use, a build is reused
+            or created if None.
+
+    Returns:
+        The snapshot name and ID, the triggered run ID and the time it took.
+    """
+    # ZenML and the pipeline (with pandas, scikit-learn and all steps) are
+    # only imported once the CLI arguments are parsed (`--help` stays fast)
+    from zenml import add_tags
+    from zenml.client import Client
+
+    from pipeline.training_pipeline import get_price_prediction_pipeline
+
+    start = time.perf_counter()
+    client = Client()
+
+    # Set the active stack
+    _activate_stack(stack)
+
+    # Generate snapshot name from config if not provided
+    if name is None:
+        name = get_snapshot_name(environment=environment, git_sha=git_sha)
+        click.echo(f"Generated snapshot name: {name}")
+
+    # Create a pipeline snapshot
+    click.echo(f"Creating snapshot '{name}' for {environment} environment...")
+    snapshot = (
+        get_price_prediction_pipeline()
+        .with_options(
+            config_path=f"configs/{environment}.yml",
+            build=build_id,
+        )
+        .create_snapshot(
+            name=name,
+        )
+    )
+    click.echo(f"Snapshot created successfully: {snapshot.id}")
+
+    # Add tags to the snapshot (tags must be added after creation)
+    project_config = get_config()
+    snapshot_tags = get_pipeline_tags(environment)
+
+    # Add model tags as well
+    snapshot_tags.extend(project_config.model.tags)
+
+    # Remove duplicates while preserving order
+    snapshot_tags = list(dict.fromkeys(snapshot_tags))
+
+    if snapshot_tags:
+        click.echo(f"Adding tags to snapshot: {snapshot_tags}")
+        add_tags(tags=snapshot_tags, snapshot=snapshot.id)
+
+    run_id = None
+    if run:
+        click.echo("Triggering pipeline run...")
+        run_config = snapshot.config_template
+        run_response = client.trigger_pipeline(
+            snapshot_name_or_id=snapshot.id,
+            run_configuration=run_config,
+        )
+        run_id = str(run_response.id)
+        click.echo(f"Pipeline run triggered: {run_id}")
+
+    return {
+        "name": name,
+        "snapshot_id": str(snapshot.id),
+        "run_id": run_id,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def create_snapshots(
+    targets: List[Tuple[str, str]],
+    git_sha: Optional[str] = None,
+    run: bool = False,
+    max_workers: int = 4,
+) -> List[Dict[str, Any]]:
+    """
+    Create the snapshots of several environment/stack targets concurrently.
+
+    Targets with the same Docker settings share one pipeline build: the
+    image is built once per group, and the snapshots of the group are
+    created as soon as its build is done. Tasks run in worker processes, as
+    the active stack is process-wide.
+
+    An environment targeted on several stacks gets the stack name appended
+    to its snapshot names.
+
+    Args:
+        targets: The (environment, stack) pairs.
+        git_sha: Git SHA used in the snapshot names.
+        run: Whether to trigger a run of every snapshot.
+        max_workers: Number of builds and snapshots created concurrently.
+
+    Returns:
+        Per target: the snapshot name and IDs, the build it used, and its
+        build, snapshot and total time.
+    """
+    environments = [environment for environment, _ in targets]
+    groups: Dict[str, List[Tuple[str, str]]] = {}
+    for target in targets:
+        groups.setdefault(docker_settings_key(*target), []).append(target)
+
+    results = {}
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=context
+    ) as pool:
+        pending = {
+            pool.submit(build_image, *group[0]): ("build", key)
+            for key, group in groups.items()
+        }
+        builds = {}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, key = pending.pop(future)
+                if kind == "build":
+                    builds[key] = future.result()
+                    build_id, _ = builds[key]
+                    for environment, stack in groups[key]:
+                        name = None
+                        if environments.count(environment) > 1:
+                            name = get_snapshot_name(environment, git_sha)
+                            name = f"{name}_{stack}"
+                        snapshot_future = pool.submit(
+                            create_snapshot,
+                            environment,
+                            stack,
+                            name=name,
+                            git_sha=git_sha,
+                            run=run,
+                            build_id=build_id,
+                        )
+                        pending[snapshot_future] = (
+                            "snapshot",
+                            (key, environment, stack),
+                        )
+                else:
+                    build_key, environment, stack = key
+                    build_id, build_s = builds[build_key]
+                    results[(environment, stack)] = {
+                        "environment": environment,
+                        "stack": stack,
+                        "build_id": build_id,
+                        "shared_build": len(groups[build_key]) > 1,
+                        "build_seconds": build_s,
+                        "total_seconds": time.perf_counter() - start,
+                        **future.result(),
+                    }
+
+    return [results[target] for target in targets]
+
+
+def _parse_target(target: str) -> Tuple[str, str]:
+    """Split an `ENVIRONMENT:STACK` target."""
+    environment, separator, stack = target.partition(":")
+    if not separator or environment not in ENVIRONMENTS:
+        raise click.BadParameter(
+            f"`{target}` is not of the form `ENVIRONMENT:STACK` with an "
+            f"environment out of {', '.join(ENVIRONMENTS)}.",
+            param_hint="--target",
+        )
+    return environment, stack
+
 
 @click.command()
 @click.option(
     "--environment",
-    type=click.Choice(["staging", "production"]),
+    type=click.Choice(ENVIRONMENTS),
     default="staging",
     show_default=True,
     help="Environment to run the pipeline in.",
@@ -20,8 +267,23 @@ from utils.project_config import get_snapshot_name, get_pipeline_tags, get_confi
 @click.option(
     "--stack",
     type=str,
-    required=True,
-    help="Stack to run the pipeline in.",
+    default=None,
+    help="Stack to run the pipeline in. Required unless `--target` is used.",
+)
+@click.option(
+    "--target",
+    "targets",
+    type=str,
+    multiple=True,
+    help="`ENVIRONMENT:STACK` pair to build a snapshot for. Repeat to build "
+    "several snapshots concurrently; replaces `--environment` and `--stack`.",
+)
+@click.option(
+    "--max-workers",
+    type=int,
+    default=4,
+    show_default=True,
+    help="Number of builds and snapshots created concurrently with `--target`.",
 )
 @click.option(
     "--name",
@@ -43,7 +305,9 @@ from utils.project_config import get_snapshot_name, get_pipeline_tags, get_confi
 )
 def main(
     environment: str,
-    stack: str,
+    stack: Optional[str] = None,
+    targets: Tuple[str, ...] = (),
+    max_workers: int = 4,
     name: Optional[str] = None,
     git_sha: Optional[str] = None,
     run: bool = False,
@@ -56,49 +320,49 @@ def main(
     - Production: PROD_{prefix}_{git_sha}
 
     Optionally runs the pipeline if the `--run` flag is set.
-    """
-    client = Client()
 
-    # Set the active stack
-    remote_stack = client.get_stack(stack)
-    os.environ["ZENML_ACTIVE_STACK_ID"] = str(remote_stack.id)
+    With several `--target` options, the snapshots are created concurrently
+    and targets with identical Docker settings share one image build.
+    """
+    if not targets:
+        if stack is None:
+            raise click.UsageError(
+                "Either `--stack` or `--target` is required."
+            )
+        create_snapshot(environment, stack, name=name, git_sha=git_sha, run=run)
+        return
 
-    # Generate snapshot name from config if not provided
-    if name is None:
-        name = get_snapshot_name(environment=environment, git_sha=git_sha)
-        click.echo(f"Generated snapshot name: {name}")
+    if name is not None:
+        raise click.UsageError(
+            "`--name` cannot be used with `--target`, snapshot names are "
+            "generated per environment."
+        )
+    parsed_targets = list(dict.fromkeys(_parse_target(t) for t in targets))
 
-    # Create a pipeline snapshot
-    click.echo(f"Creating snapshot '{name}' for {environment} environment...")
-    snapshot = price_prediction_pipeline.with_options(
-        config_path=f"configs/{environment}.yml",
-    ).create_snapshot(
-        name=name,
+    start = time.perf_counter()
+    results = create_snapshots(
+        parsed_targets, git_sha=git_sha, run=run, max_workers=max_workers
     )
-    click.echo(f"Snapshot created successfully: {snapshot.id}")
+    total_s = time.perf_counter() - start
 
-    # Add tags to the snapshot (tags must be added after creation)
-    project_config = get_config()
-    snapshot_tags = get_pipeline_tags(environment)
-    
-    # Add model tags as well
-    snapshot_tags.extend(project_config.model.tags)
-    
-    # Remove duplicates while preserving order
-    snapshot_tags = list(dict.fromkeys(snapshot_tags))
-    
-    if snapshot_tags:
-        click.echo(f"Adding tags to snapshot: {snapshot_tags}")
-        add_tags(tags=snapshot_tags, snapshot=snapshot.id)
-
-    if run:
-        click.echo("Triggering pipeline run...")
-        run_config = snapshot.config_template
-        run_response = client.trigger_pipeline(
-            snapshot_name_or_id=snapshot.id,
-            run_configuration=run_config,
+    click.echo(
+        f"{'environment':<11} {'stack':<20} {'build':<8} {'build s':>8} "
+        f"{'snapshot s':>10} {'total s':>8}  snapshot"
+    )
+    for result in results:
+        build = (result["build_id"] or "none")[:8]
+        if result["shared_build"]:
+            build += "*"
+        click.echo(
+            f"{result['environment']:<11} {result['stack']:<20} {build:<8} "
+            f"{result['build_seconds']:>8.1f} {result['seconds']:>10.1f} "
+            f"{result['total_seconds']:>8.1f}  {result['name']}"
         )
-        click.echo(f"Pipeline run triggered: {run_response.id}")
+    n_builds = len({r["build_id"] for r in results if r["build_id"]})
+    click.echo(
+        f"Created {len(results)} snapshots with {n_builds} builds "
+        f"(* = shared) in {total_s:.1f}s."
+    )
 
 
 if __name__ == "__main__":
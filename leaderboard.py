@@ -0,0 +1,124 @@
+"""
+Leaderboards and comparisons from a local index of run metrics.
+
+Usage:
+    python leaderboard.py sync
+    python leaderboard.py top --metric metrics.rmse -k 5
+    python leaderboard.py compare 3 4 --metric metrics.r2_score
+    python leaderboard.py metrics
+"""
+
+import time
+from typing import List, Tuple
+
+import click
+
+from utils.metrics_index import DEFAULT_INDEX_PATH, MetricsIndex
+from utils.project_config import get_config
+
+# Metrics where higher is better, all others are sorted ascending
+HIGHER_IS_BETTER = ("r2_score",)
+
+
+@click.group()
+@click.option(
+    "--index",
+    "index_path",
+    type=click.Path(dir_okay=False),
+    default=DEFAULT_INDEX_PATH,
+    show_default=True,
+    help="Path of the SQLite index.",
+)
+@click.pass_context
+def cli(ctx: click.Context, index_path: str):
+    """Query run and model version metrics from a local index."""
+    ctx.obj = MetricsIndex(index_path)
+    ctx.call_on_close(ctx.obj.close)
+
+
+@cli.command()
+@click.pass_obj
+def sync(index: MetricsIndex):
+    """Index the runs created since the last sync."""
+    # ZenML is only imported for the commands that talk to the server
+    from zenml.client import Client
+
+    config = get_config()
+    result = index.sync(
+        Client(),
+        pipeline_name=config.pipeline.name,
+        model_name=config.model.name,
+        environments=list(type(config.environments).model_fields),
+    )
+    click.echo(
+        f"Indexed {result['runs']} runs and {result['model_versions']} model "
+        f"versions in {result['seconds']:.2f}s (watermark: "
+        f"{result['watermark']})."
+    )
+
+
+@cli.command()
+@click.option(
+    "--metric",
+    default="metrics.rmse",
+    show_default=True,
+    help="Flattened metric name, see the `metrics` command.",
+)
+@click.option(
+    "-k", type=int, default=5, show_default=True, help="Runs per environment."
+)
+@click.pass_obj
+def top(index: MetricsIndex, metric: str, k: int):
+    """Show the best runs by a metric per environment."""
+    start = time.perf_counter()
+    descending = metric.endswith(HIGHER_IS_BETTER)
+    rows = index.top_k(metric, k=k, descending=descending)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    click.echo(f"{'environment':<12} {'#':>2} {'version':>7} {metric:>14}  run")
+    for environment, rank, name, model_version, value in rows:
+        click.echo(
+            f"{environment or '-':<12} {rank:>2} {model_version or '-':>7} "
+            f"{value:>14.4f}  {name}"
+        )
+    click.echo(f"{len(rows)} rows in {elapsed_ms:.1f} ms.")
+
+
+@cli.command()
+@click.argument("versions", type=int, nargs=-1)
+@click.option(
+    "--metric",
+    "metrics",
+    multiple=True,
+    default=["metrics.rmse", "metrics.r2_score"],
+    show_default=True,
+    help="Flattened metric names to compare.",
+)
+@click.pass_obj
+def compare(index: MetricsIndex, versions: Tuple[int, ...], metrics: List[str]):
+    """Compare the metrics of model versions (all if none are given)."""
+    start = time.perf_counter()
+    rows = index.compare_model_versions(list(metrics), list(versions))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    header = " ".join(f"{metric:>16}" for metric in metrics)
+    click.echo(f"{'version':>7} {'stage':<11} {header}  run")
+    for number, stage, name, *values in rows:
+        cells = " ".join(
+            f"{value:>16.4f}" if value is not None else f"{'n/a':>16}"
+            for value in values
+        )
+        click.echo(f"{number:>7} {stage or '-':<11} {cells}  {name}")
+    click.echo(f"{len(rows)} rows in {elapsed_ms:.1f} ms.")
+
+
+@cli.command(name="metrics")
+@click.pass_obj
+def list_metrics(index: MetricsIndex):
+    """List the indexed metric names."""
+    for name in index.metric_names():
+        click.echo(name)
+
+
+if __name__ == "__main__":
+    cli()
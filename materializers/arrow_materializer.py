@@ -0,0 +1,357 @@
+"""
+Materializer that stores DataFrames as memory-mappable Arrow IPC files.
+
+DataFrames are written as a single uncompressed Arrow IPC (Feather v2) file.
+On a local artifact store the file is memory-mapped when loading, so numeric
+columns without missing values are handed to pandas without copying and only
+the pages that are actually read are paged in.
+
+Steps can declare which columns of a DataFrame input they need, and only
+those columns are materialized:
+
+    @step(extra={INPUT_COLUMNS_KEY: {"data": ["category", "price"]}})
+    def my_step(data: pd.DataFrame) -> ...:
+        ...
+
+DataFrames loaded zero-copy share memory with the mapped file and are
+read-only: copy them before modifying them in place.
+
+Steps that stream over more rows than they can hold in memory annotate the
+input as `DataFrameChunks` instead. Nothing is read until they iterate it,
+and then only one chunk of rows at a time:
+
+    def my_step(data: DataFrameChunks) -> ...:
+        for chunk in data.iter_chunks(chunk_rows=100_000):
+            ...  # a DataFrame, its index counts rows from the first chunk
+
+`DedupArrowDataFrameMaterializer` stores the same file in the deduplicating
+chunk store of `materializers/chunk_store.py` instead. It reassembles the file
+in memory when loading, so it is meant for remote artifact stores, where
+the file cannot be memory-mapped anyway.
+"""
+
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from zenml import get_step_context
+from zenml.integrations.pandas.materializers.pandas_materializer import (
+    PandasMaterializer,
+)
+from zenml.metadata.metadata_types import MetadataType
+
+from materializers.chunk_store import ChunkStore
+from utils.fingerprint import fingerprint
+
+ARROW_FILENAME = "df.arrow"
+
+# Key of the step `extra` config mapping input names to the columns they read
+INPUT_COLUMNS_KEY = "input_columns"
+
+# Rows per record batch of the stored files, and per chunk when iterating
+# `DataFrameChunks` directly. A chunked reader holds one batch at a time, so
+# the batches bound its memory on stores that are not memory-mapped.
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def declared_columns(uri: str) -> Optional[List[str]]:
+    """
+    Get the columns the running step declared for the artifact at `uri`.
+
+    Args:
+        uri: URI of the artifact being loaded.
+
+    Returns:
+        The declared columns, or None to load all columns.
+    """
+    try:
+        context = get_step_context()
+    except RuntimeError:
+        return None
+
+    declared = context.step_run.config.extra.get(INPUT_COLUMNS_KEY) or {}
+    for input_name, artifacts in context.inputs.items():
+        if input_name in declared and any(a.uri == uri for a in artifacts):
+            return list(declared[input_name])
+    return None
+
+
+def dataframe_to_ipc(df: pd.DataFrame) -> pa.Buffer:
+    """Serialize a DataFrame into an uncompressed Arrow IPC file in memory."""
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=DEFAULT_CHUNK_ROWS)
+    return sink.getvalue()
+
+
+class DataFrameChunks:
+    """A stored DataFrame, read lazily in chunks of rows."""
+
+    def __init__(
+        self,
+        open_source: Callable[[], pa.NativeFile],
+        columns: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Open the Arrow file and check the columns.
+
+        Args:
+            open_source: Opens the Arrow IPC file for reading.
+            columns: The columns to read, all columns if None.
+
+        Raises:
+            KeyError: If a requested column is not in the file.
+        """
+        self._open_source = open_source
+        with open_source() as source:
+            reader = pa.ipc.open_file(source)
+            schema = reader.schema
+            self._batch_rows = [
+                reader.get_batch(i).num_rows
+                for i in range(reader.num_record_batches)
+            ]
+        self.num_rows = sum(self._batch_rows)
+
+        if columns is not None:
+            missing = set(columns) - set(schema.names)
+            if missing:
+                raise KeyError(
+                    f"Declared input columns {sorted(missing)} are not in "
+                    f"the stored DataFrame."
+                )
+            self.columns = list(columns)
+        else:
+            # All columns but a stored pandas index
+            pandas_metadata = schema.pandas_metadata or {}
+            index_columns = {
+                name
+                for name in pandas_metadata.get("index_columns", [])
+                if isinstance(name, str)
+            }
+            self.columns = [
+                name for name in schema.names if name not in index_columns
+            ]
+
+    def iter_chunks(
+        self, chunk_rows: int, seed: Optional[int] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read the rows in chunks.
+
+        The chunks are slices of the record batches of the file. A batch is
+        held while its chunks are read, which costs no memory for a
+        memory-mapped file.
+
+        Args:
+            chunk_rows: Maximum number of rows per chunk.
+            seed: Seed of a random order of the batches and of the chunks
+                within every batch, the order of the rows if None.
+
+        Yields:
+            The chunks. Their index is the position of the rows in the whole
+            DataFrame, whatever the order.
+        """
+        rng = np.random.default_rng(seed) if seed is not None else None
+        offsets = np.cumsum([0] + self._batch_rows)
+        batch_indices = np.arange(len(self._batch_rows))
+        if rng is not None:
+            batch_indices = rng.permutation(batch_indices)
+
+        with self._open_source() as source:
+            reader = pa.ipc.open_file(source)
+            for batch_index in batch_indices:
+                batch = reader.get_batch(batch_index).select(self.columns)
+                starts = np.arange(0, batch.num_rows, chunk_rows)
+                if rng is not None:
+                    starts = rng.permutation(starts)
+                for start in starts:
+                    chunk = batch.slice(start, chunk_rows).to_pandas()
+                    first_row = offsets[batch_index] + start
+                    chunk.index = pd.RangeIndex(
+                        first_row, first_row + len(chunk)
+                    )
+                    yield chunk
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        """Read the rows in order, in chunks of `DEFAULT_CHUNK_ROWS`."""
+        return self.iter_chunks(DEFAULT_CHUNK_ROWS)
+
+
+class ArrowDataFrameMaterializer(PandasMaterializer):
+    """Stores DataFrames as Arrow IPC files with column projection."""
+
+    ASSOCIATED_TYPES = (pd.DataFrame, DataFrameChunks)
+    SKIP_REGISTRATION = True
+
+    def load(self, data_type: Type[Any]) -> Any:
+        """
+        Load the DataFrame, restricted to the columns the step declared.
+
+        Args:
+            data_type: The type of the data to load, `DataFrameChunks` to
+                read it lazily.
+
+        Returns:
+            The loaded DataFrame, or its chunks.
+        """
+        columns = declared_columns(self.uri)
+        if issubclass(data_type, DataFrameChunks):
+            return DataFrameChunks(self._open_source, columns)
+        return self.load_columns(columns)
+
+    def load_columns(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Load a subset of the columns of the DataFrame.
+
+        Args:
+            columns: The columns to load, all columns if None.
+
+        Returns:
+            The loaded DataFrame.
+
+        Raises:
+            KeyError: If a requested column is not in the artifact.
+        """
+        table = self._read_table()
+
+        if columns is not None:
+            missing = set(columns) - set(table.column_names)
+            if missing:
+                raise KeyError(
+                    f"Declared input columns {sorted(missing)} are not in "
+                    f"the artifact stored at `{self.uri}`."
+                )
+            # Keep the pandas index columns, if any were stored
+            pandas_metadata = table.schema.pandas_metadata or {}
+            index_columns = [
+                name
+                for name in pandas_metadata.get("index_columns", [])
+                if isinstance(name, str)
+            ]
+            table = table.select(list(columns) + index_columns)
+
+        # `split_blocks` keeps one block per column, which lets pandas wrap
+        # the Arrow buffers of a single-batch file instead of consolidating
+        # (copying) them
+        return table.to_pandas(split_blocks=True)
+
+    def save(self, df: pd.DataFrame) -> None:
+        """
+        Write the DataFrame as an uncompressed Arrow IPC file.
+
+        Args:
+            df: The DataFrame to save.
+        """
+        table = pa.Table.from_pandas(df)
+        with self.artifact_store.open(self._filepath, "wb") as f:
+            with pa.ipc.new_file(f, table.schema) as writer:
+                writer.write_table(table, max_chunksize=DEFAULT_CHUNK_ROWS)
+
+    def extract_metadata(self, df: pd.DataFrame) -> Dict[str, MetadataType]:
+        """
+        Extract the pandas metadata and the column names.
+
+        Args:
+            df: The DataFrame.
+
+        Returns:
+            The metadata of the DataFrame.
+        """
+        metadata = super().extract_metadata(df)
+        metadata["columns"] = [str(column) for column in df.columns]
+        return metadata
+
+    def compute_content_hash(self, df: pd.DataFrame) -> Optional[str]:
+        """
+        Fingerprint the DataFrame, e.g. for content-based step caching.
+
+        Args:
+            df: The DataFrame.
+
+        Returns:
+            The content hash of the DataFrame.
+        """
+        return fingerprint(df)
+
+    def _read_table(self) -> pa.Table:
+        """Memory-map the Arrow file if local, read it otherwise."""
+        if os.path.exists(self._filepath):
+            source = pa.memory_map(self._filepath, "r")
+            return pa.ipc.open_file(source).read_all()
+
+        with self.artifact_store.open(self._filepath, "rb") as f:
+            return pa.ipc.open_file(pa.BufferReader(f.read())).read_all()
+
+    def _open_source(self) -> pa.NativeFile:
+        """
+        Open the Arrow file for reading record batches one at a time.
+
+        A local file is memory-mapped: the pages of a batch are only read
+        when the batch is, and the kernel can drop them again. A remote file
+        is read through the artifact store on demand.
+
+        Returns:
+            The open file.
+        """
+        if os.path.exists(self._filepath):
+            return pa.memory_map(self._filepath, "r")
+        return pa.PythonFile(self.artifact_store.open(self._filepath, "rb"))
+
+    @property
+    def _filepath(self) -> str:
+        """Path of the Arrow file inside the artifact directory."""
+        return os.path.join(self.uri, ARROW_FILENAME)
+
+
+class DedupArrowDataFrameMaterializer(ArrowDataFrameMaterializer):
+    """Stores the Arrow IPC file of a DataFrame as deduplicated chunks."""
+
+    def save(self, df: pd.DataFrame) -> None:
+        """
+        Chunk the Arrow IPC file and store only the chunks that are new.
+
+        Args:
+            df: The DataFrame to save.
+        """
+        store = ChunkStore(self.artifact_store)
+        manifest, self._write_stats = store.put(dataframe_to_ipc(df))
+        store.write_manifest(self.uri, manifest)
+
+    def extract_metadata(self, df: pd.DataFrame) -> Dict[str, MetadataType]:
+        """
+        Extract the DataFrame metadata and the deduplication statistics.
+
+        Args:
+            df: The DataFrame.
+
+        Returns:
+            The metadata of the DataFrame and of the chunked write.
+        """
+        metadata = super().extract_metadata(df)
+        stats = getattr(self, "_write_stats", None)
+        if stats is not None:
+            metadata.update(
+                {
+                    "logical_bytes": stats.total_bytes,
+                    "new_bytes": stats.new_bytes,
+                    "chunks": stats.total_chunks,
+                    "new_chunks": stats.new_chunks,
+                    "dedup_ratio": round(stats.dedup_ratio, 4),
+                    "write_throughput_mb_s": round(stats.throughput_mb_s, 1),
+                }
+            )
+        return metadata
+
+    def _read_table(self) -> pa.Table:
+        """Reassemble the Arrow file from its chunks."""
+        return pa.ipc.open_file(self._open_source()).read_all()
+
+    def _open_source(self) -> pa.NativeFile:
+        """Reassemble the Arrow file from its chunks, once, in memory."""
+        if getattr(self, "_data", None) is None:
+            store = ChunkStore(self.artifact_store)
+            self._data = pa.py_buffer(store.get(store.read_manifest(self.uri)))
+        return pa.BufferReader(self._data)
@@ -0,0 +1,279 @@
+"""
+Content-defined chunking and a deduplicating chunk store.
+
+Artifacts are split into variable-sized chunks whose boundaries depend only
+on the bytes around them (a rolling hash over a small window), so inserting
+or changing data only affects the chunks around the change. Every chunk is
+stored once under `<artifact store>/chunks/`, named by its SHA-256 digest,
+and artifact versions only keep a small manifest listing their chunks.
+
+Byte-identical artifacts (e.g. `raw_data`, which is generated with a fixed
+seed) then share all their chunks, and near-identical ones (`cleaned_data`)
+share most of them.
+
+Chunks are never deleted when artifact versions are, as other versions may
+still reference them.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from zenml.artifact_stores import BaseArtifactStore
+
+CHUNKS_DIRNAME = "chunks"
+MANIFEST_FILENAME = "manifest.json"
+
+# Chunks are cut where the top `AVERAGE_CHUNK_BITS` bits of the 32-bit
+# rolling hash are zero, i.e. every 64 KiB on average
+AVERAGE_CHUNK_BITS = 16
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 256 * 1024
+WINDOW_SIZE = 48
+
+# Rolling hashes are computed in blocks to bound the memory they need
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# Random 32-bit value per byte value, so that all hash bits depend on the input
+GEAR = np.random.default_rng(0x5EED).integers(
+    0, 2**32, size=256, dtype=np.uint32
+)
+PRIME = 0x01000193
+PRIME_INVERSE = pow(PRIME, -1, 2**32)
+# Hashes below this value (top bits all zero) end a chunk
+BOUNDARY_THRESHOLD = np.uint32(1 << (32 - AVERAGE_CHUNK_BITS))
+
+
+class ChunkWriteStats(NamedTuple):
+    """Statistics of a chunk store write."""
+
+    total_bytes: int
+    new_bytes: int
+    total_chunks: int
+    new_chunks: int
+    seconds: float
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Fraction of the bytes that were already stored."""
+        if not self.total_bytes:
+            return 0.0
+        return 1 - self.new_bytes / self.total_bytes
+
+    @property
+    def throughput_mb_s(self) -> float:
+        """Logical write throughput in MB/s."""
+        return self.total_bytes / 1e6 / max(self.seconds, 1e-9)
+
+
+@functools.lru_cache(maxsize=None)
+def _powers(base: int, n: int) -> np.ndarray:
+    """`base**i` modulo 2**32 for `i` in `range(n)`."""
+    powers = np.full(n, base, dtype=np.uint32)
+    powers[0] = 1
+    # uint32 products wrap around, which is exactly arithmetic modulo 2**32
+    return np.cumprod(powers, dtype=np.uint32)
+
+
+def rolling_hashes(data: np.ndarray) -> np.ndarray:
+    """
+    Compute a polynomial rolling hash over every window of the data.
+
+    The hash of the window ending at byte `i` is
+    `sum(GEAR[data[i - k]] * PRIME**k for k in range(WINDOW_SIZE))` modulo
+    2**32. Instead of sliding the window byte by byte, it is computed from a
+    prefix sum of `GEAR[data[j]] * PRIME**-j`, which vectorizes: the window
+    hash is the difference of two prefix sums times `PRIME**i`.
+
+    Args:
+        data: The bytes to hash, as a `uint8` array.
+
+    Returns:
+        The hash of the window ending at every byte, starting at byte
+        `WINDOW_SIZE - 1`.
+    """
+    n = len(data)
+    if n < WINDOW_SIZE:
+        return np.empty(0, dtype=np.uint32)
+
+    # Cache the powers for a few sizes only (powers of two)
+    size = 1 << (n - 1).bit_length()
+    weighted = GEAR[data]
+    weighted *= _powers(PRIME_INVERSE, size)[:n]
+    prefix = np.cumsum(weighted, dtype=np.uint32)
+    window = prefix[WINDOW_SIZE - 1 :].copy()
+    window[1:] -= prefix[: n - WINDOW_SIZE]
+    window *= _powers(PRIME, size)[WINDOW_SIZE - 1 : n]
+    return window
+
+
+def chunk_boundaries(data: np.ndarray) -> List[int]:
+    """
+    Find content-defined chunk boundaries.
+
+    Args:
+        data: The bytes to chunk, as a `uint8` array.
+
+    Returns:
+        The end offset of every chunk, the last one being `len(data)`.
+    """
+    candidates = []
+    step = BLOCK_SIZE - WINDOW_SIZE + 1
+    for start in range(0, max(len(data) - WINDOW_SIZE + 1, 0), step):
+        hashes = rolling_hashes(data[start : start + BLOCK_SIZE])
+        # A window ending at byte `i` cuts the data after that byte
+        ends = np.flatnonzero(hashes < BOUNDARY_THRESHOLD)
+        candidates.append(ends + start + WINDOW_SIZE)
+
+    boundaries = []
+    last = 0
+    for end in np.concatenate(candidates or [np.empty(0, dtype=np.int64)]):
+        while end - last > MAX_CHUNK_SIZE:
+            last += MAX_CHUNK_SIZE
+            boundaries.append(last)
+        if end - last >= MIN_CHUNK_SIZE:
+            boundaries.append(int(end))
+            last = int(end)
+
+    while len(data) - last > MAX_CHUNK_SIZE:
+        last += MAX_CHUNK_SIZE
+        boundaries.append(last)
+    if last < len(data) or not boundaries:
+        boundaries.append(len(data))
+    return boundaries
+
+
+class ChunkStore:
+    """Content-addressed chunk storage inside an artifact store."""
+
+    def __init__(
+        self,
+        artifact_store: "BaseArtifactStore",
+        root: Optional[str] = None,
+        max_workers: int = 8,
+    ) -> None:
+        """
+        Initialize the chunk store.
+
+        Args:
+            artifact_store: The artifact store holding the chunks.
+            root: Directory of the chunks, defaults to `chunks/` at the root
+                of the artifact store.
+            max_workers: Number of chunks read or written concurrently.
+        """
+        self.artifact_store = artifact_store
+        self.root = root or os.path.join(artifact_store.path, CHUNKS_DIRNAME)
+        self.max_workers = max_workers
+
+    def put(self, data: Any) -> Tuple[Dict[str, Any], ChunkWriteStats]:
+        """
+        Chunk data and store the chunks that are not stored yet.
+
+        Args:
+            data: A bytes-like object.
+
+        Returns:
+            The manifest referencing the chunks, and the write statistics.
+        """
+        start = time.perf_counter()
+        view = np.frombuffer(data, dtype=np.uint8)
+
+        chunks = []
+        offset = 0
+        for end in chunk_boundaries(view):
+            chunk = view[offset:end]
+            chunks.append((hashlib.sha256(chunk).hexdigest(), chunk))
+            offset = end
+
+        # Identical chunks within the data are only written once
+        unique = dict(chunks)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            written = list(pool.map(self._write_chunk, *zip(*unique.items())))
+
+        new_sizes = [
+            len(chunk) for chunk, new in zip(unique.values(), written) if new
+        ]
+        manifest = {
+            "size": len(view),
+            "chunks": [[digest, len(chunk)] for digest, chunk in chunks],
+        }
+        stats = ChunkWriteStats(
+            total_bytes=len(view),
+            new_bytes=sum(new_sizes),
+            total_chunks=len(chunks),
+            new_chunks=len(new_sizes),
+            seconds=time.perf_counter() - start,
+        )
+        return manifest, stats
+
+    def get(self, manifest: Dict[str, Any]) -> bytearray:
+        """
+        Reassemble data from its chunks.
+
+        Args:
+            manifest: The manifest returned by `put`.
+
+        Returns:
+            The data.
+
+        Raises:
+            IOError: If a chunk has the wrong size.
+        """
+        digests = [digest for digest, _ in manifest["chunks"]]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            contents = pool.map(self._read_chunk, digests)
+
+        data = bytearray(manifest["size"])
+        offset = 0
+        for (digest, size), content in zip(manifest["chunks"], contents):
+            if len(content) != size:
+                raise IOError(f"Chunk `{digest}` is corrupted.")
+            data[offset : offset + size] = content
+            offset += size
+        return data
+
+    def write_manifest(self, uri: str, manifest: Dict[str, Any]) -> None:
+        """Write a manifest into an artifact directory."""
+        with self.artifact_store.open(
+            os.path.join(uri, MANIFEST_FILENAME), "w"
+        ) as f:
+            json.dump(manifest, f)
+
+    def read_manifest(self, uri: str) -> Dict[str, Any]:
+        """Read the manifest of an artifact directory."""
+        with self.artifact_store.open(
+            os.path.join(uri, MANIFEST_FILENAME), "r"
+        ) as f:
+            return json.load(f)
+
+    def _chunk_path(self, digest: str) -> str:
+        """Path of a chunk, sharded by the first digest characters."""
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _write_chunk(self, digest: str, chunk: np.ndarray) -> bool:
+        """Store a chunk unless it exists, return whether it was written."""
+        path = self._chunk_path(digest)
+        if self.artifact_store.exists(path):
+            return False
+
+        self.artifact_store.makedirs(os.path.dirname(path))
+        # Chunks are immutable, so concurrent writers of the same chunk are
+        # harmless as long as nobody can see a partially written file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with self.artifact_store.open(tmp_path, "wb") as f:
+            f.write(chunk.tobytes())
+        self.artifact_store.rename(tmp_path, path, overwrite=True)
+        return True
+
+    def _read_chunk(self, digest: str) -> bytes:
+        """Read a chunk."""
+        with self.artifact_store.open(self._chunk_path(digest), "rb") as f:
+            return f.read()
@@ -0,0 +1,157 @@
+"""
+Materializer that stores HTML reports gzip-compressed.
+
+The artifact is a single HTML file that carries the gzip-compressed report as
+base64 and inflates it in the browser with `DecompressionStream`. That keeps
+the stored artifact small while the ZenML dashboard can still render it as a
+regular HTML visualization.
+"""
+
+import base64
+import gzip
+import os
+import re
+from typing import Dict, Type
+
+from zenml.enums import ArtifactType, VisualizationType
+from zenml.materializers.base_materializer import BaseMaterializer
+from zenml.metadata.metadata_types import MetadataType
+from zenml.types import HTMLString
+
+COMPRESSED_HTML_FILENAME = "output.html"
+
+# Small loader page around the compressed payload
+LOADER_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"></head>
+<body>
+<script id="gzip-payload" type="application/gzip;base64">{payload}</script>
+<script>
+(async () => {{
+    const encoded = document.getElementById("gzip-payload").textContent;
+    const bytes = Uint8Array.from(atob(encoded), c => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream()
+        .pipeThrough(new DecompressionStream("gzip"));
+    const html = await new Response(stream).text();
+    document.open();
+    document.write(html);
+    document.close();
+}})();
+</script>
+</body>
+</html>
+"""
+
+PAYLOAD_PATTERN = re.compile(
+    r'<script id="gzip-payload" type="application/gzip;base64">'
+    r"([A-Za-z0-9+/=]*)</script>"
+)
+
+
+def compress_html(html: str, level: int = 9) -> str:
+    """
+    Wrap an HTML document into a self-inflating, gzip-compressed page.
+
+    Args:
+        html: The HTML document to compress.
+        level: The gzip compression level.
+
+    Returns:
+        The loader page holding the compressed document.
+    """
+    compressed = gzip.compress(
+        html.encode("utf-8"), compresslevel=level, mtime=0
+    )
+    payload = base64.b64encode(compressed).decode("ascii")
+    return LOADER_TEMPLATE.format(payload=payload)
+
+
+def decompress_html(page: str) -> str:
+    """
+    Extract the original HTML document from a page built by `compress_html`.
+
+    Args:
+        page: The loader page.
+
+    Returns:
+        The original HTML document.
+
+    Raises:
+        ValueError: If the page does not contain a compressed payload.
+    """
+    match = PAYLOAD_PATTERN.search(page)
+    if match is None:
+        raise ValueError("No compressed HTML payload found.")
+    return gzip.decompress(base64.b64decode(match.group(1))).decode("utf-8")
+
+
+class CompressedHTMLStringMaterializer(BaseMaterializer):
+    """Materializer storing `HTMLString` artifacts gzip-compressed."""
+
+    ASSOCIATED_TYPES = (HTMLString,)
+    ASSOCIATED_ARTIFACT_TYPE = ArtifactType.DATA_ANALYSIS
+    SKIP_REGISTRATION = True
+
+    def load(self, data_type: Type[HTMLString]) -> HTMLString:
+        """
+        Load and decompress the HTML report.
+
+        Args:
+            data_type: The type of the data to read.
+
+        Returns:
+            The original, uncompressed HTML report.
+        """
+        with self.artifact_store.open(self._filepath, "r") as f:
+            return data_type(decompress_html(f.read()))
+
+    def save(self, data: HTMLString) -> None:
+        """
+        Compress and save the HTML report.
+
+        Args:
+            data: The HTML report to save.
+        """
+        page = compress_html(data)
+        self._stored_bytes = len(page.encode("utf-8"))
+        with self.artifact_store.open(self._filepath, "w") as f:
+            f.write(page)
+
+    def save_visualizations(
+        self, data: HTMLString
+    ) -> Dict[str, VisualizationType]:
+        """
+        Expose the self-inflating page as the HTML visualization.
+
+        Args:
+            data: The HTML report.
+
+        Returns:
+            The visualization URI and its type.
+        """
+        return {self._filepath.replace("\\", "/"): VisualizationType.HTML}
+
+    def extract_metadata(self, data: HTMLString) -> Dict[str, MetadataType]:
+        """
+        Record the uncompressed and stored size of the report.
+
+        Args:
+            data: The HTML report.
+
+        Returns:
+            Size metadata of the report.
+        """
+        raw_bytes = len(data.encode("utf-8"))
+        stored_bytes = getattr(self, "_stored_bytes", None)
+        if stored_bytes is None:
+            stored_bytes = len(compress_html(data).encode("utf-8"))
+        return {
+            "uncompressed_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+            "compression_ratio": round(raw_bytes / max(stored_bytes, 1), 2),
+        }
+
+    @property
+    def _filepath(self) -> str:
+        """Path of the stored report inside the artifact directory."""
+        return os.path.join(self.uri, COMPRESSED_HTML_FILENAME)
@@ -0,0 +1,77 @@
+"""
+Materializer that stores JSON-serializable dicts gzip-compressed.
+
+Used for metadata that is too large to be logged as run metadata (see
+`utils/metadata_buffer.py`). Values that are not JSON-serializable are
+stored as strings.
+"""
+
+import gzip
+import json
+import os
+from typing import Any, Dict, Type
+
+from zenml.enums import ArtifactType
+from zenml.materializers.base_materializer import BaseMaterializer
+from zenml.metadata.metadata_types import MetadataType
+
+COMPRESSED_JSON_FILENAME = "data.json.gz"
+
+
+class CompressedJSONMaterializer(BaseMaterializer):
+    """Materializer storing dicts as gzip-compressed JSON."""
+
+    ASSOCIATED_TYPES = (dict,)
+    ASSOCIATED_ARTIFACT_TYPE = ArtifactType.DATA
+    SKIP_REGISTRATION = True
+
+    def load(self, data_type: Type[Any]) -> Dict[str, Any]:
+        """
+        Load and decompress the dict.
+
+        Args:
+            data_type: The type of the data to read.
+
+        Returns:
+            The dict.
+        """
+        with self.artifact_store.open(self._filepath, "rb") as f:
+            return json.loads(gzip.decompress(f.read()))
+
+    def save(self, data: Dict[str, Any]) -> None:
+        """
+        Serialize the dict as compact JSON and compress it.
+
+        Args:
+            data: The dict to save.
+        """
+        raw = json.dumps(data, separators=(",", ":"), default=str).encode()
+        compressed = gzip.compress(raw, mtime=0)
+        self._sizes = (len(raw), len(compressed))
+        with self.artifact_store.open(self._filepath, "wb") as f:
+            f.write(compressed)
+
+    def extract_metadata(self, data: Dict[str, Any]) -> Dict[str, MetadataType]:
+        """
+        Record the uncompressed and stored size of the dict.
+
+        Args:
+            data: The dict.
+
+        Returns:
+            Size metadata of the dict.
+        """
+        sizes = getattr(self, "_sizes", None)
+        if sizes is None:
+            return {}
+        raw_bytes, stored_bytes = sizes
+        return {
+            "uncompressed_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+            "keys": sorted(str(key) for key in data),
+        }
+
+    @property
+    def _filepath(self) -> str:
+        """Path of the stored JSON file inside the artifact directory."""
+        return os.path.join(self.uri, COMPRESSED_JSON_FILENAME)
@@ -0,0 +1,198 @@
+"""
+Materializer that hands step outputs to the next step in memory.
+
+In fused mode, the intermediate artifacts of the pipeline (raw and cleaned
+data, data analysis) are kept in a process-level store instead of being
+serialized to the artifact store. The consuming steps read the same Python
+object back, which works whenever all steps run in one process, as they do
+on the local orchestrators. Artifact versions are still registered (under a
+`memory://` URI) so the run's lineage stays complete.
+
+To report what fusion saves, every fused artifact is also serialized once
+into an in-memory buffer, using the format ZenML would have written: parquet
+for DataFrames when `pyarrow` is installed, CSV otherwise, and pickle for
+other objects. Large DataFrames are sampled and the measurements scaled up.
+The estimate excludes artifact store latency, so it is a lower bound.
+
+Steps producing fused artifacts must use `FUSED_CACHE_POLICY`: their outputs
+only exist in the process that ran them, so cached results must never be
+reused by another process.
+"""
+
+import io
+import pickle
+import threading
+import time
+import uuid
+from typing import Any, ClassVar, Dict, Optional, Tuple, Type
+
+import pandas as pd
+from zenml.config import CachePolicy
+from zenml.materializers.in_memory_materializer import InMemoryMaterializer
+from zenml.metadata.metadata_types import MetadataType
+
+from utils.fingerprint import fingerprint
+
+# Rows serialized to estimate the I/O of a large DataFrame
+ESTIMATE_SAMPLE_ROWS = 20_000
+
+_store: Dict[str, Any] = {}
+_savings: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+_process_token = uuid.uuid4().hex
+
+
+def process_cache_token() -> str:
+    """Cache function scoping cached step runs to the current process."""
+    return _process_token
+
+
+FUSED_CACHE_POLICY = CachePolicy(cache_func=process_cache_token)
+
+
+def _serialize(data: Any) -> Tuple[bytes, Any]:
+    """Serialize data like the default materializer, return a loader too."""
+    if isinstance(data, pd.DataFrame):
+        buffer = io.BytesIO()
+        try:
+            data.to_parquet(buffer, compression="gzip")
+            return buffer.getvalue(), pd.read_parquet
+        except ImportError:
+            data.to_csv(buffer, index=True)
+            return buffer.getvalue(), lambda f: pd.read_csv(f, index_col=0)
+    return pickle.dumps(data), pickle.load
+
+
+def estimate_io(data: Any) -> Dict[str, float]:
+    """
+    Estimate the bytes and time needed to store and load an artifact.
+
+    Args:
+        data: The artifact data.
+
+    Returns:
+        The estimated artifact size and write/read time in seconds.
+    """
+    scale = 1.0
+    if isinstance(data, pd.DataFrame) and len(data) > ESTIMATE_SAMPLE_ROWS:
+        scale = len(data) / ESTIMATE_SAMPLE_ROWS
+        data = data.sample(n=ESTIMATE_SAMPLE_ROWS, random_state=0)
+
+    start = time.perf_counter()
+    content, read = _serialize(data)
+    write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    read(io.BytesIO(content))
+    read_s = time.perf_counter() - start
+
+    return {
+        "bytes": len(content) * scale,
+        "write_s": write_s * scale,
+        "read_s": read_s * scale,
+    }
+
+
+def fusion_summary() -> Dict[str, float]:
+    """
+    Summarize the I/O avoided by fused artifacts of this process.
+
+    Every fused artifact would have been written once and read once per
+    consuming step.
+
+    Returns:
+        Number of fused artifacts and loads, and the estimated bytes and
+        seconds of artifact store I/O that were avoided.
+    """
+    with _lock:
+        savings = list(_savings.values())
+    return {
+        "artifacts": len(savings),
+        "loads": sum(s["loads"] for s in savings),
+        "bytes": sum(s["bytes"] * (1 + s["loads"]) for s in savings),
+        "seconds": sum(
+            s["write_s"] + s["read_s"] * s["loads"] for s in savings
+        ),
+    }
+
+
+def release_fused_artifacts() -> None:
+    """Drop all fused artifacts and savings of this process."""
+    with _lock:
+        _store.clear()
+        _savings.clear()
+
+
+class FusedMaterializer(InMemoryMaterializer):
+    """Keeps artifacts in process memory and records the I/O it avoids."""
+
+    ASSOCIATED_TYPES: ClassVar[Tuple[Type[Any], ...]] = (object,)
+    SKIP_REGISTRATION: ClassVar[bool] = True
+
+    def save(self, data: Any) -> None:
+        """
+        Keep the data in memory.
+
+        Args:
+            data: The data to store.
+        """
+        estimate = dict(estimate_io(data), loads=0)
+        with _lock:
+            _store[self.uri] = data
+            _savings[self.uri] = estimate
+
+    def load(self, data_type: Type[Any]) -> Any:
+        """
+        Return the data stored by the upstream step.
+
+        Args:
+            data_type: The type of the data to load.
+
+        Returns:
+            The stored data.
+
+        Raises:
+            RuntimeError: If the data is not in this process because the
+                steps ran in separate processes.
+        """
+        with _lock:
+            if self.uri not in _store:
+                raise RuntimeError(
+                    f"Fused artifact `{self.uri}` is not available in this "
+                    "process. Fused mode requires all steps to run in one "
+                    "process."
+                )
+            _savings[self.uri]["loads"] += 1
+            return _store[self.uri]
+
+    def extract_full_metadata(self, data: Any) -> Dict[str, MetadataType]:
+        """
+        Record the estimated artifact store I/O that was skipped.
+
+        Args:
+            data: The stored data.
+
+        Returns:
+            The estimated size and write time of the artifact.
+        """
+        with _lock:
+            estimate = _savings.get(self.uri, {})
+        return {
+            "fused": True,
+            "estimated_bytes_avoided": int(estimate.get("bytes", 0)),
+            "estimated_write_seconds_avoided": round(
+                estimate.get("write_s", 0.0), 4
+            ),
+        }
+
+    def compute_content_hash(self, data: Any) -> Optional[str]:
+        """
+        Fingerprint the data, so content-based step caching keeps working.
+
+        Args:
+            data: The stored data.
+
+        Returns:
+            The content hash of the data.
+        """
+        return fingerprint(data)
@@ -0,0 +1,319 @@
+"""
+Local orchestrator that runs independent pipeline steps concurrently.
+
+The default local orchestrator executes every step one after the other, even
+when steps don't depend on each other (e.g. the data analysis branch and
+`train_model`). This orchestrator schedules the steps of the pipeline DAG on
+a thread pool instead: a step is submitted as soon as all of its upstream
+steps have finished. At the end of each run it logs the wall time, the
+serial time (sum of step durations), the critical path and the resulting
+speedup.
+
+Register it with `stacks/setup_parallel_local_stack.sh`.
+"""
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Type, cast
+from uuid import uuid4
+
+from zenml import log_metadata
+from zenml.config.base_settings import BaseSettings
+from zenml.enums import ExecutionMode
+from zenml.execution.context import setup_execution_context
+from zenml.logger import get_logger
+from zenml.orchestrators import (
+    BaseOrchestratorConfig,
+    BaseOrchestratorFlavor,
+    SubmissionResult,
+)
+from zenml.orchestrators.local.local_orchestrator import LocalOrchestrator
+from zenml.utils import string_utils
+from zenml.utils.env_utils import temporary_environment
+
+if TYPE_CHECKING:
+    from zenml.config.step_configurations import Step
+    from zenml.models import PipelineRunResponse, PipelineSnapshotResponse
+    from zenml.stack import Stack
+
+logger = get_logger(__name__)
+
+
+class ParallelLocalOrchestratorSettings(BaseSettings):
+    """Settings for the parallel local orchestrator.
+
+    Attributes:
+        max_workers: Maximum number of steps running at the same time.
+    """
+
+    max_workers: int = 4
+
+
+class ParallelLocalOrchestratorConfig(
+    BaseOrchestratorConfig, ParallelLocalOrchestratorSettings
+):
+    """Parallel local orchestrator config."""
+
+    @property
+    def is_local(self) -> bool:
+        """Whether this orchestrator runs locally."""
+        return True
+
+    @property
+    def is_synchronous(self) -> bool:
+        """Whether the orchestrator waits for the run to finish."""
+        return True
+
+
+def critical_path(
+    durations: Dict[str, float], upstream: Dict[str, Set[str]]
+) -> List[str]:
+    """
+    Find the longest chain of dependent steps.
+
+    Args:
+        durations: Duration of every finished step, in topological order.
+        upstream: Upstream steps of every step.
+
+    Returns:
+        The step names on the critical path, in execution order.
+    """
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for name, duration in durations.items():
+        parents = [p for p in upstream.get(name, ()) if p in finish]
+        parent = max(parents, key=finish.__getitem__, default=None)
+        previous[name] = parent
+        finish[name] = duration + (finish[parent] if parent else 0.0)
+
+    if not finish:
+        return []
+
+    path: List[str] = []
+    node: Optional[str] = max(finish, key=finish.__getitem__)
+    while node is not None:
+        path.append(node)
+        node = previous[node]
+    return path[::-1]
+
+
+class ParallelLocalOrchestrator(LocalOrchestrator):
+    """Local orchestrator running independent steps on a thread pool."""
+
+    @property
+    def config(self) -> ParallelLocalOrchestratorConfig:
+        """Returns the orchestrator config."""
+        return cast(ParallelLocalOrchestratorConfig, self._config)
+
+    @property
+    def settings_class(self) -> Optional[Type["BaseSettings"]]:
+        """Settings class for the parallel local orchestrator."""
+        return ParallelLocalOrchestratorSettings
+
+    def submit_pipeline(
+        self,
+        snapshot: "PipelineSnapshotResponse",
+        stack: "Stack",
+        base_environment: Dict[str, str],
+        step_environments: Dict[str, Dict[str, str]],
+        placeholder_run: Optional["PipelineRunResponse"] = None,
+    ) -> Optional[SubmissionResult]:
+        """
+        Run the pipeline, executing independent steps concurrently.
+
+        Args:
+            snapshot: The pipeline snapshot to run.
+            stack: The stack the pipeline will run on.
+            base_environment: Base environment shared by all steps.
+            step_environments: Environment variables of every step.
+            placeholder_run: An optional placeholder run for the snapshot.
+
+        Returns:
+            None, the run has finished when this method returns.
+
+        Raises:
+            step_exception: The exception of the failed step, in fail-fast
+                execution mode.
+            RuntimeError: If the pipeline run fails.
+        """
+        settings = cast(
+            ParallelLocalOrchestratorSettings, self.get_settings(snapshot)
+        )
+        max_workers = max(1, settings.max_workers)
+        execution_mode = snapshot.pipeline_configuration.execution_mode
+
+        self._orchestrator_run_id = str(uuid4())
+        start_time = time.time()
+
+        steps = snapshot.step_configurations
+        upstream = {
+            name: set(step.spec.upstream_steps) & set(steps)
+            for name, step in steps.items()
+        }
+
+        # Environment variables are process-wide, so all steps share one
+        # environment instead of switching it per step.
+        environment = dict(base_environment)
+        for step_environment in step_environments.values():
+            environment.update(step_environment)
+
+        pending = list(steps)
+        running: Dict = {}
+        durations: Dict[str, float] = {}
+        failed_steps: List[str] = []
+        skipped_steps: List[str] = []
+        step_exception: Optional[Exception] = None
+
+        self.run_init_hook(snapshot=snapshot)
+
+        with setup_execution_context(), temporary_environment(
+            environment
+        ), ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                stop_launching = (
+                    execution_mode != ExecutionMode.CONTINUE_ON_FAILURE
+                    and failed_steps
+                )
+                for name in list(pending):
+                    blocked = upstream[name] & set(failed_steps + skipped_steps)
+                    if stop_launching or blocked:
+                        logger.warning(
+                            "Skipping step %s due to the failed or skipped "
+                            "step(s): %s (Execution mode %s)",
+                            name,
+                            ", ".join(blocked or failed_steps),
+                            execution_mode,
+                        )
+                        skipped_steps.append(name)
+                        pending.remove(name)
+                    elif upstream[name] <= set(durations):
+                        if self.requires_resources_in_orchestration_environment(
+                            steps[name]
+                        ):
+                            logger.warning(
+                                "Specifying step resources is not supported "
+                                "for the local orchestrator, ignoring resource "
+                                "configuration for step %s.",
+                                name,
+                            )
+                        # Each step gets a copy of the current context so
+                        # the execution context is visible in the worker.
+                        context = contextvars.copy_context()
+                        future = executor.submit(
+                            context.run, self._run_timed_step, steps[name]
+                        )
+                        running[future] = name
+                        pending.remove(name)
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        durations[name] = future.result()
+                    except Exception as e:
+                        failed_steps.append(name)
+                        logger.exception("Step %s failed.", name)
+                        if step_exception is None:
+                            step_exception = e
+
+        self.run_cleanup_hook(snapshot=snapshot)
+
+        if failed_steps:
+            if execution_mode == ExecutionMode.FAIL_FAST:
+                assert step_exception is not None
+                raise step_exception
+            raise RuntimeError(
+                "Pipeline run has failed due to failure in step(s): "
+                f"{', '.join(failed_steps)}"
+            )
+
+        self._log_parallelism(
+            durations=durations,
+            upstream=upstream,
+            wall_time=time.time() - start_time,
+            max_workers=max_workers,
+            placeholder_run=placeholder_run,
+        )
+        self._orchestrator_run_id = None
+        return None
+
+    def _run_timed_step(self, step: "Step") -> float:
+        """Run a single step and return its duration in seconds."""
+        start = time.perf_counter()
+        self.run_step(step=step)
+        return time.perf_counter() - start
+
+    def _log_parallelism(
+        self,
+        durations: Dict[str, float],
+        upstream: Dict[str, Set[str]],
+        wall_time: float,
+        max_workers: int,
+        placeholder_run: Optional["PipelineRunResponse"],
+    ) -> None:
+        """Log critical path and speedup of the run, and store them."""
+        # Keep the steps in topological (snapshot) order
+        ordered = {
+            name: durations[name] for name in upstream if name in durations
+        }
+        path = critical_path(ordered, upstream)
+        serial_time = sum(ordered.values())
+        path_time = sum(ordered[name] for name in path)
+        speedup = serial_time / wall_time if wall_time > 0 else 1.0
+
+        logger.info(
+            "Pipeline run has finished in `%s` on %d workers (serial `%s`, "
+            "critical path `%s`: %s, speedup %.2fx).",
+            string_utils.get_human_readable_time(wall_time),
+            max_workers,
+            string_utils.get_human_readable_time(serial_time),
+            string_utils.get_human_readable_time(path_time),
+            " -> ".join(path),
+            speedup,
+        )
+
+        if placeholder_run is None:
+            return
+        try:
+            log_metadata(
+                metadata={
+                    "parallel_execution": {
+                        "max_workers": max_workers,
+                        "wall_time_s": round(wall_time, 3),
+                        "serial_time_s": round(serial_time, 3),
+                        "critical_path_s": round(path_time, 3),
+                        "critical_path": path,
+                        "speedup": round(speedup, 2),
+                        "step_durations_s": {
+                            name: round(duration, 3)
+                            for name, duration in ordered.items()
+                        },
+                    }
+                },
+                run_id_name_or_prefix=placeholder_run.id,
+            )
+        except Exception as e:
+            logger.warning("Failed to log parallel execution metadata: %s", e)
+
+
+class ParallelLocalOrchestratorFlavor(BaseOrchestratorFlavor):
+    """Flavor of the parallel local orchestrator."""
+
+    @property
+    def name(self) -> str:
+        """The flavor name."""
+        return "parallel_local"
+
+    @property
+    def config_class(self) -> Type[BaseOrchestratorConfig]:
+        """Config class of the flavor."""
+        return ParallelLocalOrchestratorConfig
+
+    @property
+    def implementation_class(self) -> Type[ParallelLocalOrchestrator]:
+        """Implementation class of the flavor."""
+        return ParallelLocalOrchestrator
@@ -1,51 +1,193 @@
+"""
+The price prediction pipeline.
+
+The pipeline name, model and run name prefix come from `project_config.yaml`,
+which is only read when `price_prediction_pipeline` is first accessed rather
+than when this module is imported.
+"""
+
+import functools
+from typing import Optional
+
 from zenml import Model, pipeline
 from zenml.config import DockerSettings
+from zenml.pipelines.pipeline_definition import Pipeline
 
+from materializers.arrow_materializer import DedupArrowDataFrameMaterializer
+from materializers.compressed_html_materializer import (
+    CompressedHTMLStringMaterializer,
+)
+from materializers.fused_materializer import (
+    FUSED_CACHE_POLICY,
+    FusedMaterializer,
+)
 from steps.analyze_data import analyze_data
+from steps.check_guard_bands import check_guard_bands
 from steps.clean_data import clean_data
+from steps.detect_drift import detect_drift
 from steps.generate_data_analysis_report import generate_data_analysis_report
 from steps.load_data import load_data
+from steps.sample_data import sample_data
 from steps.train_model import train_model
+from steps.train_model_streaming import train_model_streaming
+from steps.validate_data import validate_data
 from utils.project_config import get_config
+from utils.smoke import scaled_epochs
 
 
-# Load project configuration
-config = get_config()
-
-
-@pipeline(
-    name=config.pipeline.name,
-    enable_cache=True,
-    model=Model(
-        name=config.model.name,
-        description=config.model.description,
-        tags=config.model.tags,
-    ),
-    settings={
-        "docker": DockerSettings(
-            python_package_installer="uv",
-            requirements=["pandas", "numpy", "scikit-learn", "plotly"],
-        ),
-    },
-    # Use substitutions for dynamic run names
-    # The {run_name_prefix} will be replaced by the value from config
-    substitutions={
-        "run_name_prefix": config.pipeline.run_name_prefix,
-    },
-)
-def price_prediction_pipeline(epochs: int = 15, data_analysis: bool = True):
+def _price_prediction_pipeline(
+    epochs: int = 15,
+    data_analysis: bool = True,
+    compress_reports: bool = False,
+    dedup_artifacts: bool = False,
+    fused: bool = False,
+    smoke_fraction: Optional[float] = None,
+    drift_threshold: Optional[float] = None,
+    per_category: bool = False,
+    streaming: bool = False,
+):
     """Pipeline that demonstrates ZenML's visualization and reporting capabilities."""
-    raw_data = load_data()
-    cleaned_data = clean_data(raw_data)
-    model, model_report = train_model(cleaned_data, epochs=epochs)
+    if streaming and (fused or per_category or drift_threshold is not None):
+        raise ValueError(
+            "Streaming training reads the stored cleaned data in chunks and "
+            "trains one linear model, it cannot be combined with `fused`, "
+            "`per_category` or `drift_threshold`."
+        )
+    if fused and dedup_artifacts:
+        raise ValueError(
+            "Fused runs keep the raw and cleaned data in memory, they cannot "
+            "be combined with `dedup_artifacts`, which stores them as "
+            "deduplicated chunks."
+        )
+    if streaming and dedup_artifacts:
+        raise ValueError(
+            "Streaming training reads the cleaned data in chunks, which "
+            "`dedup_artifacts` would reassemble in memory, use plain "
+            "artifacts for data beyond memory."
+        )
+    load_step, clean_step, analyze_step = load_data, clean_data, analyze_data
+    # The streaming step reads the cleaned data in chunks, in bounded memory
+    train_step = train_model_streaming if streaming else train_model
+    train_options = {} if streaming else {"per_category": per_category}
+    report_step = generate_data_analysis_report
+    if dedup_artifacts:
+        # Store the datasets as deduplicated chunks, so repeated runs only
+        # store the bytes that changed
+        load_step = load_data.with_options(
+            output_materializers={"raw_data": DedupArrowDataFrameMaterializer}
+        )
+        clean_step = clean_data.with_options(
+            output_materializers=DedupArrowDataFrameMaterializer
+        )
+    if fused:
+        # Pass the intermediate artifacts in memory, only the model and the
+        # reports are written to the artifact store. The data sketch is
+        # stored, later runs compare their data with it.
+        load_step = load_data.with_options(
+            output_materializers={"raw_data": FusedMaterializer},
+            cache_policy=FUSED_CACHE_POLICY,
+        )
+        clean_step, analyze_step = (
+            step.with_options(
+                output_materializers=FusedMaterializer,
+                cache_policy=FUSED_CACHE_POLICY,
+            )
+            for step in (clean_data, analyze_data)
+        )
+    if compress_reports:
+        # Store the HTML reports gzip-compressed in the artifact store
+        train_step = train_step.with_options(
+            output_materializers={
+                "model_report": CompressedHTMLStringMaterializer
+            }
+        )
+        report_step = generate_data_analysis_report.with_options(
+            output_materializers=CompressedHTMLStringMaterializer
+        )
+
+    raw_data, data_sketch = load_step()
+    cleaned_data = clean_step(raw_data)
+    # Everything after cleaning waits for the validation, so bad data stops
+    # the run before any expensive step
+    validate_data(cleaned_data)
+    if smoke_fraction:
+        # Smoke run: train a scaled-down model on a stratified subsample and
+        # check it against the last full run on held-out rows
+        smoke_data, holdout_data = sample_data(
+            cleaned_data, fraction=smoke_fraction, after="validate_data"
+        )
+        # Streaming epochs are passes over the data, not trees
+        model, model_report = train_step(
+            smoke_data,
+            epochs=(
+                epochs if streaming else scaled_epochs(epochs, smoke_fraction)
+            ),
+            **train_options,
+        )
+        check_guard_bands(model, holdout_data)
+    else:
+        if drift_threshold is not None:
+            # Reuse the production model unless the data drifted from its
+            # training data by more than the PSI threshold
+            train_options["drift"] = detect_drift(
+                data_sketch,
+                psi_threshold=drift_threshold,
+                after="validate_data",
+            )
+        model, model_report = train_step(
+            cleaned_data,
+            epochs=epochs,
+            after="validate_data",
+            **train_options,
+        )
 
     if data_analysis:
-        data_analysis = analyze_data(raw_data)
+        data_analysis = analyze_step(raw_data, after="validate_data")
 
         # Generate two separate reports
-        generate_data_analysis_report(raw_data, cleaned_data, data_analysis)
+        report_step(raw_data, cleaned_data, data_analysis)
 
 
-if __name__ == "__main__":
-    price_prediction_pipeline(epochs=10)
+@functools.lru_cache(maxsize=None)
+def get_price_prediction_pipeline() -> Pipeline:
+    """Create the pipeline from the project configuration."""
+    # Load project configuration
+    config = get_config()
+
+    return pipeline(
+        name=config.pipeline.name,
+        enable_cache=True,
+        model=Model(
+            name=config.model.name,
+            description=config.model.description,
+            tags=config.model.tags,
+        ),
+        settings={
+            "docker": DockerSettings(
+                python_package_installer="uv",
+                requirements=[
+                    "pandas",
+                    "numpy",
+                    "scikit-learn",
+                    "plotly",
+                    "pyarrow",
+                ],
+            ),
+        },
+        # Use substitutions for dynamic run names
+        # The {run_name_prefix} will be replaced by the value from config
+        substitutions={
+            "run_name_prefix": config.pipeline.run_name_prefix,
+        },
+    )(_price_prediction_pipeline)
 
+
+def __getattr__(name: str):
+    """Create `price_prediction_pipeline` on first access."""
+    if name == "price_prediction_pipeline":
+        return get_price_prediction_pipeline()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    get_price_prediction_pipeline()(epochs=10)
@@ -4,26 +4,229 @@ Promote a model version to production stage.
 Usage:
     python promote.py --version 1
     python promote.py -v 1
+
+    # Promote the best of the 10 latest versions if it beats production
+    python promote.py --best --metric r2_score --margin 0.01
 """
 
 import argparse
-
-from zenml.client import Client
-from zenml.enums import ModelStages
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from utils.project_config import get_model_name
 
+# Whether higher (1) or lower (-1) values of a metric logged by `train_model`
+# are better
+METRIC_DIRECTIONS = {"r2_score": 1, "mse": -1, "rmse": -1, "mae": -1}
+
+# Artifact whose metadata holds the `metrics` logged by `train_model`
+MODEL_ARTIFACT_NAME = "price_prediction_model"
+
+
+def select_promotion(
+    scores: Dict[str, float],
+    production_score: Optional[float],
+    metric: str,
+    margin: float,
+) -> Tuple[Optional[str], List[str]]:
+    """
+    Pick the candidate to promote and the candidates to archive.
+
+    Candidates are only archived when another one is promoted, a candidate
+    that just missed the margin stays available for the next comparison.
+
+    Args:
+        scores: Metric value of every candidate version.
+        production_score: Metric value of the production version, None if
+            there is none.
+        metric: Name of the metric, see `METRIC_DIRECTIONS`.
+        margin: How much the best candidate has to improve on production
+            (in metric units) to be promoted.
+
+    Returns:
+        The version to promote (None if no candidate beats production by the
+        margin) and the versions to archive (none if nothing is promoted).
+    """
+    direction = METRIC_DIRECTIONS[metric]
+    ranked = sorted(scores, key=lambda version: -direction * scores[version])
+    if not ranked:
+        return None, []
+
+    best = ranked[0]
+    if (
+        production_score is not None
+        and direction * (scores[best] - production_score) <= margin
+    ):
+        return None, []
+    return best, ranked[1:]
+
+
+def fetch_metrics(
+    client, model_versions, max_workers: int
+) -> Dict[str, Optional[Dict[str, float]]]:
+    """
+    Fetch the metrics of several model versions concurrently.
+
+    The threads share the client, and with it its connection pool to the
+    ZenML server.
+
+    Args:
+        client: The ZenML client.
+        model_versions: The model versions.
+        max_workers: Number of concurrent requests.
+
+    Returns:
+        The metrics of every version, None for versions without a trained
+        model.
+    """
+
+    def _metrics(model_version) -> Optional[Dict[str, float]]:
+        # One request per version: the latest model artifact of the version,
+        # hydrated with its run metadata
+        artifacts = client.list_artifact_versions(
+            sort_by="desc:created",
+            size=1,
+            artifact=MODEL_ARTIFACT_NAME,
+            model_version_id=model_version.id,
+            hydrate=True,
+        ).items
+        if not artifacts:
+            return None
+        return artifacts[0].run_metadata.get("metrics")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        metrics = pool.map(_metrics, model_versions)
+        return {
+            model_version.name: version_metrics
+            for model_version, version_metrics in zip(model_versions, metrics)
+        }
+
+
+def promote_best(
+    model_name: str,
+    metric: str,
+    margin: float,
+    candidates: int,
+    max_workers: int,
+    dry_run: bool,
+) -> None:
+    """
+    Promote the best recent model version if it beats production.
+
+    The candidates are the latest versions that are neither in production
+    nor archived nor trained by smoke runs. The best one is promoted if it
+    improves on the production version by more than `margin`, and only then
+    are the other candidates archived.
+
+    Args:
+        model_name: Name of the model.
+        metric: Metric that ranks the versions.
+        margin: Required improvement over production, in metric units.
+        candidates: Number of latest versions to consider.
+        max_workers: Number of concurrent requests.
+        dry_run: Only print what would be promoted and archived.
+    """
+    from zenml.client import Client
+    from zenml.enums import ModelStages
+
+    from utils.smoke import SMOKE_TAG
+
+    client = Client()
+    latest = client.list_model_versions(
+        model=model_name, sort_by="desc:number", size=candidates, hydrate=True
+    ).items
+    production = client.list_model_versions(
+        model=model_name, stage=ModelStages.PRODUCTION, size=1
+    ).items
+    model_versions = [
+        model_version
+        for model_version in latest
+        if model_version.stage
+        not in (ModelStages.PRODUCTION.value, ModelStages.ARCHIVED.value)
+        # Smoke runs train scaled-down models on a subsample
+        and SMOKE_TAG not in {tag.name for tag in model_version.tags}
+    ]
+
+    metrics = fetch_metrics(client, production + model_versions, max_workers)
+    values = {
+        name: version_metrics.get(metric)
+        for name, version_metrics in metrics.items()
+        if version_metrics
+    }
+    scores = {
+        model_version.name: values[model_version.name]
+        for model_version in model_versions
+        if values.get(model_version.name) is not None
+    }
+    production_name = production[0].name if production else None
+    production_score = values.get(production_name)
+
+    winner, losers = select_promotion(scores, production_score, metric, margin)
+
+    print(f"{'version':<10} {'stage':<11} {metric:>10}")
+    for model_version in production + model_versions:
+        value = values.get(model_version.name)
+        value_text = f"{value:.4f}" if value is not None else "n/a"
+        print(
+            f"{model_version.name:<10} {model_version.stage or '-':<11} "
+            f"{value_text:>10}"
+        )
+
+    if winner is None:
+        print(
+            f"No candidate improves {metric} of production version "
+            f"`{production_name}` by more than {margin}."
+        )
+    else:
+        print(f"Promoting version `{winner}` to production.")
+    if losers:
+        print(f"Archiving versions: {', '.join(losers)}")
+    if dry_run:
+        print("Dry run, nothing was changed.")
+        return
+
+    updates = [(winner, ModelStages.PRODUCTION)] if winner else []
+    updates += [(loser, ModelStages.ARCHIVED) for loser in losers]
+
+    def _set_stage(update) -> None:
+        version, stage = update
+        client.update_model_version(
+            model_name_or_id=model_name,
+            version_name_or_id=version,
+            stage=stage,
+            force=True,
+        )
+
+    # Promote first, so production is never left empty, then archive the
+    # losers. The server updates one version per request, the requests are
+    # sent concurrently over the shared client.
+    if winner:
+        _set_stage(updates.pop(0))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(_set_stage, updates))
+
+    if winner:
+        print(
+            f"✅ Model `{model_name}` version `{winner}` promoted to production!"
+        )
+
 
 def main():
     parser = argparse.ArgumentParser(
         description="Promote a model version to production."
     )
-    parser.add_argument(
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument(
         "-v",
         "--version",
         help="The version to promote to production.",
         type=str,
-        required=True,
+    )
+    target.add_argument(
+        "--best",
+        help="Promote the best recent version if it beats production, and "
+        "archive the other candidates.",
+        action="store_true",
     )
     parser.add_argument(
         "--stage",
@@ -32,11 +235,58 @@ def main():
         choices=["staging", "production", "archived"],
         default="production",
     )
+    parser.add_argument(
+        "--metric",
+        help="Metric that ranks the versions with `--best`.",
+        type=str,
+        choices=sorted(METRIC_DIRECTIONS),
+        default="r2_score",
+    )
+    parser.add_argument(
+        "--margin",
+        help="Improvement over production (in metric units) the best version "
+        "needs to be promoted with `--best`.",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "--candidates",
+        help="Number of latest versions considered with `--best`.",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of concurrent requests to the ZenML server.",
+        type=int,
+        default=8,
+    )
+    parser.add_argument(
+        "--dry-run",
+        help="With `--best`, only print what would be promoted and archived.",
+        action="store_true",
+    )
     args = parser.parse_args()
 
     # Get model name from central config
     model_name = get_model_name()
-    
+
+    if args.best:
+        promote_best(
+            model_name=model_name,
+            metric=args.metric,
+            margin=args.margin,
+            candidates=args.candidates,
+            max_workers=args.workers,
+            dry_run=args.dry_run,
+        )
+        return
+
+    # Importing the ZenML client takes seconds, so it is deferred until the
+    # arguments are valid (`--help` and usage errors stay fast)
+    from zenml.client import Client
+    from zenml.enums import ModelStages
+
     # Map string stage to ModelStages enum
     stage_map = {
         "staging": ModelStages.STAGING,
@@ -49,7 +299,7 @@ def main():
     Client().get_model_version(model_name, args.version).set_stage(
         stage, force=True
     )
-    
+
     print(f"✅ Model `{model_name}` version `{args.version}` promoted to {args.stage}!")
 
 
@@ -1,18 +1,33 @@
+from typing import Optional
+
 import click
 
-from pipeline.training_pipeline import price_prediction_pipeline
 from utils.project_config import get_config
 
 
 @click.command()
 @click.option(
     "--environment",
-    type=click.Choice(["local", "staging", "production"]),
+    type=click.Choice(["local", "staging", "production", "smoke"]),
     default="local",
     show_default=True,
     help="Environment to run the pipeline in.",
 )
-def main(environment: str):
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of steps to run concurrently on the parallel local "
+    "orchestrator (ignored by other orchestrators).",
+)
+@click.option(
+    "--fused",
+    is_flag=True,
+    default=False,
+    help="Pass intermediate artifacts between steps in memory and only "
+    "store the model and reports (local stacks only).",
+)
+def main(environment: str, workers: Optional[int], fused: bool):
     """
     CLI to run the pipeline locally with specified environment configuration.
     
@@ -23,17 +38,46 @@ def main(environment: str):
     - project_config.yaml (central configuration)
     - configs/{environment}.yml (environment-specific overrides)
     """
+    # The pipeline pulls in ZenML, pandas, scikit-learn and all steps, so it
+    # is only imported once the CLI arguments are parsed (`--help` stays fast)
+    from materializers.fused_materializer import (
+        fusion_summary,
+        release_fused_artifacts,
+    )
+    from orchestrators.parallel_local_orchestrator import (
+        ParallelLocalOrchestratorSettings,
+    )
+    from pipeline.training_pipeline import get_price_prediction_pipeline
+
     config = get_config()
     
     click.echo(f"Running pipeline: {config.pipeline.name}")
     click.echo(f"Environment: {environment}")
     click.echo(f"Model: {config.model.name}")
     
-    pipeline = price_prediction_pipeline.with_options(
+    settings = {}
+    if workers is not None:
+        settings["orchestrator"] = ParallelLocalOrchestratorSettings(
+            max_workers=workers
+        )
+
+    pipeline = get_price_prediction_pipeline().with_options(
         config_path=f"configs/{environment}.yml",
+        settings=settings,
     )
-    
-    pipeline()
+    if fused:
+        pipeline(fused=True)
+
+        summary = fusion_summary()
+        click.echo(
+            f"Fused mode kept {summary['artifacts']} intermediate artifacts "
+            f"({summary['loads']} loads) in memory, avoiding an estimated "
+            f"{summary['bytes'] / 1e6:.2f} MB and {summary['seconds']:.3f}s "
+            "of artifact I/O."
+        )
+        release_fused_artifacts()
+    else:
+        pipeline()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,17 @@
+#!/usr/bin/env bash
+
+set -Eeo pipefail
+
+# Runs independent pipeline steps (e.g. the data analysis branch and
+# training) concurrently on the local machine.
+zenml orchestrator flavor register orchestrators.parallel_local_orchestrator.ParallelLocalOrchestratorFlavor
+
+zenml orchestrator register parallel_local \
+    --flavor=parallel_local \
+    --max_workers=4
+
+zenml stack register parallel_local_gitflow_stack \
+    -a default \
+    -o parallel_local
+
+zenml stack set parallel_local_gitflow_stack
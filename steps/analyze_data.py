@@ -3,10 +3,15 @@ from typing import Annotated, Dict
 
 import numpy as np
 import pandas as pd
-from zenml import log_metadata, step
+from zenml import step
+
+from utils.instrumentation import instrumented
+from utils.metadata_buffer import buffered_metadata, log_metadata
 
 
 @step
+@buffered_metadata
+@instrumented
 def analyze_data(data: pd.DataFrame) -> Annotated[Dict, "data_analysis"]:
     """Analyze the dataset and compute various statistics."""
     analysis = {}
@@ -0,0 +1,95 @@
+from typing import Annotated, Dict, Optional
+
+import pandas as pd
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.pipeline import Pipeline
+from zenml import get_step_context, step
+from zenml.client import Client
+from zenml.logger import get_logger
+
+from steps.train_model import CATEGORICAL_FEATURES, NUMERIC_FEATURES, TARGET
+from utils.instrumentation import instrumented
+from utils.metadata_buffer import log_metadata
+from utils.smoke import (
+    CONFIDENCE,
+    DEFAULT_TOLERANCES,
+    SMOKE_TAG,
+    bootstrap_intervals,
+)
+from utils.smoke import check_guard_bands as check_bands
+from utils.smoke import reference_metrics
+
+logger = get_logger(__name__)
+
+
+# Not buffered: the guard bands are logged right away, so they are recorded
+# when the step fails
+@step(enable_cache=False)
+@instrumented
+def check_guard_bands(
+    model: Pipeline,
+    holdout_data: pd.DataFrame,
+    tolerances: Optional[Dict[str, float]] = None,
+) -> Annotated[Dict, "guard_bands"]:
+    """Fail a smoke run whose model is significantly worse than a full run."""
+    client = Client()
+    model_version = get_step_context().model
+
+    # Keep the scaled-down model out of promotions and guard references
+    client.update_model_version(
+        model_name_or_id=model_version.name,
+        version_name_or_id=model_version.id,
+        add_tags=[SMOKE_TAG],
+    )
+    reference_version, reference = reference_metrics(client, model_version.name)
+
+    y_true = holdout_data[TARGET]
+    y_pred = model.predict(
+        holdout_data[CATEGORICAL_FEATURES + NUMERIC_FEATURES]
+    )
+    results = check_bands(
+        bootstrap_intervals(y_true, y_pred),
+        reference,
+        {**DEFAULT_TOLERANCES, **(tolerances or {})},
+    )
+    results["r2_score"]["value"] = round(float(r2_score(y_true, y_pred)), 4)
+    results["rmse"]["value"] = round(
+        float(mean_squared_error(y_true, y_pred) ** 0.5), 4
+    )
+
+    guard_bands = {
+        "reference_version": reference_version,
+        "confidence": CONFIDENCE,
+        "holdout_rows": len(holdout_data),
+        "metrics": results,
+        "passed": all(result["passed"] for result in results.values()),
+    }
+    log_metadata(metadata={"guard_bands": guard_bands})
+
+    if reference is None:
+        logger.warning(
+            "No full training run of model `%s` found, the guard bands are "
+            "not checked.",
+            model_version.name,
+        )
+    for metric, result in results.items():
+        logger.info(
+            "%s: %.4f, %.0f%% interval %s, reference %s, limit %s: %s",
+            metric,
+            result["value"],
+            CONFIDENCE * 100,
+            result["interval"],
+            result["reference"],
+            result["limit"],
+            "passed" if result["passed"] else "FAILED",
+        )
+    if not guard_bands["passed"]:
+        failed = [
+            metric for metric, result in results.items() if not result["passed"]
+        ]
+        raise RuntimeError(
+            f"The smoke model regressed on {', '.join(failed)} against model "
+            f"version `{reference_version}` beyond the guard bands."
+        )
+
+    return guard_bands
@@ -3,10 +3,16 @@ from typing import Annotated
 
 import numpy as np
 import pandas as pd
-from zenml import log_metadata, step
+from zenml import step
 
+from materializers.arrow_materializer import ArrowDataFrameMaterializer
+from utils.instrumentation import instrumented
+from utils.metadata_buffer import buffered_metadata, log_metadata
 
-@step
+
+@step(output_materializers=ArrowDataFrameMaterializer)
+@buffered_metadata
+@instrumented
 def clean_data(data: pd.DataFrame) -> Annotated[pd.DataFrame, "cleaned_data"]:
     """Clean the dataset by handling missing values and outliers."""
     # Store pre-cleaning stats
@@ -16,17 +22,15 @@ def clean_data(data: pd.DataFrame) -> Annotated[pd.DataFrame, "cleaned_data"]:
     # Handle missing values
     cleaned_data = data.copy()
 
-    # Fill missing brand_rating with median
-    cleaned_data["brand_rating"].fillna(
-        cleaned_data["brand_rating"].median(), inplace=True
-    )
-
-    # Fill missing num_reviews with 0
-    cleaned_data["num_reviews"].fillna(0, inplace=True)
-
-    # Fill missing shipping_weight with mean
-    cleaned_data["shipping_weight"].fillna(
-        cleaned_data["shipping_weight"].mean(), inplace=True
+    # Fill missing brand_rating with the median, num_reviews with 0 and
+    # shipping_weight with the mean. Filling a column in place through
+    # `cleaned_data[column]` only changes a copy under copy-on-write.
+    cleaned_data = cleaned_data.fillna(
+        {
+            "brand_rating": cleaned_data["brand_rating"].median(),
+            "num_reviews": 0,
+            "shipping_weight": cleaned_data["shipping_weight"].mean(),
+        }
     )
 
     # Handle outliers in price (capping at 3 std devs)
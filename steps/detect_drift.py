@@ -0,0 +1,89 @@
+from typing import Annotated, Any, Dict, Optional, Tuple
+
+from zenml import get_step_context, step
+from zenml.client import Client
+from zenml.enums import ModelStages
+from zenml.logger import get_logger
+
+from utils.instrumentation import instrumented, phase
+from utils.metadata_buffer import buffered_metadata, log_metadata
+from utils.sketch import (
+    DEFAULT_DISTANCE_THRESHOLD,
+    DEFAULT_PSI_THRESHOLD,
+    compare_sketches,
+    drifted_features,
+)
+
+logger = get_logger(__name__)
+
+SKETCH_ARTIFACT_NAME = "data_sketch"
+
+
+def _production_sketch(
+    model_name: str,
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """The production version of a model and the sketch of its data."""
+    try:
+        model_version = Client().get_model_version(
+            model_name, ModelStages.PRODUCTION
+        )
+    except KeyError:
+        return None, None
+    artifact = model_version.get_artifact(SKETCH_ARTIFACT_NAME)
+    if artifact is None:
+        return model_version.name, None
+    return model_version.name, artifact.load()
+
+
+@step(enable_cache=False)
+@buffered_metadata
+@instrumented
+def detect_drift(
+    sketch: Dict,
+    psi_threshold: float = DEFAULT_PSI_THRESHOLD,
+    distance_threshold: float = DEFAULT_DISTANCE_THRESHOLD,
+) -> Annotated[Dict, "drift_report"]:
+    """Compare the data with the training data of the production model."""
+    model_name = get_step_context().model.name
+    with phase("fetch_reference"):
+        reference_version, reference = _production_sketch(model_name)
+
+    scores, drifted = {}, []
+    if reference is None:
+        reason = (
+            f"model `{model_name}` has no production version"
+            if reference_version is None
+            else f"production version `{reference_version}` has no sketch"
+        )
+    else:
+        with phase("compare"):
+            scores = compare_sketches(reference, sketch)
+            drifted = drifted_features(
+                scores, psi_threshold, distance_threshold
+            )
+        reason = (
+            f"drift in {', '.join(drifted)}"
+            if drifted
+            else f"no drift against production version `{reference_version}`"
+        )
+
+    report = {
+        "retrain": reference is None or bool(drifted),
+        "reason": reason,
+        "reference_version": reference_version,
+        "psi_threshold": psi_threshold,
+        "distance_threshold": distance_threshold,
+        "drifted_features": drifted,
+        "max_psi": max((s["psi"] for s in scores.values()), default=None),
+        "max_distance": max(
+            (s["distance"] for s in scores.values()), default=None
+        ),
+        "scores": scores,
+    }
+    log_metadata(metadata={"drift": report})
+    logger.info(
+        "%s: %s.",
+        "Retraining" if report["retrain"] else "Skipping training",
+        reason,
+    )
+    return report
@@ -2,13 +2,30 @@ import datetime
 from typing import Annotated, Dict
 
 import pandas as pd
-from zenml import log_metadata, step
+from zenml import step
 from zenml.types import HTMLString
 
+from materializers.arrow_materializer import INPUT_COLUMNS_KEY
+from utils.instrumentation import instrumented, phase
+from utils.metadata_buffer import buffered_metadata, log_metadata
 from utils.utils import generate_data_report
 
 
-@step()
+@step(
+    # The report only plots these columns of the cleaned data
+    extra={
+        INPUT_COLUMNS_KEY: {
+            "cleaned_data": [
+                "category",
+                "price",
+                "manufacturing_cost",
+                "shipping_weight",
+            ]
+        }
+    },
+)
+@buffered_metadata
+@instrumented
 def generate_data_analysis_report(
     raw_data: pd.DataFrame, cleaned_data: pd.DataFrame, analysis: Dict
 ) -> Annotated[HTMLString, "data_analysis_report"]:
@@ -31,8 +48,8 @@ def generate_data_analysis_report(
         },
     )
 
-    return HTMLString(
-        generate_data_report(
+    with phase("report_render"):
+        report = generate_data_report(
             cleaned_data=cleaned_data, raw_data=raw_data, analysis=analysis
         )
-    )
+    return HTMLString(report)
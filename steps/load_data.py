@@ -1,20 +1,29 @@
 import datetime
-from typing import Annotated
+from typing import Annotated, Dict, Tuple
 
 import numpy as np
 import pandas as pd
-from zenml import log_metadata, step
+from zenml import step
 
+from materializers.arrow_materializer import ArrowDataFrameMaterializer
+from utils.instrumentation import instrumented, phase
+from utils.metadata_buffer import buffered_metadata, log_metadata
+from utils.sketch import build_sketch
 from utils.utils import mock_data
 
 
-@step
-def load_data(n_samples: int = 1000) -> Annotated[pd.DataFrame, "raw_data"]:
+@step(output_materializers={"raw_data": ArrowDataFrameMaterializer})
+@buffered_metadata
+@instrumented
+def load_data(
+    n_samples: int = 1000,
+) -> Tuple[Annotated[pd.DataFrame, "raw_data"], Annotated[Dict, "data_sketch"]]:
     """Load synthetic product price data with various features."""
     # Create synthetic e-commerce dataset
     np.random.seed(42)
 
-    df = mock_data(n_samples)
+    with phase("generate"):
+        df = mock_data(n_samples)
 
     # Calculate and log detailed metrics
     missing_stats = df.isnull().sum().to_dict()
@@ -56,4 +65,9 @@ def load_data(n_samples: int = 1000) -> Annotated[pd.DataFrame, "raw_data"]:
         },
     )
 
-    return df
+    # Compact summary of the features, compared by `detect_drift` with the
+    # training data of later runs
+    with phase("sketch"):
+        sketch = build_sketch(df)
+
+    return df, sketch
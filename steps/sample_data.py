@@ -0,0 +1,46 @@
+from typing import Annotated, Tuple
+
+import pandas as pd
+from zenml import step
+
+from materializers.arrow_materializer import ArrowDataFrameMaterializer
+from utils.instrumentation import instrumented
+from utils.metadata_buffer import buffered_metadata, log_metadata
+from utils.smoke import stratified_sample
+
+# Strata of the subsample, the segments the model report breaks down
+STRATA = ["category", "discount_offered"]
+
+# Enough held-out rows for tight bootstrap intervals
+MAX_HOLDOUT_ROWS = 20_000
+
+
+@step(output_materializers=ArrowDataFrameMaterializer)
+@buffered_metadata
+@instrumented
+def sample_data(
+    data: pd.DataFrame, fraction: float = 0.2
+) -> Tuple[
+    Annotated[pd.DataFrame, "smoke_data"],
+    Annotated[pd.DataFrame, "holdout_data"],
+]:
+    """Split a stratified training subsample and held-out rows off the data."""
+    sample = stratified_sample(data, fraction, by=STRATA)
+    holdout = stratified_sample(
+        data.drop(index=sample.index),
+        fraction=1.0,
+        by=STRATA,
+        max_rows=MAX_HOLDOUT_ROWS,
+    )
+
+    log_metadata(
+        metadata={
+            "fraction": fraction,
+            "rows": len(data),
+            "sample_rows": len(sample),
+            "holdout_rows": len(holdout),
+            "strata": STRATA,
+        }
+    )
+
+    return sample.reset_index(drop=True), holdout.reset_index(drop=True)
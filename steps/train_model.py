@@ -1,53 +1,93 @@
 import datetime
-from typing import Annotated, Tuple
+import pickle
+from typing import Annotated, Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+from sklearn.base import clone
 from sklearn.compose import ColumnTransformer
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from zenml import ArtifactConfig, log_metadata, step
+from zenml import ArtifactConfig, get_step_context, step
+from zenml.client import Client
+from zenml.config import CachePolicy
 from zenml.enums import ArtifactType
 from zenml.types import HTMLString
 
-from utils.utils import generate_model_report
+from materializers.arrow_materializer import INPUT_COLUMNS_KEY
+from utils.ensemble import CategoryEnsemble
+from utils.evaluation import segment_metrics
+from utils.fingerprint import fingerprint
+from utils.importance import (
+    feature_index_map,
+    permutation_budget,
+    permutation_importance,
+)
+from utils.instrumentation import instrumented, phase
+from utils.learning_curve import LearningCurve
+from utils.metadata_buffer import buffered_metadata, log_metadata
+from utils.utils import downsample_predictions, generate_model_report
 
+# Define features and target
+# Note: We exclude product_id since it's just an identifier
+CATEGORICAL_FEATURES = ["category", "discount_offered"]
+NUMERIC_FEATURES = [
+    "brand_rating",
+    "num_reviews",
+    "days_since_release",
+    "shipping_weight",
+    "competitors_price",
+    "manufacturing_cost",
+]
+TARGET = "price"
+MODEL_ARTIFACT_NAME = "price_prediction_model"
+REPORT_ARTIFACT_NAME = "model_report"
 
-@step(enable_cache=False)
-def train_model(
-    data: pd.DataFrame, epochs: int
-) -> Tuple[
-    Annotated[
-        Pipeline,
-        ArtifactConfig(
-            name="price_prediction_model",
-            artifact_type=ArtifactType.MODEL,
-        ),
-    ],
-    Annotated[HTMLString, "model_report"],
-]:
-    """Train a model to predict product prices."""
+# Size of the per-category models relative to the global model
+COMPACT_ESTIMATORS_PER_EPOCH = 5
+COMPACT_MAX_DEPTH = 3
 
-    # Define features and target
-    # Note: We exclude product_id since it's just an identifier
-    categorical_features = ["category", "discount_offered"]
-    numeric_features = [
-        "brand_rating",
-        "num_reviews",
-        "days_since_release",
-        "shipping_weight",
-        "competitors_price",
-        "manufacturing_cost",
-    ]
+# Metadata of the production model copied to a reused model
+REUSED_METADATA_KEYS = (
+    "metrics",
+    "epochs",
+    "feature_importance",
+    "permutation_importance",
+    "segment_metrics",
+)
 
-    features = categorical_features + numeric_features
-    X = data[features]
-    y = data["price"]
+# Cache on the content of the training data instead of the artifact IDs, so a
+# run with unchanged data, parameters and code reuses the previous model and
+# report, even if the upstream steps ran again. The DataFrame materializers
+# compute the content hashes. ZenML only hashes the step function, so this
+# module (the model and its hyperparameters) and the helpers that shape the
+# outputs are part of the key.
+TRAIN_MODEL_CACHE_POLICY = CachePolicy(
+    include_artifact_values=True,
+    include_artifact_ids=False,
+    file_dependencies=[
+        "steps/train_model.py",
+        "utils/ensemble.py",
+        "utils/evaluation.py",
+        "utils/fingerprint.py",
+        "utils/importance.py",
+        "utils/learning_curve.py",
+        "utils/report_assets.py",
+        "utils/shared_arrays.py",
+        "utils/templates/model_report.html",
+        "utils/templates/report.css",
+        "utils/utils.py",
+    ],
+)
 
-    # Create preprocessing pipeline
+
+def _build_model(
+    categorical_features: List[str], n_estimators: int, max_depth: int
+) -> Pipeline:
+    """Preprocessing and gradient boosting on the given categorical features."""
     numeric_transformer = Pipeline(steps=[("scaler", StandardScaler())])
 
     categorical_transformer = Pipeline(
@@ -56,113 +96,244 @@ def train_model(
 
     preprocessor = ColumnTransformer(
         transformers=[
-            ("num", numeric_transformer, numeric_features),
+            ("num", numeric_transformer, NUMERIC_FEATURES),
             ("cat", categorical_transformer, categorical_features),
         ]
     )
 
-    # Create model pipeline
-    model = Pipeline(
+    return Pipeline(
         steps=[
             ("preprocessor", preprocessor),
             (
                 "regressor",
                 GradientBoostingRegressor(
-                    n_estimators=epochs
-                    * 10,  # Use epochs to control complexity
+                    n_estimators=n_estimators,
                     learning_rate=0.1,
-                    max_depth=4,
+                    max_depth=max_depth,
                     random_state=42,
                 ),
             ),
         ]
     )
 
+
+def log_model_metadata(metadata: Dict[str, Any]) -> None:
+    """
+    Log the metadata of the trained model once, on the model artifact.
+
+    The step itself only gets the headline metrics, so the full payload is
+    not stored twice.
+
+    Args:
+        metadata: Metrics, importances and curves of the model.
+    """
+    log_metadata(
+        artifact_name=MODEL_ARTIFACT_NAME,
+        infer_artifact=True,
+        metadata=metadata,
+    )
+    if "metrics" in metadata:
+        log_metadata(metadata={"metrics": metadata["metrics"]})
+
+
+def _model_summary(
+    model: Any, fit_seconds: float, y_true, y_pred, categories
+) -> Dict[str, Any]:
+    """Fit time, pickled size and held-out accuracy of a model."""
+    return {
+        "fit_seconds": round(fit_seconds, 3),
+        "size_bytes": len(pickle.dumps(model)),
+        "rmse": round(float(mean_squared_error(y_true, y_pred) ** 0.5), 4),
+        "r2_score": round(float(r2_score(y_true, y_pred)), 4),
+        "categories": segment_metrics(y_true, y_pred, categories),
+    }
+
+
+def _reuse_production_model(drift: Dict) -> Tuple[Pipeline, HTMLString]:
+    """
+    Return the model and report of the production version instead of training.
+
+    The metrics of the production model are logged again, so promotions
+    compare the reused model like a trained one.
+
+    Args:
+        drift: The report of `detect_drift`, naming the production version.
+
+    Returns:
+        The production model and its report.
+    """
+    model_version = Client().get_model_version(
+        get_step_context().model.name, drift["reference_version"]
+    )
+    with phase("load_production_model"):
+        model_artifact = model_version.get_artifact(MODEL_ARTIFACT_NAME)
+        model = model_artifact.load()
+        report = model_version.get_artifact(REPORT_ARTIFACT_NAME).load()
+
+    metadata = {
+        key: model_artifact.run_metadata[key]
+        for key in REUSED_METADATA_KEYS
+        if key in model_artifact.run_metadata
+    }
+    metadata["reused_version"] = model_version.name
+    metadata["drift_reason"] = drift["reason"]
+    metadata["timestamp"] = datetime.datetime.now().isoformat()
+    log_model_metadata(metadata)
+    return model, HTMLString(str(report))
+
+
+@step(
+    enable_cache=True,
+    cache_policy=TRAIN_MODEL_CACHE_POLICY,
+    # Only load the model columns of the training data
+    extra={
+        INPUT_COLUMNS_KEY: {
+            "data": CATEGORICAL_FEATURES + NUMERIC_FEATURES + [TARGET]
+        }
+    },
+)
+@buffered_metadata
+@instrumented
+def train_model(
+    data: pd.DataFrame,
+    epochs: int,
+    drift: Optional[Dict] = None,
+    per_category: bool = False,
+) -> Tuple[
+    Annotated[
+        Pipeline,
+        ArtifactConfig(
+            name=MODEL_ARTIFACT_NAME,
+            artifact_type=ArtifactType.MODEL,
+        ),
+    ],
+    Annotated[HTMLString, REPORT_ARTIFACT_NAME],
+]:
+    """Train a model to predict product prices."""
+    if drift is not None and not drift["retrain"]:
+        # The data did not drift from the training data of the production
+        # model, so retraining would not change it
+        return _reuse_production_model(drift)
+
+    categorical_features = CATEGORICAL_FEATURES
+    numeric_features = NUMERIC_FEATURES
+
+    features = categorical_features + numeric_features
+    X = data[features]
+    y = data[TARGET]
+
+    model = _build_model(
+        categorical_features, n_estimators=epochs * 10, max_depth=4
+    )
+
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
 
+    # Learning curve: the regressor refitted on growing fractions of the
+    # training set, in a pool while the full model trains
+    curve_features = clone(model.named_steps["preprocessor"]).fit(X_train)
+    curve = LearningCurve(
+        model.named_steps["regressor"],
+        curve_features.transform(X_train),
+        y_train,
+        curve_features.transform(X_test),
+        y_test,
+    )
+
     # Train the model
-    model.fit(X_train, y_train)
+    with curve:
+        with phase("fit"):
+            if per_category:
+                # One compact model per category, fitted in a process pool. The
+                # global model is fitted alongside, it predicts rare categories
+                # and is the baseline of the comparison.
+                ensemble = CategoryEnsemble(
+                    estimator=_build_model(
+                        [f for f in categorical_features if f != "category"],
+                        n_estimators=epochs * COMPACT_ESTIMATORS_PER_EPOCH,
+                        max_depth=COMPACT_MAX_DEPTH,
+                    ),
+                    fallback=model,
+                    column="category",
+                )
+                output_model = Pipeline(steps=[("regressor", ensemble)])
+                output_model.fit(X_train, y_train)
+                model = ensemble.fallback_
+            else:
+                model.fit(X_train, y_train)
+                output_model = model
 
-    # Make predictions
-    y_pred = model.predict(X_test)
+        with phase("learning_curve"):
+            # The full model is the last point of the curve
+            learning_curve = curve.result(
+                mean_squared_error(y_train, model.predict(X_train)),
+                mean_squared_error(y_test, model.predict(X_test)),
+            )
+    preprocessor = model.named_steps["preprocessor"]
 
-    # Calculate metrics
-    r2 = r2_score(y_test, y_pred)
-    mse = mean_squared_error(y_test, y_pred)
-    rmse = np.sqrt(mse)
-    mae = mean_absolute_error(y_test, y_pred)
+    with phase("evaluate"):
+        # Make predictions
+        y_pred = output_model.predict(X_test)
 
-    # Get feature importance from the model
-    gbr = model.named_steps["regressor"]
+        # Calculate metrics
+        r2 = r2_score(y_test, y_pred)
+        mse = mean_squared_error(y_test, y_pred)
+        rmse = np.sqrt(mse)
+        mae = mean_absolute_error(y_test, y_pred)
 
-    # Get feature names after preprocessing
-    feature_names = []
-    # Add numeric feature names directly
-    feature_names.extend(numeric_features)
-    # Get one-hot encoded feature names
-    ohe = preprocessor.named_transformers_["cat"].named_steps["onehot"]
-    categorical_feature_names = ohe.get_feature_names_out(
-        categorical_features
-    ).tolist()
-    feature_names.extend(categorical_feature_names)
-
-    # Ensure feature_importance matches the actual features
-    # If the gradient boosting model has fewer features than we expect,
-    # we'll just use the first N importance values
-    importances = (
-        gbr.feature_importances_[: len(feature_names)]
-        if len(gbr.feature_importances_) > len(feature_names)
-        else gbr.feature_importances_
-    )
+        # Break the held-out metrics down by category and discount segment
+        segment_performance = {
+            segment: segment_metrics(y_test, y_pred, X_test[segment])
+            for segment in categorical_features
+        }
 
-    # Map feature names to importance values
-    raw_feature_importance = dict(zip(feature_names, importances))
-
-    # We need to combine one-hot encoded importances back to original features
-    feature_importance = {}
-    for feature, importance in raw_feature_importance.items():
-        # For numeric features, just copy the importance
-        if feature in numeric_features:
-            feature_importance[feature] = round(importance, 4)
-        else:
-            # For categorical features, extract the original feature name
-            # Format is typically feature_value
-            original_feature = feature.split("_")[0]
-            feature_importance[original_feature] = round(
-                feature_importance.get(original_feature, 0) + importance, 4
+        if per_category:
+            per_category_comparison = {
+                "workers": ensemble.workers_,
+                "global": _model_summary(
+                    model,
+                    ensemble.fit_seconds_["fallback"],
+                    y_test,
+                    model.predict(X_test),
+                    X_test["category"],
+                ),
+                "ensemble": _model_summary(
+                    ensemble,
+                    ensemble.fit_seconds_["wall"],
+                    y_test,
+                    y_pred,
+                    X_test["category"],
+                ),
+            }
+            # Time the category models would take one after another, and
+            # their size without the fallback
+            per_category_comparison["ensemble"].update(
+                serial_fit_seconds=round(
+                    sum(ensemble.fit_seconds_["categories"].values()), 3
+                ),
+                category_models_bytes=len(pickle.dumps(ensemble.models_)),
             )
 
-    # Create learning curves by using cross-validation
-    cv_scores = []
-    train_sizes = [
-        int(epochs * i / 5) for i in range(1, 6)
-    ]  # 5 points on the learning curve
+    # Impurity importance of the model columns, added up per input feature
+    # through the column map of the preprocessor
+    gbr = model.named_steps["regressor"]
+    feature_columns = feature_index_map(preprocessor)
+    feature_importance = {
+        feature: round(float(gbr.feature_importances_[columns].sum()), 4)
+        for feature, columns in feature_columns.items()
+    }
 
-    for n in train_sizes:
-        gbr_cv = GradientBoostingRegressor(
-            n_estimators=n * 10, learning_rate=0.1, max_depth=4, random_state=42
+    # Loss increase on the held-out rows when a feature is shuffled
+    with phase("permutation_importance"):
+        permutation = permutation_importance(
+            gbr,
+            preprocessor.transform(X_test),
+            y_test,
+            feature_columns,
+            budget_seconds=permutation_budget(),
         )
-        model_cv = Pipeline(
-            steps=[("preprocessor", preprocessor), ("regressor", gbr_cv)]
-        )
-        model_cv.fit(X_train, y_train)
-        train_score = -mean_squared_error(y_train, model_cv.predict(X_train))
-        test_score = -mean_squared_error(y_test, model_cv.predict(X_test))
-        cv_scores.append((train_score, test_score))
-
-    # Extract training and validation loss
-    train_loss = [-score[0] for score in cv_scores]
-    val_loss = [-score[1] for score in cv_scores]
-
-    # Create learning curves (real)
-    learning_curve = {
-        "epochs": train_sizes,
-        "train_loss": train_loss,
-        "val_loss": val_loss,
-    }
 
     # Create model output
     model_metrics = {
@@ -173,15 +344,18 @@ def train_model(
             "mae": round(float(mae), 4),
         },
         "feature_importance": feature_importance,
+        "segment_metrics": segment_performance,
         "learning_curve": learning_curve,
+        "prediction_range": float(max(y_test.max(), y_pred.max())),
         "model_params": {
             "epochs": epochs,
-            "model_type": "GradientBoostingRegressor",
+            "model_type": type(output_model.named_steps["regressor"]).__name__,
             "features": features,
-            "timestamp": datetime.datetime.now().isoformat(),
         },
+        "data_fingerprint": fingerprint(data),
     }
 
+    # Timestamps only go into the metadata, the outputs stay deterministic
     metadata = {
         "metrics": {
             "r2_score": round(float(r2), 4),
@@ -191,19 +365,24 @@ def train_model(
         },
         "epochs": epochs,
         "feature_importance": feature_importance,
+        "segment_metrics": segment_performance,
+        "permutation_importance": permutation,
+        "learning_curve": learning_curve,
         "timestamp": datetime.datetime.now().isoformat(),
     }
+    if per_category:
+        metadata["per_category"] = per_category_comparison
 
     # Log detailed metrics about the model
-    log_metadata(
-        artifact_name="price_prediction_model",
-        infer_artifact=True,
-        metadata=metadata,
-    )
+    log_model_metadata(metadata)
 
-    # Log detailed metrics about the model
-    log_metadata(metadata=metadata)
+    with phase("report_render"):
+        # Only a fixed budget of held-out predictions ends up in the report
+        predictions = downsample_predictions(
+            actual=y_test, predicted=y_pred, categories=X_test["category"]
+        )
+        report = generate_model_report(
+            model=model_metrics, predictions=predictions
+        )
 
-    return model, HTMLString(
-        generate_model_report(data=data, model=model_metrics)
-    )
+    return output_model, HTMLString(report)
@@ -0,0 +1,351 @@
+import datetime
+import warnings
+from typing import Annotated, Any, Dict, Tuple
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import SGDRegressor
+from sklearn.metrics import mean_squared_error
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import (
+    KBinsDiscretizer,
+    OneHotEncoder,
+    StandardScaler,
+)
+from zenml import ArtifactConfig, step
+from zenml.config import CachePolicy
+from zenml.enums import ArtifactType
+from zenml.types import HTMLString
+
+from materializers.arrow_materializer import INPUT_COLUMNS_KEY, DataFrameChunks
+from steps.train_model import (
+    CATEGORICAL_FEATURES,
+    MODEL_ARTIFACT_NAME,
+    NUMERIC_FEATURES,
+    REPORT_ARTIFACT_NAME,
+    TARGET,
+    log_model_metadata,
+)
+from utils.evaluation import SegmentSums
+from utils.fingerprint import DataFrameFingerprint
+from utils.importance import (
+    feature_index_map,
+    permutation_budget,
+    permutation_importance,
+)
+from utils.instrumentation import instrumented, phase
+from utils.metadata_buffer import buffered_metadata
+from utils.shared_arrays import dense
+from utils.streaming import BottomKSample, holdout_mask, row_hashes
+from utils.utils import downsample_predictions, generate_model_report
+
+# Rows read, transformed and fitted at a time
+CHUNK_ROWS = 100_000
+
+# The hold-out split hashes the product ID, so every product is on one side
+SPLIT_KEY = "product_id"
+HOLDOUT_FRACTION = 0.2
+
+# Training rows the preprocessor is fitted on (bin edges, scaling and
+# categories), and held-out rows kept for the curve, the importances and the
+# report's scatter plot
+SAMPLE_ROWS = 200_000
+EVALUATION_ROWS = 20_000
+
+# Quantile bins per numeric feature, the model is linear in the bins
+QUANTILE_BINS = 32
+
+# Same cache key inputs as `train_model`, plus this module (the model and its
+# bins) and the chunked reader
+TRAIN_MODEL_STREAMING_CACHE_POLICY = CachePolicy(
+    include_artifact_values=True,
+    include_artifact_ids=False,
+    file_dependencies=[
+        "materializers/arrow_materializer.py",
+        "steps/train_model.py",
+        "steps/train_model_streaming.py",
+        "utils/evaluation.py",
+        "utils/fingerprint.py",
+        "utils/importance.py",
+        "utils/report_assets.py",
+        "utils/shared_arrays.py",
+        "utils/streaming.py",
+        "utils/templates/model_report.html",
+        "utils/templates/report.css",
+        "utils/utils.py",
+    ],
+)
+
+
+def _build_model() -> Pipeline:
+    """Preprocessing and a linear model on scaled values and quantile bins."""
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), NUMERIC_FEATURES),
+            (
+                "bins",
+                KBinsDiscretizer(
+                    n_bins=QUANTILE_BINS, encode="onehot", strategy="quantile"
+                ),
+                NUMERIC_FEATURES,
+            ),
+            (
+                "cat",
+                OneHotEncoder(handle_unknown="ignore"),
+                CATEGORICAL_FEATURES,
+            ),
+        ]
+    )
+    return Pipeline(
+        steps=[
+            ("preprocessor", preprocessor),
+            (
+                "regressor",
+                SGDRegressor(alpha=1e-6, average=True, random_state=42),
+            ),
+        ]
+    )
+
+
+def _sample(data: DataFrameChunks, chunk_rows: int) -> Dict[str, Any]:
+    """
+    Sample the training and held-out rows and fingerprint the data.
+
+    Args:
+        data: The training data.
+        chunk_rows: Rows read at a time.
+
+    Returns:
+        The samples of training and held-out rows, the number of rows of
+        both sets and the fingerprint of the model columns.
+    """
+    columns = CATEGORICAL_FEATURES + NUMERIC_FEATURES + [TARGET]
+    train_sample = BottomKSample(SAMPLE_ROWS)
+    evaluation_sample = BottomKSample(EVALUATION_ROWS)
+    data_fingerprint = DataFrameFingerprint()
+    train_rows = holdout_rows = 0
+    for chunk in data.iter_chunks(chunk_rows):
+        # Same fingerprint as `train_model` computes for the whole data
+        data_fingerprint.update(chunk[columns])
+        hashes = row_hashes(chunk, SPLIT_KEY)
+        holdout = holdout_mask(hashes, HOLDOUT_FRACTION)
+        train_sample.update(chunk.loc[~holdout, columns], hashes[~holdout])
+        evaluation_sample.update(chunk.loc[holdout, columns], hashes[holdout])
+        holdout_rows += int(holdout.sum())
+        train_rows += len(chunk) - int(holdout.sum())
+
+    if not train_rows or not holdout_rows:
+        raise ValueError(
+            f"The hold-out split left {train_rows} training and "
+            f"{holdout_rows} held-out rows, both sets need rows."
+        )
+    return {
+        "train": train_sample.rows,
+        "evaluation": evaluation_sample.rows,
+        "train_rows": train_rows,
+        "holdout_rows": holdout_rows,
+        "data_fingerprint": data_fingerprint.hexdigest(),
+    }
+
+
+@step(
+    enable_cache=True,
+    cache_policy=TRAIN_MODEL_STREAMING_CACHE_POLICY,
+    # Only read the model columns and the split key of the training data
+    extra={
+        INPUT_COLUMNS_KEY: {
+            "data": CATEGORICAL_FEATURES
+            + NUMERIC_FEATURES
+            + [TARGET, SPLIT_KEY]
+        }
+    },
+)
+@buffered_metadata
+@instrumented
+def train_model_streaming(
+    data: DataFrameChunks,
+    epochs: int,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Tuple[
+    Annotated[
+        Pipeline,
+        ArtifactConfig(
+            name=MODEL_ARTIFACT_NAME,
+            artifact_type=ArtifactType.MODEL,
+        ),
+    ],
+    Annotated[HTMLString, REPORT_ARTIFACT_NAME],
+]:
+    """Train a price model on the data in chunks, in bounded memory."""
+    features = CATEGORICAL_FEATURES + NUMERIC_FEATURES
+    model = _build_model()
+    preprocessor = model.named_steps["preprocessor"]
+    regressor = model.named_steps["regressor"]
+
+    # First pass: the bin edges, scaling and categories come from a uniform
+    # sample of the training rows
+    with phase("sample"):
+        sample = _sample(data, chunk_rows)
+        with warnings.catch_warnings():
+            # Integer features (e.g. `num_reviews`) repeat quantiles, the
+            # discretizer merges their bins
+            warnings.filterwarnings("ignore", message="Bins whose width")
+            preprocessor.fit(sample["train"][features])
+        # The regressor learns the standardized price
+        y_mean = float(sample["train"][TARGET].mean())
+        y_std = float(sample["train"][TARGET].std()) or 1.0
+
+        X_sample = preprocessor.transform(sample["train"][features])
+        y_sample = sample["train"][TARGET].to_numpy()
+        evaluation = sample["evaluation"]
+        X_eval = preprocessor.transform(evaluation[features])
+        y_eval = evaluation[TARGET].to_numpy()
+
+    # One pass over the training rows per epoch, in a new chunk order every
+    # time. The losses after every epoch are measured on the samples.
+    learning_curve = {
+        "train_fraction": [],
+        "train_rows": [],
+        "train_loss": [],
+        "val_loss": [],
+    }
+    rng = np.random.default_rng(42)
+    rows_seen = 0
+    with phase("fit"):
+        for epoch in range(epochs):
+            for chunk in data.iter_chunks(chunk_rows, seed=epoch):
+                hashes = row_hashes(chunk, SPLIT_KEY)
+                train = chunk[~holdout_mask(hashes, HOLDOUT_FRACTION)]
+                if train.empty:
+                    continue
+                order = rng.permutation(len(train))
+                X = preprocessor.transform(train[features])[order]
+                y = (train[TARGET].to_numpy()[order] - y_mean) / y_std
+                regressor.partial_fit(X, y)
+                rows_seen += len(y)
+
+            learning_curve["train_fraction"].append(
+                round(rows_seen / sample["train_rows"], 4)
+            )
+            learning_curve["train_rows"].append(rows_seen)
+            for key, X_loss, y_loss in (
+                ("train_loss", X_sample, y_sample),
+                ("val_loss", X_eval, y_eval),
+            ):
+                y_loss_pred = y_mean + y_std * regressor.predict(X_loss)
+                learning_curve[key].append(
+                    round(float(mean_squared_error(y_loss, y_loss_pred)), 4)
+                )
+
+        # Predict the price directly
+        regressor.coef_ = regressor.coef_ * y_std
+        regressor.intercept_ = regressor.intercept_ * y_std + y_mean
+
+    with phase("evaluate"):
+        # All held-out rows, the metrics are accumulated chunk by chunk
+        segment_sums = {
+            segment: SegmentSums() for segment in CATEGORICAL_FEATURES
+        }
+        prediction_range = 0.0
+        for chunk in data.iter_chunks(chunk_rows):
+            holdout = chunk[
+                holdout_mask(row_hashes(chunk, SPLIT_KEY), HOLDOUT_FRACTION)
+            ]
+            if holdout.empty:
+                continue
+            y_true = holdout[TARGET].to_numpy()
+            y_pred = model.predict(holdout[features])
+            for segment, sums in segment_sums.items():
+                sums.update(y_true, y_pred, holdout[segment])
+            prediction_range = max(
+                prediction_range, float(y_true.max()), float(y_pred.max())
+            )
+
+        total = segment_sums[CATEGORICAL_FEATURES[0]].total()
+        segment_performance = {
+            segment: sums.metrics() for segment, sums in segment_sums.items()
+        }
+
+    # Share of the variance of the predictions on the held-out sample that
+    # every input feature contributes
+    feature_columns = feature_index_map(preprocessor)
+    X_eval = dense(X_eval)
+    contribution_variance = {
+        feature: float(np.var(X_eval[:, columns] @ regressor.coef_[columns]))
+        for feature, columns in feature_columns.items()
+    }
+    variance_total = sum(contribution_variance.values()) or 1.0
+    feature_importance = {
+        feature: round(variance / variance_total, 4)
+        for feature, variance in contribution_variance.items()
+    }
+
+    # Loss increase on the held-out sample when a feature is shuffled
+    with phase("permutation_importance"):
+        permutation = permutation_importance(
+            regressor,
+            X_eval,
+            y_eval,
+            feature_columns,
+            budget_seconds=permutation_budget(),
+        )
+
+    metrics = {
+        "r2_score": (
+            round(total["r2_score"], 4)
+            if total["r2_score"] is not None
+            else None
+        ),
+        "mse": round(total["mse"], 4),
+        "rmse": round(total["rmse"], 4),
+        "mae": round(total["mae"], 4),
+    }
+    streaming = {
+        "rows": data.num_rows,
+        "train_rows": sample["train_rows"],
+        "holdout_rows": sample["holdout_rows"],
+        "chunk_rows": chunk_rows,
+        "sample_rows": len(sample["train"]),
+        "evaluation_rows": len(evaluation),
+    }
+
+    # Create model output
+    model_metrics = {
+        "metrics": metrics,
+        "feature_importance": feature_importance,
+        "segment_metrics": segment_performance,
+        "learning_curve": learning_curve,
+        "prediction_range": prediction_range,
+        "model_params": {
+            "epochs": epochs,
+            "model_type": type(regressor).__name__,
+            "features": features,
+        },
+        "data_fingerprint": sample["data_fingerprint"],
+    }
+
+    # Timestamps only go into the metadata, the outputs stay deterministic
+    metadata = {
+        "metrics": metrics,
+        "epochs": epochs,
+        "feature_importance": feature_importance,
+        "segment_metrics": segment_performance,
+        "permutation_importance": permutation,
+        "learning_curve": learning_curve,
+        "streaming": streaming,
+        "timestamp": datetime.datetime.now().isoformat(),
+    }
+    log_model_metadata(metadata)
+
+    with phase("report_render"):
+        # The scatter plot shows the held-out sample
+        predictions = downsample_predictions(
+            actual=y_eval,
+            predicted=model.predict(evaluation[features]),
+            categories=evaluation["category"],
+        )
+        report = generate_model_report(
+            model=model_metrics, predictions=predictions
+        )
+
+    return model, HTMLString(report)
@@ -0,0 +1,54 @@
+import time
+
+import pandas as pd
+from zenml import step
+from zenml.logger import get_logger
+
+from utils.instrumentation import instrumented
+from utils.metadata_buffer import log_metadata
+from utils.utils import CATEGORIES
+from utils.validation import ColumnRule, CompiledSchema
+
+logger = get_logger(__name__)
+
+# Schema of the cleaned data, compiled once when the step is imported.
+# Cleaning fills all missing values and keeps the prices positive.
+CLEANED_DATA_SCHEMA = CompiledSchema(
+    [
+        ColumnRule("product_id", "string"),
+        ColumnRule("category", "category", allowed=CATEGORIES),
+        ColumnRule("brand_rating", "numeric", min=1, max=5),
+        ColumnRule("num_reviews", "numeric", min=0),
+        ColumnRule("days_since_release", "numeric", min=0),
+        ColumnRule("discount_offered", "bool"),
+        ColumnRule("shipping_weight", "numeric", min=0),
+        ColumnRule("competitors_price", "numeric", min=0),
+        ColumnRule("manufacturing_cost", "numeric", min=0),
+        ColumnRule("price", "numeric", min=0),
+    ]
+)
+
+
+# Not buffered: the violations are logged right away, so they are recorded
+# when the step fails
+@step
+@instrumented
+def validate_data(data: pd.DataFrame) -> None:
+    """Stop the pipeline if the cleaned data breaks its schema."""
+    start = time.perf_counter()
+    report = CLEANED_DATA_SCHEMA.validate(data)
+    report["seconds"] = round(time.perf_counter() - start, 4)
+    report["passed"] = not report["violations"]
+    log_metadata(metadata={"validation": report})
+
+    if report["violations"]:
+        raise ValueError(
+            f"The cleaned data has {len(report['violations'])} schema "
+            "violations:\n" + "\n".join(report["violations"])
+        )
+    logger.info(
+        "Validated %d rows in %d chunks in %.3fs.",
+        report["rows"],
+        report["chunks"],
+        report["seconds"],
+    )
@@ -0,0 +1,155 @@
+"""Tests of `promote.py --best` against a local ZenML store."""
+
+import uuid
+from typing import Dict, List, Optional
+
+import pytest
+
+from promote import MODEL_ARTIFACT_NAME, promote_best, select_promotion
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    """A ZenML client of a fresh local store, shared by the module."""
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setenv(
+        "ZENML_CONFIG_PATH", str(tmp_path_factory.mktemp("zenml"))
+    )
+    monkeypatch.setenv("ZENML_ANALYTICS_OPT_IN", "false")
+
+    from zenml.client import Client
+    from zenml.config.global_config import GlobalConfiguration
+
+    GlobalConfiguration._reset_instance()
+    Client._reset_instance()
+    yield Client()
+
+    GlobalConfiguration._reset_instance()
+    Client._reset_instance()
+    monkeypatch.undo()
+
+
+def _create_model(
+    client, r2_scores: List[float], tags: Optional[Dict[int, str]] = None
+) -> str:
+    """
+    Create a model with one version per score.
+
+    Args:
+        client: The ZenML client.
+        r2_scores: R² of the model artifact of every version, in order.
+        tags: Tag of some versions, by their index in `r2_scores`.
+
+    Returns:
+        The name of the model.
+    """
+    from zenml import Model, link_artifact_to_model, log_metadata, save_artifact
+
+    tags = tags or {}
+    model_name = f"model_{uuid.uuid4().hex[:8]}"
+    client.create_model(name=model_name)
+    for index, r2_score in enumerate(r2_scores):
+        model_version = client.create_model_version(
+            model_name, tags=[tags[index]] if index in tags else None
+        )
+        artifact = save_artifact(index, name=MODEL_ARTIFACT_NAME)
+        link_artifact_to_model(
+            artifact, model=Model(name=model_name, version=model_version.name)
+        )
+        log_metadata(
+            {"metrics": {"r2_score": r2_score}},
+            artifact_version_id=artifact.id,
+        )
+    return model_name
+
+
+def _stages(client, model_name: str) -> Dict[str, Optional[str]]:
+    """Stage of every version of a model, by version name."""
+    return {
+        model_version.name: model_version.stage
+        for model_version in client.list_model_versions(
+            model=model_name, size=100
+        ).items
+    }
+
+
+def _promote_best(model_name: str, margin: float = 0.01) -> None:
+    """Run `promote.py --best` on the R² of up to 10 versions."""
+    promote_best(
+        model_name=model_name,
+        metric="r2_score",
+        margin=margin,
+        candidates=10,
+        max_workers=4,
+        dry_run=False,
+    )
+
+
+def test_select_promotion_ranks_lower_is_better_metrics():
+    """The lowest RMSE wins, the other candidates are archived."""
+    winner, losers = select_promotion(
+        {"2": 12.0, "3": 10.0, "4": 11.0},
+        production_score=11.5,
+        metric="rmse",
+        margin=0.1,
+    )
+    assert winner == "3"
+    assert losers == ["4", "2"]
+
+
+def test_select_promotion_without_production_promotes_best():
+    """Without a production version the best candidate wins."""
+    winner, losers = select_promotion(
+        {"1": 0.7, "2": 0.8}, None, "r2_score", 0.5
+    )
+    assert winner == "2"
+    assert losers == ["1"]
+
+
+def test_select_promotion_below_margin_archives_nothing():
+    """Candidates that miss the margin are neither promoted nor archived."""
+    winner, losers = select_promotion(
+        {"2": 0.805, "3": 0.79}, 0.8, "r2_score", 0.01
+    )
+    assert winner is None
+    assert losers == []
+
+
+def test_promote_best_promotes_and_archives(client):
+    """The best candidate replaces production, the others are archived."""
+    from zenml.enums import ModelStages
+
+    model_name = _create_model(
+        client, [0.8, 0.85, 0.82, 0.99], tags={3: "smoke"}
+    )
+    client.update_model_version(
+        model_name, "1", stage=ModelStages.PRODUCTION, force=True
+    )
+
+    _promote_best(model_name)
+
+    assert _stages(client, model_name) == {
+        "1": ModelStages.ARCHIVED.value,
+        "2": ModelStages.PRODUCTION.value,
+        "3": ModelStages.ARCHIVED.value,
+        # Smoke versions are never candidates
+        "4": None,
+    }
+
+
+def test_promote_best_below_margin_changes_nothing(client):
+    """Production and the candidates keep their stages."""
+    from zenml.enums import ModelStages
+
+    model_name = _create_model(client, [0.8, 0.805, 0.79])
+    client.update_model_version(
+        model_name, "1", stage=ModelStages.PRODUCTION, force=True
+    )
+
+    _promote_best(model_name)
+
+    assert _stages(client, model_name) == {
+        "1": ModelStages.PRODUCTION.value,
+        "2": None,
+        "3": None,
+    }
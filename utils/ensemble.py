@@ -0,0 +1,139 @@
+"""
+Ensemble of one model per category, trained in a process pool.
+
+The prices of every category follow their own distribution, so a compact
+model per category can fit them as well as one large global model:
+
+    ensemble = CategoryEnsemble(
+        estimator=compact_model,  # cloned and fitted per category
+        fallback=global_model,  # predicts unknown and rare categories
+        column="category",
+    ).fit(X, y)
+    ensemble.predict(X)
+
+`fit` sends the rows of every category to a worker of a process pool and
+fits the fallback in the current process meanwhile. `predict` routes the
+rows in one vectorized pass: they are sorted by category code once, and every
+model predicts one contiguous block of rows.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+
+# Categories with fewer training rows are predicted by the fallback
+MIN_CATEGORY_ROWS = 20
+
+
+def _fit(estimator: Any, X: pd.DataFrame, y: pd.Series) -> Tuple[Any, float]:
+    """Fit an estimator in a worker, return it and the fit time."""
+    start = time.perf_counter()
+    estimator.fit(X, y)
+    return estimator, time.perf_counter() - start
+
+
+class CategoryEnsemble(RegressorMixin, BaseEstimator):
+    """One model per category, and a fallback model for the other rows."""
+
+    def __init__(
+        self,
+        estimator: Any,
+        fallback: Any,
+        column: str = "category",
+        max_workers: Optional[int] = None,
+    ) -> None:
+        """
+        Create the ensemble.
+
+        Args:
+            estimator: Model cloned and fitted for every category.
+            fallback: Model fitted on all rows, for categories without a
+                model of their own.
+            column: The category column.
+            max_workers: Number of worker processes, one per category and
+                CPU core by default.
+        """
+        self.estimator = estimator
+        self.fallback = fallback
+        self.column = column
+        self.max_workers = max_workers
+
+    def fit(self, X: pd.DataFrame, y: pd.Series) -> "CategoryEnsemble":
+        """
+        Fit the category models in a process pool and the fallback here.
+
+        Args:
+            X: The features, including the category column.
+            y: The target.
+
+        Returns:
+            The fitted ensemble.
+        """
+        start = time.perf_counter()
+        codes, categories = pd.factorize(X[self.column], sort=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+        categories = [
+            category
+            for category, count in zip(categories, counts)
+            if count >= MIN_CATEGORY_ROWS
+        ]
+        workers = min(
+            self.max_workers or os.cpu_count() or 1, max(len(categories), 1)
+        )
+
+        # Workers are spawned, forking a process with running threads (e.g.
+        # the profiler's) can deadlock
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context
+        ) as pool:
+            futures = [
+                pool.submit(_fit, clone(self.estimator), X[mask], y[mask])
+                for mask in (X[self.column] == c for c in categories)
+            ]
+            self.fallback_, fallback_seconds = _fit(clone(self.fallback), X, y)
+            results = [future.result() for future in futures]
+
+        self.categories_ = pd.Index(categories)
+        self.models_ = [model for model, _ in results]
+        self.fit_seconds_ = {
+            "wall": time.perf_counter() - start,
+            "fallback": fallback_seconds,
+            "categories": {
+                str(category): seconds
+                for category, (_, seconds) in zip(categories, results)
+            },
+        }
+        self.workers_ = workers
+        return self
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        Predict every row with the model of its category.
+
+        Args:
+            X: The features, including the category column.
+
+        Returns:
+            The predictions, in the order of the rows.
+        """
+        # Code -1 marks categories without a model
+        codes = self.categories_.get_indexer(X[self.column])
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(
+            codes[order], np.arange(-1, len(self.models_) + 1)
+        )
+
+        predictions = np.empty(len(X))
+        models = [self.fallback_] + self.models_
+        for model, start, end in zip(models, bounds[:-1], bounds[1:]):
+            if start < end:
+                rows = order[start:end]
+                predictions[rows] = model.predict(X.iloc[rows])
+        return predictions
@@ -0,0 +1,129 @@
+"""
+Evaluation helpers for the price prediction model.
+
+Everything in here works on plain numpy/pandas inputs so it can be used from
+the training step as well as from ad-hoc analysis code.
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+
+class SegmentSums:
+    """
+    Per-segment error sums of predictions that arrive in chunks of rows.
+
+    The sums are all RMSE, MAE and R² need, so the metrics of many chunks are
+    exact without keeping the predictions:
+
+        sums = SegmentSums()
+        for chunk in chunks:
+            sums.update(chunk_true, chunk_pred, chunk_segments)
+        sums.metrics()
+    """
+
+    def __init__(self) -> None:
+        """Start without rows."""
+        # Count, squared error, absolute error, target and squared target
+        self.sums: Dict[Any, np.ndarray] = {}
+
+    def update(self, y_true, y_pred, segments) -> None:
+        """
+        Add the rows of a chunk.
+
+        The rows are factorized into integer segment codes once and all
+        per-segment sums are reduced with `np.bincount`, so the cost is
+        linear in the number of rows and independent of the number of
+        segments.
+
+        Args:
+            y_true: True target values.
+            y_pred: Predictions, aligned with `y_true`.
+            segments: Segment label of every row, aligned with `y_true`.
+        """
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_pred = np.asarray(y_pred, dtype=np.float64)
+        codes, labels = pd.factorize(np.asarray(segments), sort=True)
+
+        n_segments = len(labels)
+        error = y_true - y_pred
+        sums = np.stack(
+            [
+                np.bincount(codes, minlength=n_segments),
+                np.bincount(codes, weights=error * error, minlength=n_segments),
+                np.bincount(codes, weights=np.abs(error), minlength=n_segments),
+                np.bincount(codes, weights=y_true, minlength=n_segments),
+                np.bincount(
+                    codes, weights=y_true * y_true, minlength=n_segments
+                ),
+            ],
+            axis=1,
+        ).astype(np.float64)
+        for label, row in zip(labels, sums):
+            if label in self.sums:
+                self.sums[label] += row
+            else:
+                self.sums[label] = row
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """
+        The metrics of every segment so far.
+
+        Returns:
+            Mapping of segment label (as string) to its `count`, `rmse`,
+            `mae` and `r2_score`, sorted by label.
+        """
+        return {
+            str(label): _metrics_from_sums(self.sums[label])
+            for label in sorted(self.sums)
+        }
+
+    def total(self) -> Dict[str, float]:
+        """
+        The metrics of all rows so far, unrounded.
+
+        Returns:
+            The `count`, `mse`, `rmse`, `mae` and `r2_score` of all rows. R²
+            is None if the target is constant.
+        """
+        count, sse, sae, sum_y, sum_y2 = sum(self.sums.values())
+        sst = sum_y2 - sum_y * sum_y / count
+        return {
+            "count": int(count),
+            "mse": float(sse / count),
+            "rmse": float(np.sqrt(sse / count)),
+            "mae": float(sae / count),
+            "r2_score": float(1.0 - sse / sst) if sst > 0 else None,
+        }
+
+
+def _metrics_from_sums(sums: np.ndarray) -> Dict[str, float]:
+    """Rounded RMSE, MAE and R² from the sums of `SegmentSums`."""
+    count, sse, sae, sum_y, sum_y2 = sums
+    sst = sum_y2 - sum_y * sum_y / count
+    return {
+        "count": int(count),
+        "rmse": round(float(np.sqrt(sse / count)), 4),
+        "mae": round(float(sae / count), 4),
+        "r2_score": round(float(1.0 - sse / sst), 4) if sst > 0 else None,
+    }
+
+
+def segment_metrics(y_true, y_pred, segments) -> Dict[str, Dict[str, float]]:
+    """
+    Compute RMSE, MAE and R² for every segment in one vectorized pass.
+
+    Args:
+        y_true: True target values.
+        y_pred: Predictions, aligned with `y_true`.
+        segments: Segment label of every row, aligned with `y_true`.
+
+    Returns:
+        Mapping of segment label (as string) to its `count`, `rmse`, `mae`
+        and `r2_score`.
+    """
+    sums = SegmentSums()
+    sums.update(y_true, y_pred, segments)
+    return sums.metrics()
@@ -0,0 +1,62 @@
+import hashlib
+import pickle
+from typing import Any
+
+import pandas as pd
+
+
+class DataFrameFingerprint:
+    """
+    Fingerprint of a DataFrame fed in consecutive chunks of rows.
+
+    The chunks must carry the row labels of the whole DataFrame, the result
+    is then the same as `fingerprint` of the concatenated DataFrame.
+    """
+
+    def __init__(self) -> None:
+        """Start an empty fingerprint."""
+        self._hash = hashlib.sha256()
+        self._columns_hashed = False
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Add the next rows.
+
+        Args:
+            chunk: The rows, with the columns of all other chunks.
+        """
+        if not self._columns_hashed:
+            self._hash.update(repr(list(chunk.columns)).encode())
+            self._hash.update(
+                repr([str(dtype) for dtype in chunk.dtypes]).encode()
+            )
+            self._columns_hashed = True
+        self._hash.update(
+            pd.util.hash_pandas_object(chunk, index=True).to_numpy()
+        )
+
+    def hexdigest(self) -> str:
+        """The hex-encoded SHA-256 fingerprint of the rows so far."""
+        return self._hash.hexdigest()
+
+
+def fingerprint(data: Any) -> str:
+    """
+    Compute a content fingerprint of an artifact.
+
+    DataFrames are hashed from their column names, dtypes and a row-wise hash
+    of their values (including the index), so the fingerprint does not depend
+    on how the DataFrame is serialized. Other objects are hashed from their
+    pickled bytes.
+
+    Args:
+        data: The artifact data.
+
+    Returns:
+        The hex-encoded SHA-256 fingerprint.
+    """
+    if isinstance(data, pd.DataFrame):
+        frame_fingerprint = DataFrameFingerprint()
+        frame_fingerprint.update(data)
+        return frame_fingerprint.hexdigest()
+    return hashlib.sha256(pickle.dumps(data)).hexdigest()
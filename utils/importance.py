@@ -0,0 +1,219 @@
+"""
+Feature importance of the preprocessed model, per input feature.
+
+The preprocessor turns every input feature into one or more model columns
+(one-hot encoding, quantile bins). `feature_index_map` maps every input
+feature to its columns, so importances are added up per input feature
+exactly, whatever the feature and category names look like.
+
+Impurity importance, as reported by tree ensembles, is biased towards
+features with many split points. `permutation_importance` measures instead
+how much the held-out loss grows when the columns of a feature are shuffled,
+which breaks the feature's relation to the target:
+
+- the held-out rows are subsampled to `max_rows`,
+- every task shuffles one feature several times and predicts all shuffled
+  copies in one stacked batch,
+- tasks run in a process pool, on the features in shared memory (small
+  held-out sets in one thread instead),
+- shuffling goes on in rounds (one task per feature) until `n_repeats`
+  shuffles per feature, or until the next round would exceed the time
+  budget. Every feature gets at least one shuffle.
+"""
+
+import contextlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import KBinsDiscretizer, OneHotEncoder
+
+from utils.shared_arrays import ArraySpecs, SharedArrays, dense, open_arrays
+
+# Key of the step `extra` config with the time budget in seconds
+PERMUTATION_BUDGET_KEY = "permutation_importance_budget_seconds"
+DEFAULT_BUDGET_SECONDS = 30.0
+DEFAULT_REPEATS = 10
+DEFAULT_MAX_ROWS = 20_000
+
+# Rows of the shuffled copies predicted in one call
+MAX_BATCH_ROWS = 200_000
+
+# Smaller held-out sets are shuffled in one thread of the step process,
+# starting worker processes would take longer
+MIN_POOL_ROWS = 5_000
+
+# Model and arrays of the worker, set once when it starts
+_worker: Dict[str, Any] = {}
+
+
+def feature_index_map(preprocessor: ColumnTransformer) -> Dict[str, List[int]]:
+    """
+    Map every input feature to its columns in the preprocessed features.
+
+    Args:
+        preprocessor: The fitted preprocessor. Transformers are pipelines or
+            single transformers, one-hot encoders or one-hot binners last.
+            A feature may go through several transformers.
+
+    Returns:
+        The column indices per input feature, in the order of the columns.
+    """
+    groups: Dict[str, List[int]] = {}
+    for name, transformer, columns in preprocessor.transformers_:
+        if name not in preprocessor.output_indices_ or transformer == "drop":
+            continue
+        start = preprocessor.output_indices_[name].start
+        encoder = (
+            transformer[-1] if hasattr(transformer, "steps") else transformer
+        )
+        if isinstance(encoder, OneHotEncoder):
+            widths = [len(categories) for categories in encoder.categories_]
+        elif (
+            isinstance(encoder, KBinsDiscretizer) and encoder.encode == "onehot"
+        ):
+            widths = list(encoder.n_bins_)
+        else:
+            widths = [1] * len(columns)
+        for column, width in zip(columns, widths):
+            groups.setdefault(column, []).extend(range(start, start + width))
+            start += width
+    return groups
+
+
+def permutation_budget() -> float:
+    """Time budget of the permutation importance, from the step config."""
+    # Imported here, the worker processes import this module without ZenML
+    from zenml import get_step_context
+
+    try:
+        extra = get_step_context().step_run.config.extra
+    except RuntimeError:
+        return DEFAULT_BUDGET_SECONDS
+    return float(extra.get(PERMUTATION_BUDGET_KEY, DEFAULT_BUDGET_SECONDS))
+
+
+def _init_worker(model: Any, specs: ArraySpecs) -> None:
+    """Keep the model and the shared arrays for the tasks of a process."""
+    blocks, arrays = open_arrays(specs)
+    _worker.update(model=model, blocks=blocks, **arrays)
+
+
+def _shuffled_losses(columns: List[int], seeds: List[int]) -> List[float]:
+    """Loss (MSE) of the model with the columns shuffled once per seed."""
+    X, y = _worker["X"], _worker["y"]
+    batch = np.tile(X, (len(seeds), 1))
+    for index, seed in enumerate(seeds):
+        rows = np.random.default_rng(seed).permutation(len(X))
+        batch[index * len(X) : (index + 1) * len(X), columns] = X[
+            np.ix_(rows, columns)
+        ]
+    errors = _worker["model"].predict(batch).reshape(len(seeds), len(X)) - y
+    return np.mean(errors * errors, axis=1).tolist()
+
+
+def permutation_importance(
+    model: Any,
+    X: Any,
+    y: Any,
+    groups: Dict[str, List[int]],
+    n_repeats: int = DEFAULT_REPEATS,
+    budget_seconds: float = DEFAULT_BUDGET_SECONDS,
+    max_rows: int = DEFAULT_MAX_ROWS,
+    max_workers: Optional[int] = None,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    """
+    Measure the permutation importance of every input feature.
+
+    Args:
+        model: The fitted model, predicting the preprocessed features.
+        X: Preprocessed held-out features.
+        y: Held-out target.
+        groups: Columns of every input feature, see `feature_index_map`.
+        n_repeats: Shuffles per feature.
+        budget_seconds: Time after which no new round of shuffles starts.
+        max_rows: Held-out rows used.
+        max_workers: Number of worker processes, one per feature and CPU
+            core by default.
+        seed: Seed of the subsample and the shuffles.
+
+    Returns:
+        The mean and standard deviation of the loss increase per feature,
+        the baseline loss, the number of rows, shuffles per feature and
+        seconds, and whether the budget stopped the shuffling.
+    """
+    start = time.perf_counter()
+    X, y = dense(X), dense(y)
+    rng = np.random.default_rng(seed)
+    if len(X) > max_rows:
+        rows = rng.choice(len(X), max_rows, replace=False)
+        X, y = X[rows], y[rows]
+    errors = model.predict(X) - y
+    baseline = float(np.mean(errors * errors))
+    batch_repeats = max(1, MAX_BATCH_ROWS // max(len(X), 1))
+
+    losses: Dict[str, List[float]] = {feature: [] for feature in groups}
+    repeats, last_round = 0, 0.0
+    deadline = start + budget_seconds
+    with contextlib.ExitStack() as stack:
+        if len(X) >= MIN_POOL_ROWS:
+            shared = stack.enter_context(SharedArrays({"X": X, "y": y}))
+            pool: Executor = ProcessPoolExecutor(
+                max_workers=min(
+                    max_workers or os.cpu_count() or 1, len(groups)
+                ),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model, shared.specs),
+            )
+        else:
+            pool = ThreadPoolExecutor(
+                max_workers=1,
+                initializer=_worker.update,
+                initargs=({"model": model, "X": X, "y": y},),
+            )
+            stack.callback(_worker.clear)
+        stack.enter_context(pool)
+
+        while repeats < n_repeats:
+            round_start = time.perf_counter()
+            if repeats and round_start + last_round > deadline:
+                break
+            count = min(batch_repeats, n_repeats - repeats)
+            futures = {
+                feature: pool.submit(
+                    _shuffled_losses,
+                    columns,
+                    rng.integers(2**32, size=count).tolist(),
+                )
+                for feature, columns in groups.items()
+            }
+            for feature, future in futures.items():
+                losses[feature].extend(future.result())
+            repeats += count
+            last_round = time.perf_counter() - round_start
+
+    importance = {
+        feature: {
+            "mean": round(float(np.mean(values) - baseline), 4),
+            "std": round(float(np.std(values)), 4),
+        }
+        for feature, values in losses.items()
+    }
+    return {
+        "importance": importance,
+        "baseline_mse": round(baseline, 4),
+        "rows": len(X),
+        "repeats": repeats,
+        "seconds": round(time.perf_counter() - start, 3),
+        "budget_exhausted": repeats < n_repeats,
+    }
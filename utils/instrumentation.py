@@ -0,0 +1,235 @@
+"""
+Timing and memory instrumentation for steps.
+
+Steps decorated with `instrumented` record their wall time, CPU time, peak
+RSS, tracemalloc peak and the timings of named phases, and log them as step
+metadata under `instrumentation`:
+
+    @step
+    @buffered_metadata
+    @instrumented
+    def my_step(...):
+        with phase("fit"):
+            model.fit(X, y)
+
+The metadata has a stable schema (see `SCHEMA_VERSION`), so it can be
+charted across runs, e.g. for `train_model` with
+`python leaderboard.py top --metric instrumentation.wall_seconds`:
+
+    {
+        "schema_version": 1,
+        "wall_seconds": float,
+        "cpu_seconds": float,
+        "rss_start_mb": float,
+        "peak_rss_mb": float,
+        "tracemalloc_peak_mb": float | None,
+        "phases": {name: {"wall_seconds": float, "cpu_seconds": float}},
+    }
+
+CPU time, RSS and tracemalloc are process-wide. When steps run concurrently
+in one process (see `orchestrators/parallel_local_orchestrator.py`), they
+include the other steps running at the same time.
+
+tracemalloc slows down allocation-heavy Python code (`train_model` takes
+about twice as long with it). It can be disabled per step with the `extra`
+config key `TRACEMALLOC_KEY`, in which case `tracemalloc_peak_mb` is None.
+
+Instrumented steps can also run under a profiler, see `utils/profiling.py`.
+"""
+
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import psutil
+from zenml import get_step_context
+
+from utils.metadata_buffer import log_metadata
+from utils.profiling import PROFILE_KEY, profile_call
+
+SCHEMA_VERSION = 1
+METADATA_KEY = "instrumentation"
+
+# Key of the step `extra` config enabling tracemalloc (default: True)
+TRACEMALLOC_KEY = "instrument_tracemalloc"
+
+# Interval at which the RSS is sampled to find its peak
+RSS_SAMPLE_SECONDS = 0.05
+
+_active: contextvars.ContextVar[
+    Optional["Instrumentation"]
+] = contextvars.ContextVar("instrumentation", default=None)
+
+# tracemalloc is process-wide, it runs while any instrumented step does
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_started = False
+
+
+def _start_tracemalloc() -> None:
+    """Start tracemalloc for one more user and reset its peak."""
+    global _tracemalloc_started, _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            # Leave tracemalloc running if someone else started it
+            tracemalloc.start()
+            _tracemalloc_started = True
+        tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc() -> float:
+    """Get the tracemalloc peak in MB, stop tracemalloc after the last user."""
+    global _tracemalloc_started, _tracemalloc_users
+    with _tracemalloc_lock:
+        _, peak = tracemalloc.get_traced_memory()
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_started:
+            tracemalloc.stop()
+            _tracemalloc_started = False
+    return peak / 1e6
+
+
+class _RSSSampler(threading.Thread):
+    """Background thread tracking the peak RSS of this process."""
+
+    def __init__(self) -> None:
+        super().__init__(daemon=True)
+        self._process = psutil.Process()
+        self._stop_event = threading.Event()
+        self.start_rss = self.peak_rss = self._process.memory_info().rss
+
+    def run(self) -> None:
+        while not self._stop_event.wait(RSS_SAMPLE_SECONDS):
+            self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+        self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+
+
+class Instrumentation:
+    """Measurements of one instrumented block, with its phases."""
+
+    def __init__(self, trace_allocations: bool = True) -> None:
+        """
+        Initialize the instrumentation.
+
+        Args:
+            trace_allocations: Whether to measure the tracemalloc peak.
+        """
+        self.trace_allocations = trace_allocations
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.result: Optional[Dict[str, Any]] = None
+
+    @contextlib.contextmanager
+    def measure(self) -> Iterator["Instrumentation"]:
+        """Measure the enclosed block and store the result in `result`."""
+        sampler = _RSSSampler()
+        sampler.start()
+        if self.trace_allocations:
+            _start_tracemalloc()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+            wall_seconds = time.perf_counter() - wall_start
+            cpu_seconds = time.process_time() - cpu_start
+            tracemalloc_peak_mb = None
+            if self.trace_allocations:
+                tracemalloc_peak_mb = round(_stop_tracemalloc(), 3)
+            sampler.stop()
+
+            self.result = {
+                "schema_version": SCHEMA_VERSION,
+                "wall_seconds": round(wall_seconds, 4),
+                "cpu_seconds": round(cpu_seconds, 4),
+                "rss_start_mb": round(sampler.start_rss / 1e6, 1),
+                "peak_rss_mb": round(sampler.peak_rss / 1e6, 1),
+                "tracemalloc_peak_mb": tracemalloc_peak_mb,
+                "phases": {
+                    name: {
+                        key: round(value, 4) for key, value in timing.items()
+                    }
+                    for name, timing in self.phases.items()
+                },
+            }
+
+    def add_phase(
+        self, name: str, wall_seconds: float, cpu_seconds: float
+    ) -> None:
+        """Add the time of a phase, phases entered repeatedly add up."""
+        timing = self.phases.setdefault(
+            name, {"wall_seconds": 0.0, "cpu_seconds": 0.0}
+        )
+        timing["wall_seconds"] += wall_seconds
+        timing["cpu_seconds"] += cpu_seconds
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Time a named phase of the running instrumented step.
+
+    Does nothing but run the block when no instrumented step is running.
+
+    Args:
+        name: Name of the phase, e.g. "fit".
+    """
+    instrumentation = _active.get()
+    if instrumentation is None:
+        yield
+        return
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        instrumentation.add_phase(
+            name,
+            wall_seconds=time.perf_counter() - wall_start,
+            cpu_seconds=time.process_time() - cpu_start,
+        )
+
+
+def instrumented(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Measure a step function and log the measurements as step metadata.
+
+    Apply it below `@step` (and below `@buffered_metadata`, so the
+    measurements are flushed with the other metadata of the step).
+
+    Args:
+        func: The step function.
+
+    Returns:
+        The wrapped step function.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        trace_allocations, profile = True, None
+        try:
+            extra = get_step_context().step_run.config.extra
+            trace_allocations = bool(extra.get(TRACEMALLOC_KEY, True))
+            profile = extra.get(PROFILE_KEY)
+        except RuntimeError:
+            pass
+
+        instrumentation = Instrumentation(trace_allocations=trace_allocations)
+        with instrumentation.measure():
+            if profile:
+                result = profile_call(func, args, kwargs, options=profile)
+            else:
+                result = func(*args, **kwargs)
+        log_metadata(metadata={METADATA_KEY: instrumentation.result})
+        return result
+
+    return wrapper
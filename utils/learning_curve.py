@@ -0,0 +1,196 @@
+"""
+Learning curves over the training set size, fitted in the background.
+
+A learning curve shows the training and validation loss of the model trained
+on growing fractions of the training set. If the validation loss still falls
+at the full training set, more data pays off; if both losses are close and
+flat, more capacity does.
+
+The features are preprocessed once and copied into shared memory, where the
+worker processes read them without copying. Every worker fits the model on
+the first rows of one fixed permutation, so the subsets are nested. The fits
+run while the step trains the full model, and the full model provides the
+last point of the curve:
+
+    with LearningCurve(regressor, X_train, y_train, X_val, y_val) as curve:
+        model.fit(...)
+    learning_curve = curve.result(full_train_loss, full_val_loss)
+
+Training sets with fewer than `MIN_POOL_ROWS` rows are fitted on threads of
+the step process instead, also while the full model trains.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error
+
+from utils.shared_arrays import ArraySpecs, SharedArrays, attach, dense
+
+# Fractions of the training set fitted by the workers, the full training set
+# is the model trained by the step
+TRAIN_FRACTIONS = (0.1, 0.25, 0.5, 0.75)
+
+# Smaller training sets are fitted on threads, starting the worker processes
+# would take longer than the fits
+MIN_POOL_ROWS = 10_000
+
+
+def _fit_subset(
+    estimator: Any, arrays: Dict[str, np.ndarray], rows: int, seed: int
+) -> Tuple[float, float]:
+    """Fit on the first rows of the permutation, return both losses."""
+    subset = np.random.default_rng(seed).permutation(len(arrays["y_train"]))[
+        :rows
+    ]
+    X, y = arrays["X_train"][subset], arrays["y_train"][subset]
+
+    estimator.fit(X, y)
+    train_loss = mean_squared_error(y, estimator.predict(X))
+    val_loss = mean_squared_error(
+        arrays["y_val"], estimator.predict(arrays["X_val"])
+    )
+    return float(train_loss), float(val_loss)
+
+
+def _fit_fraction(
+    estimator: Any, specs: ArraySpecs, rows: int, seed: int
+) -> Tuple[float, float]:
+    """Fit in a worker, on the arrays in shared memory."""
+    with attach(specs) as arrays:
+        return _fit_subset(estimator, arrays, rows, seed)
+
+
+class LearningCurve:
+    """Fits of one estimator on growing training fractions, in a pool."""
+
+    def __init__(
+        self,
+        estimator: Any,
+        X_train: Any,
+        y_train: Any,
+        X_val: Any,
+        y_val: Any,
+        fractions: Sequence[float] = TRAIN_FRACTIONS,
+        max_workers: Optional[int] = None,
+        seed: int = 42,
+    ) -> None:
+        """
+        Prepare the fits.
+
+        Args:
+            estimator: The estimator, cloned for every fit. It gets the
+                preprocessed features.
+            X_train: Preprocessed training features.
+            y_train: Training target.
+            X_val: Preprocessed validation features.
+            y_val: Validation target.
+            fractions: Fractions of the training rows to fit on.
+            max_workers: Number of workers, one per fraction and CPU core by
+                default.
+            seed: Seed of the row permutation.
+        """
+        self.estimator = estimator
+        self.arrays = {
+            "X_train": dense(X_train),
+            "y_train": dense(y_train),
+            "X_val": dense(X_val),
+            "y_val": dense(y_val),
+        }
+        self.total_rows = len(self.arrays["y_train"])
+        self.fractions = list(fractions)
+        self.rows = [
+            max(1, int(self.total_rows * fraction)) for fraction in fractions
+        ]
+        self.max_workers = max_workers
+        self.seed = seed
+        self._shared: Optional[SharedArrays] = None
+        self._futures: List[Future] = []
+        self._pool: Optional[Executor] = None
+
+    def __enter__(self) -> "LearningCurve":
+        """Copy the features into shared memory and start the fits."""
+        workers = min(self.max_workers or os.cpu_count() or 1, len(self.rows))
+        if self.total_rows < MIN_POOL_ROWS:
+            self._pool = ThreadPoolExecutor(max_workers=workers)
+            self._futures = [
+                self._pool.submit(
+                    _fit_subset,
+                    clone(self.estimator),
+                    self.arrays,
+                    rows,
+                    self.seed,
+                )
+                for rows in self.rows
+            ]
+            return self
+
+        # The step keeps the arrays in shared memory only
+        self._shared = SharedArrays(self.arrays)
+        self.arrays = {}
+
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._futures = [
+            self._pool.submit(
+                _fit_fraction,
+                clone(self.estimator),
+                self._shared.specs,
+                rows,
+                self.seed,
+            )
+            for rows in self.rows
+        ]
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Cancel the fits if the step failed."""
+        if exc_info[0] is not None:
+            self._close(cancel=True)
+
+    def _close(self, cancel: bool = False) -> None:
+        """Shut the pool down and free the shared memory."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=cancel)
+            self._pool = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def result(
+        self, full_train_loss: float, full_val_loss: float
+    ) -> Dict[str, Any]:
+        """
+        Wait for the fits and add the point of the full training set.
+
+        Args:
+            full_train_loss: Training loss of the model fitted on all rows.
+            full_val_loss: Validation loss of that model.
+
+        Returns:
+            The training fractions and rows with their training and
+            validation losses (MSE).
+        """
+        try:
+            results = [future.result() for future in self._futures]
+        finally:
+            self._close()
+        return {
+            "train_fraction": self.fractions + [1.0],
+            "train_rows": self.rows + [self.total_rows],
+            "train_loss": [round(r[0], 4) for r in results]
+            + [round(full_train_loss, 4)],
+            "val_loss": [round(r[1], 4) for r in results]
+            + [round(full_val_loss, 4)],
+        }
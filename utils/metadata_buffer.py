@@ -0,0 +1,265 @@
+"""
+Buffered, size-capped metadata logging for steps.
+
+`zenml.log_metadata` sends step metadata to the server on every call, and the
+steps log large nested payloads (descriptive statistics, value counts per
+categorical column, ...) that grow with the number of columns and distinct
+values. Steps decorated with `buffered_metadata` instead collect everything
+logged through `log_metadata` below and flush it once when the step
+function returns:
+
+    @step
+    @buffered_metadata
+    def my_step(data: pd.DataFrame) -> Annotated[pd.DataFrame, "output"]:
+        log_metadata(metadata={...}, artifact_name="output", infer_artifact=True)
+        log_metadata(metadata={...})
+
+Entries logged for the same target (the step or one of its outputs) are
+merged, so keys logged repeatedly are sent once, with the last value. Every
+target's payload is capped at a byte budget (JSON-serialized). The largest
+keys that do not fit are moved into one gzip-compressed overflow artifact
+per step, `<step name>_metadata_overflow`, and the target's metadata
+records where they went under `metadata_overflow`.
+
+The budget defaults to `DEFAULT_METADATA_BUDGET_BYTES` and can be set per
+step with the `extra` config key `METADATA_BUDGET_KEY`, in code or in
+`configs/*.yml`.
+
+Outside of a step (e.g. when calling `my_step.entrypoint(...)` directly),
+logged metadata is dropped.
+"""
+
+import contextvars
+import functools
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from zenml import get_step_context
+from zenml import log_metadata as zenml_log_metadata
+from zenml import save_artifact
+from zenml.logger import get_logger
+
+from materializers.compressed_json_materializer import (
+    CompressedJSONMaterializer,
+)
+
+logger = get_logger(__name__)
+
+# Key of the step `extra` config holding the metadata budget per target
+METADATA_BUDGET_KEY = "metadata_budget_bytes"
+DEFAULT_METADATA_BUDGET_BYTES = 8 * 1024
+
+OVERFLOW_KEY = "metadata_overflow"
+OVERFLOW_ARTIFACT_SUFFIX = "_metadata_overflow"
+
+# Target of metadata logged for the step run itself
+STEP_TARGET = "step"
+
+_active_buffer: contextvars.ContextVar[
+    Optional["MetadataBuffer"]
+] = contextvars.ContextVar("metadata_buffer", default=None)
+
+
+def _payload_size(value: Any) -> int:
+    """Size of a metadata value, serialized the way it is sent."""
+    return len(json.dumps(value, default=str))
+
+
+def split_payload(
+    metadata: Dict[str, Any], budget_bytes: int
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Split metadata into the keys that fit in a budget and the overflow.
+
+    Small keys are kept first, so a single large key does not push out
+    everything else.
+
+    Args:
+        metadata: The metadata.
+        budget_bytes: Maximum serialized size of the kept metadata.
+
+    Returns:
+        The kept metadata and the overflowing metadata.
+    """
+    sizes = {
+        key: _payload_size({key: value}) for key, value in metadata.items()
+    }
+    kept, overflow = {}, {}
+    used = 2  # The braces of the serialized dict
+    for key in sorted(metadata, key=sizes.get):
+        if used + sizes[key] <= budget_bytes:
+            kept[key] = metadata[key]
+            used += sizes[key]
+        else:
+            overflow[key] = metadata[key]
+    # Keep the order in which the keys were logged
+    kept = {key: kept[key] for key in metadata if key in kept}
+    return kept, overflow
+
+
+class MetadataBuffer:
+    """Metadata logged during one step, merged per target."""
+
+    def __init__(
+        self, budget_bytes: int = DEFAULT_METADATA_BUDGET_BYTES
+    ) -> None:
+        """
+        Initialize the buffer.
+
+        Args:
+            budget_bytes: Maximum serialized size of the metadata of every
+                target.
+        """
+        self.budget_bytes = budget_bytes
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def add(
+        self, metadata: Dict[str, Any], artifact_name: Optional[str] = None
+    ) -> None:
+        """
+        Add metadata for the step or one of its outputs.
+
+        Args:
+            metadata: The metadata.
+            artifact_name: The output the metadata belongs to, the step run if
+                None.
+        """
+        self.entries.setdefault(artifact_name or STEP_TARGET, {}).update(
+            metadata
+        )
+
+    def flush(self) -> Dict[str, Any]:
+        """
+        Log the buffered metadata, moving what exceeds the budget aside.
+
+        Output metadata is attached to the outputs when they are stored, so
+        only the step metadata (if any) and the overflow artifact (if needed)
+        cost a round-trip to the server.
+
+        Returns:
+            Statistics of the flush: logged and overflowing bytes and keys.
+        """
+        payloads, overflow = {}, {}
+        for target, metadata in self.entries.items():
+            payloads[target], overflow_metadata = split_payload(
+                metadata, self.budget_bytes
+            )
+            if overflow_metadata:
+                overflow[target] = overflow_metadata
+        self.entries = {}
+
+        if overflow:
+            step_name = get_step_context().step_run.name
+            artifact = save_artifact(
+                overflow,
+                name=f"{step_name}{OVERFLOW_ARTIFACT_SUFFIX}",
+                materializer=CompressedJSONMaterializer,
+            )
+            for target, overflow_metadata in overflow.items():
+                payloads[target][OVERFLOW_KEY] = {
+                    "artifact": artifact.name,
+                    "version": str(artifact.version),
+                    "keys": list(overflow_metadata),
+                    "bytes": _payload_size(overflow_metadata),
+                }
+
+        for target, metadata in payloads.items():
+            if target == STEP_TARGET:
+                zenml_log_metadata(metadata=metadata)
+            else:
+                zenml_log_metadata(
+                    metadata=metadata,
+                    artifact_name=target,
+                    infer_artifact=True,
+                )
+
+        return {
+            "logged_bytes": sum(map(_payload_size, payloads.values())),
+            "overflow_bytes": sum(map(_payload_size, overflow.values())),
+            "overflow_keys": sum(map(len, overflow.values())),
+        }
+
+
+def log_metadata(
+    metadata: Dict[str, Any],
+    artifact_name: Optional[str] = None,
+    infer_artifact: bool = False,
+) -> None:
+    """
+    Log metadata for the running step or one of its outputs.
+
+    Within a `buffered_metadata` step the metadata is buffered until the step
+    function returns. In other steps it is logged right away, and outside of
+    a step it is dropped.
+
+    Args:
+        metadata: The metadata.
+        artifact_name: Name of the output the metadata belongs to, the step
+            run if None.
+        infer_artifact: Must be True when `artifact_name` is given, as with
+            `zenml.log_metadata` inside a step.
+    """
+    buffer = _active_buffer.get()
+    if buffer is not None:
+        buffer.add(metadata, artifact_name=artifact_name)
+        return
+
+    try:
+        get_step_context()
+    except RuntimeError:
+        logger.debug("Not in a step, dropping metadata %s.", list(metadata))
+        return
+    zenml_log_metadata(
+        metadata=metadata,
+        artifact_name=artifact_name,
+        infer_artifact=infer_artifact,
+    )
+
+
+def buffered_metadata(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Buffer the metadata a step function logs and flush it when it returns.
+
+    Apply it below `@step`. Metadata of a step function that raises is
+    dropped along with its outputs.
+
+    Args:
+        func: The step function.
+
+    Returns:
+        The wrapped step function.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            context = get_step_context()
+        except RuntimeError:
+            context = None
+
+        budget_bytes = DEFAULT_METADATA_BUDGET_BYTES
+        if context is not None:
+            budget_bytes = context.step_run.config.extra.get(
+                METADATA_BUDGET_KEY, budget_bytes
+            )
+        buffer = MetadataBuffer(budget_bytes)
+
+        token = _active_buffer.set(buffer)
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _active_buffer.reset(token)
+
+        if context is not None:
+            stats = buffer.flush()
+            if stats["overflow_keys"]:
+                logger.info(
+                    "Moved %d metadata keys (%.1f KB) over the %d bytes "
+                    "budget into the overflow artifact.",
+                    stats["overflow_keys"],
+                    stats["overflow_bytes"] / 1e3,
+                    budget_bytes,
+                )
+        return result
+
+    return wrapper
@@ -0,0 +1,417 @@
+"""
+Local SQLite index of the metrics of pipeline runs and model versions.
+
+Comparing runs through the ZenML server means paging through runs and
+parsing the nested metadata of the trained model and `raw_data` one run at
+a time. The index keeps a flattened copy of that metadata in a local SQLite
+file, so leaderboards and comparisons are a single indexed query.
+
+Syncing is incremental: the index stores a watermark (the creation time of
+the newest run that had finished, or of the oldest one that had not) and
+only fetches runs, steps and artifacts created since then. Re-fetched rows
+are upserted, so overlapping syncs are harmless.
+
+Metric names are the flattened metadata keys, e.g. `metrics.rmse` or
+`segment_metrics.Electronics.r2_score` for the model trained by `train_model`
+or `train_model_streaming`, `instrumentation.wall_seconds` for the training
+step itself, and `raw_data.rows` for the data loaded by `load_data`.
+"""
+
+import datetime
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_INDEX_PATH = ".metrics_index.sqlite"
+
+# Steps that train the model, the pipeline runs one of them
+TRAIN_STEP_NAMES = ("train_model", "train_model_streaming")
+MODEL_ARTIFACT_NAME = "price_prediction_model"
+LOAD_STEP_NAME = "load_data"
+DATA_ARTIFACT_NAME = "raw_data"
+
+# Runs in these states are final, the watermark can move past them. Runs in
+# any other state can still change, the watermark stays before them.
+FINISHED_STATUSES = ("completed", "failed", "cached", "stopped")
+
+# ZenML's datetime filter format
+_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created TEXT NOT NULL,
+    environment TEXT,
+    model_version INTEGER,
+    data_artifact_id TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_environment ON runs (environment);
+CREATE INDEX IF NOT EXISTS runs_model_version
+    ON runs (model_version, created);
+
+CREATE TABLE IF NOT EXISTS run_tags (
+    run_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (run_id, tag)
+);
+
+CREATE TABLE IF NOT EXISTS step_metrics (
+    run_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS step_metrics_name ON step_metrics (name, value);
+
+CREATE TABLE IF NOT EXISTS artifact_metrics (
+    artifact_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (artifact_id, name)
+);
+
+CREATE TABLE IF NOT EXISTS model_versions (
+    number INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    stage TEXT,
+    created TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE VIEW IF NOT EXISTS run_metrics AS
+SELECT run_id, name, value FROM step_metrics
+UNION ALL
+SELECT runs.run_id, artifact_metrics.name, artifact_metrics.value
+FROM runs JOIN artifact_metrics
+    ON artifact_metrics.artifact_id = runs.data_artifact_id;
+"""
+
+
+def flatten_metadata(
+    metadata: Dict[str, Any], prefix: str = ""
+) -> Iterator[Tuple[str, float]]:
+    """
+    Flatten nested metadata into dotted names and numeric values.
+
+    Args:
+        metadata: The (nested) metadata.
+        prefix: Prefix of the flattened names.
+
+    Yields:
+        The name and value of every numeric leaf.
+    """
+    for key, value in metadata.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten_metadata(value, prefix=f"{name}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, float(value)
+
+
+class MetricsIndex:
+    """SQLite index of run and model version metrics."""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH) -> None:
+        """
+        Open (and create if needed) the index.
+
+        Args:
+            path: Path of the SQLite file.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the index."""
+        self.connection.close()
+
+    @property
+    def watermark(self) -> Optional[datetime.datetime]:
+        """Creation time from which the next sync fetches runs."""
+        row = self.connection.execute(
+            "SELECT value FROM sync_state WHERE key = 'watermark'"
+        ).fetchone()
+        return datetime.datetime.fromisoformat(row[0]) if row else None
+
+    def sync(
+        self,
+        client,
+        pipeline_name: str,
+        model_name: str,
+        environments: List[str],
+    ) -> Dict[str, Any]:
+        """
+        Fetch the runs created since the watermark and index their metrics.
+
+        Runs, training steps, `load_data` steps, model artifacts and
+        `raw_data` artifacts are fetched concurrently, one paginated query
+        each. Cached training steps output a model artifact created before
+        the watermark, which is fetched on its own. Model versions are
+        few and their stages change, so they are always fetched in full.
+
+        Args:
+            client: The ZenML client.
+            pipeline_name: Name of the pipeline whose runs are indexed.
+            model_name: Name of the model whose versions are indexed.
+            environments: Environment names, a run belongs to the first
+                environment among its tags.
+
+        Returns:
+            The number of indexed runs and model versions, the new watermark
+            and the time the sync took.
+        """
+        from zenml.utils.pagination_utils import depaginate
+
+        start = time.perf_counter()
+        watermark = self.watermark
+        created = (
+            f"gte:{watermark.strftime(_DATETIME_FORMAT)}" if watermark else None
+        )
+
+        queries = {
+            "runs": (
+                client.list_pipeline_runs,
+                {"pipeline": pipeline_name, "created": created},
+            ),
+            "train_steps": (
+                client.list_run_steps,
+                {
+                    "name": f"oneof:{json.dumps(list(TRAIN_STEP_NAMES))}",
+                    "created": created,
+                },
+            ),
+            "load_steps": (
+                client.list_run_steps,
+                {"name": LOAD_STEP_NAME, "created": created},
+            ),
+            "model_artifacts": (
+                client.list_artifact_versions,
+                {"artifact": MODEL_ARTIFACT_NAME, "created": created},
+            ),
+            "artifacts": (
+                client.list_artifact_versions,
+                {"artifact": DATA_ARTIFACT_NAME, "created": created},
+            ),
+            "model_versions": (
+                client.list_model_versions,
+                {"model": model_name},
+            ),
+        }
+        with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+            futures = {
+                name: pool.submit(
+                    depaginate,
+                    list_method,
+                    sort_by="asc:created",
+                    hydrate=True,
+                    **{k: v for k, v in kwargs.items() if v is not None},
+                )
+                for name, (list_method, kwargs) in queries.items()
+            }
+            results = {
+                name: future.result() for name, future in futures.items()
+            }
+
+        runs = results["runs"]
+        run_ids = {run.id for run in runs}
+        data_artifacts = {
+            step.pipeline_run_id: step.outputs[DATA_ARTIFACT_NAME][0].id
+            for step in results["load_steps"]
+            if step.outputs.get(DATA_ARTIFACT_NAME)
+        }
+
+        with self.connection:
+            for run in runs:
+                tags = [tag.name for tag in run.tags]
+                environment = next(
+                    (name for name in environments if name in tags), None
+                )
+                model_version = run.model_version
+                data_artifact_id = data_artifacts.get(run.id)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        str(run.id),
+                        run.name,
+                        str(run.status.value),
+                        run.created.isoformat(),
+                        environment,
+                        model_version.number if model_version else None,
+                        str(data_artifact_id) if data_artifact_id else None,
+                    ),
+                )
+                self.connection.execute(
+                    "DELETE FROM run_tags WHERE run_id = ?", (str(run.id),)
+                )
+                self.connection.executemany(
+                    "INSERT INTO run_tags VALUES (?, ?)",
+                    [(str(run.id), tag) for tag in dict.fromkeys(tags)],
+                )
+
+            # The training steps log the model's metadata on the model
+            # artifact, and their instrumentation on the step itself
+            model_artifacts = {
+                artifact.id: artifact for artifact in results["model_artifacts"]
+            }
+            for step in results["train_steps"]:
+                outputs = step.outputs.get(MODEL_ARTIFACT_NAME)
+                if step.pipeline_run_id not in run_ids or not outputs:
+                    continue
+                artifact = model_artifacts.get(outputs[0].id, outputs[0])
+                metrics = dict(flatten_metadata(step.run_metadata))
+                metrics.update(flatten_metadata(artifact.run_metadata))
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO step_metrics VALUES (?, ?, ?)",
+                    [
+                        (str(step.pipeline_run_id), name, value)
+                        for name, value in metrics.items()
+                    ],
+                )
+
+            for artifact in results["artifacts"]:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO artifact_metrics VALUES (?, ?, ?)",
+                    [
+                        (str(artifact.id), name, value)
+                        for name, value in flatten_metadata(
+                            artifact.run_metadata,
+                            prefix=f"{DATA_ARTIFACT_NAME}.",
+                        )
+                    ],
+                )
+
+            self.connection.execute("DELETE FROM model_versions")
+            self.connection.executemany(
+                "INSERT INTO model_versions VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        model_version.number,
+                        model_version.name,
+                        model_version.stage,
+                        model_version.created.isoformat(),
+                    )
+                    for model_version in results["model_versions"]
+                ],
+            )
+
+            # Unfinished runs are fetched again by the next sync
+            unfinished = [
+                run.created
+                for run in runs
+                if run.status.value not in FINISHED_STATUSES
+            ]
+            new_watermark = min(unfinished) if unfinished else None
+            if new_watermark is None and runs:
+                new_watermark = max(run.created for run in runs)
+            if new_watermark is not None:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO sync_state VALUES ('watermark', ?)",
+                    (new_watermark.isoformat(),),
+                )
+
+        return {
+            "runs": len(runs),
+            "model_versions": len(results["model_versions"]),
+            "watermark": self.watermark,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def top_k(
+        self, metric: str, k: int = 5, descending: bool = False
+    ) -> List[Tuple[Optional[str], int, str, Optional[int], float]]:
+        """
+        Get the best runs by a metric for every environment.
+
+        Args:
+            metric: Flattened metric name, e.g. `metrics.rmse`.
+            k: Number of runs per environment.
+            descending: Whether higher values are better.
+
+        Returns:
+            Per environment and rank: the environment, rank, run name, model
+            version and metric value.
+        """
+        order = "DESC" if descending else "ASC"
+        return self.connection.execute(
+            f"""
+            SELECT environment, rank, name, model_version, value FROM (
+                SELECT
+                    runs.environment,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY runs.environment
+                        ORDER BY run_metrics.value {order}
+                    ) AS rank,
+                    runs.name,
+                    runs.model_version,
+                    run_metrics.value
+                FROM run_metrics JOIN runs USING (run_id)
+                WHERE run_metrics.name = ?
+            )
+            WHERE rank <= ?
+            ORDER BY environment, rank
+            """,
+            (metric, k),
+        ).fetchall()
+
+    def compare_model_versions(
+        self, metrics: List[str], numbers: Optional[List[int]] = None
+    ) -> List[Tuple[Any, ...]]:
+        """
+        Get metrics of model versions, from the latest run of every version.
+
+        Args:
+            metrics: Flattened metric names.
+            numbers: Model version numbers, all versions if None.
+
+        Returns:
+            Per model version: its number, stage, run name and the metrics.
+        """
+        columns = ", ".join(
+            "MAX(CASE WHEN run_metrics.name = ? THEN run_metrics.value END)"
+            for _ in metrics
+        )
+        version_filter = ""
+        parameters: List[Any] = list(metrics)
+        if numbers:
+            version_filter = (
+                f"AND runs.model_version IN ({', '.join('?' for _ in numbers)})"
+            )
+            parameters += numbers
+        return self.connection.execute(
+            f"""
+            SELECT
+                model_versions.number,
+                model_versions.stage,
+                runs.name,
+                {columns}
+            FROM model_versions
+            JOIN runs ON runs.run_id = (
+                SELECT run_id FROM runs AS latest
+                WHERE latest.model_version = model_versions.number
+                ORDER BY latest.created DESC LIMIT 1
+            )
+            LEFT JOIN run_metrics ON run_metrics.run_id = runs.run_id
+            WHERE 1 = 1 {version_filter}
+            GROUP BY model_versions.number
+            ORDER BY model_versions.number
+            """,
+            parameters,
+        ).fetchall()
+
+    def metric_names(self) -> List[str]:
+        """Get the names of all indexed metrics."""
+        return [
+            row[0]
+            for row in self.connection.execute(
+                "SELECT DISTINCT name FROM run_metrics ORDER BY name"
+            )
+        ]
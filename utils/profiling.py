@@ -0,0 +1,286 @@
+"""
+Opt-in profiling of steps, with a flame graph artifact.
+
+Steps instrumented with `utils.instrumentation.instrumented` run under a
+profiler when their `extra` config sets `PROFILE_KEY`, e.g. per environment
+in `configs/*.yml`:
+
+    steps:
+      train_model:
+        extra:
+          profile: True            # sampling profiler, every 5 ms
+      generate_data_analysis_report:
+        extra:
+          profile:
+            mode: cprofile         # deterministic, with more overhead
+      load_data:
+        extra:
+          profile:
+            interval_ms: 1
+
+The sampling profiler is a background thread that records the call stack of
+the step's thread at a fixed interval (`sys._current_frames`), so its
+overhead only depends on the interval and the stack depth, not on how many
+function calls the step makes. cProfile is used when `mode` is `cprofile`
+or the interpreter cannot sample other threads.
+
+The profile is stored as an HTML artifact `<step name>_profile` with an
+icicle flame graph, the top functions and the collapsed stacks, and
+summarized in the step metadata under `profile`.
+"""
+
+import cProfile
+import html
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from zenml import get_step_context, save_artifact
+from zenml.logger import get_logger
+from zenml.types import HTMLString
+
+from utils.metadata_buffer import log_metadata
+from utils.report_assets import render_report
+
+logger = get_logger(__name__)
+
+# Key of the step `extra` config enabling the profiler
+PROFILE_KEY = "profile"
+PROFILE_ARTIFACT_SUFFIX = "_profile"
+
+PROFILE_MODES = ("sampling", "cprofile")
+DEFAULT_INTERVAL_MS = 5
+
+# Flame graph nodes below this fraction of all samples are merged into their
+# parent, which keeps the artifact small for long-running steps
+MIN_NODE_FRACTION = 0.001
+TOP_FUNCTIONS = 50
+
+Frame = Tuple[str, int, str]
+
+
+def _frame_label(frame: Frame) -> str:
+    """Human-readable label of a frame: `function (dir/file.py:line)`."""
+    filename, line, name = frame
+    path = os.path.join(
+        os.path.basename(os.path.dirname(filename)), os.path.basename(filename)
+    )
+    return f"{name} ({path}:{line})"
+
+
+class StackSampler(threading.Thread):
+    """Samples the call stack of one thread at a fixed interval."""
+
+    def __init__(self, thread_id: int, root: Any, interval: float) -> None:
+        """
+        Initialize the sampler.
+
+        Args:
+            thread_id: Identifier of the sampled thread.
+            root: Frame below which the stacks are recorded.
+            interval: Seconds between two samples.
+        """
+        super().__init__(name="step-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.busy_seconds = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            start = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                code = frame.f_code
+                stack.append(
+                    (code.co_filename, code.co_firstlineno, code.co_name)
+                )
+                frame = frame.f_back
+            if frame is self.root and stack:
+                self.stacks[tuple(reversed(stack))] += 1
+            self.busy_seconds += time.perf_counter() - start
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _sampled_functions(
+    stacks: Counter, interval: float
+) -> List[Tuple[str, float, float]]:
+    """Self and total time of the functions in sampled stacks."""
+    self_samples: Counter = Counter()
+    total_samples: Counter = Counter()
+    for stack, count in stacks.items():
+        self_samples[stack[-1]] += count
+        for frame in set(stack):
+            total_samples[frame] += count
+    return [
+        (_frame_label(frame), self_samples[frame] * interval, total * interval)
+        for frame, total in total_samples.most_common(TOP_FUNCTIONS)
+    ]
+
+
+def flamegraph_data(stacks: Counter) -> Dict[str, List[Any]]:
+    """
+    Convert sampled stacks into the nodes of a plotly icicle chart.
+
+    Args:
+        stacks: Number of samples per stack (outermost frame first).
+
+    Returns:
+        The `ids`, `labels`, `parents` and `values` of the nodes.
+    """
+    totals: Counter = Counter()
+    for stack, count in stacks.items():
+        labels = [_frame_label(frame) for frame in stack]
+        for depth in range(1, len(labels) + 1):
+            totals[";".join(labels[:depth])] += count
+
+    min_samples = sum(stacks.values()) * MIN_NODE_FRACTION
+    nodes = {"ids": [], "labels": [], "parents": [], "values": []}
+    for node_id, value in sorted(totals.items()):
+        if value < min_samples:
+            continue
+        parent, _, label = node_id.rpartition(";")
+        nodes["ids"].append(node_id)
+        nodes["labels"].append(label)
+        nodes["parents"].append(parent)
+        nodes["values"].append(value)
+    return nodes
+
+
+def _profile_options(options: Any) -> Dict[str, Any]:
+    """Normalize the `profile` config value."""
+    if options is True:
+        options = {}
+    mode = options.get("mode", "sampling")
+    if mode not in PROFILE_MODES:
+        raise ValueError(
+            f"Unknown profiler mode `{mode}`, expected one of "
+            f"{', '.join(PROFILE_MODES)}."
+        )
+    if not hasattr(sys, "_current_frames"):
+        mode = "cprofile"
+    return {
+        "mode": mode,
+        "interval": options.get("interval_ms", DEFAULT_INTERVAL_MS) / 1000,
+    }
+
+
+def profile_call(
+    func: Callable[..., Any],
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    options: Any,
+) -> Any:
+    """
+    Call a step function under the profiler and store its profile.
+
+    Args:
+        func: The step function.
+        args: Positional arguments of the call.
+        kwargs: Keyword arguments of the call.
+        options: The `profile` value of the step's `extra` config.
+
+    Returns:
+        The result of the call.
+    """
+    options = _profile_options(options)
+    step_name = get_step_context().step_run.name
+    root = sys._getframe()
+    stacks: Counter = Counter()
+    sampler_seconds = 0.0
+
+    start = time.perf_counter()
+    if options["mode"] == "sampling":
+        sampler = StackSampler(threading.get_ident(), root, options["interval"])
+        sampler.start()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            sampler.stop()
+        wall_seconds = time.perf_counter() - start
+        stacks = sampler.stacks
+        sampler_seconds = sampler.busy_seconds
+        functions = _sampled_functions(stacks, options["interval"])
+        samples = sum(stacks.values())
+    else:
+        profiler = cProfile.Profile()
+        result = profiler.runcall(func, *args, **kwargs)
+        wall_seconds = time.perf_counter() - start
+        stats = pstats.Stats(profiler).stats
+        functions = sorted(
+            (
+                (_frame_label(frame), self_time, total_time)
+                for frame, (_, _, self_time, total_time, _) in stats.items()
+            ),
+            key=lambda function: -function[2],
+        )[:TOP_FUNCTIONS]
+        samples = sum(calls for _, calls, _, _, _ in stats.values())
+
+    report = render_report(
+        "profile_report.html",
+        step_name=html.escape(step_name),
+        description=(
+            f"Sampled every {options['interval'] * 1000:g} ms"
+            if options["mode"] == "sampling"
+            else "Deterministic profile, samples are function calls"
+        ),
+        wall_seconds=f"{wall_seconds:.2f}",
+        samples=samples,
+        overhead=(
+            f"{sampler_seconds / wall_seconds:.1%}"
+            if options["mode"] == "sampling" and wall_seconds
+            else "n/a"
+        ),
+        profiler=options["mode"],
+        flamegraph=json.dumps(flamegraph_data(stacks)),
+        function_rows="\n".join(
+            f"<tr><td>{html.escape(name)}</td>"
+            f'<td class="num">{self_time:.3f}</td>'
+            f'<td class="num">{total_time:.3f}</td></tr>'
+            for name, self_time, total_time in functions
+        ),
+        collapsed_stacks=html.escape(
+            "\n".join(
+                f"{';'.join(map(_frame_label, stack))} {count}"
+                for stack, count in stacks.most_common()
+            )
+        ),
+    )
+    artifact = save_artifact(
+        HTMLString(report), name=f"{step_name}{PROFILE_ARTIFACT_SUFFIX}"
+    )
+    log_metadata(
+        metadata={
+            "profile": {
+                "mode": options["mode"],
+                "interval_ms": (
+                    options["interval"] * 1000
+                    if options["mode"] == "sampling"
+                    else None
+                ),
+                "samples": samples,
+                "wall_seconds": round(wall_seconds, 4),
+                "sampler_seconds": round(sampler_seconds, 4),
+                "artifact": artifact.name,
+                "version": str(artifact.version),
+            }
+        }
+    )
+    logger.info(
+        "Stored the %s profile of `%s` as artifact `%s`.",
+        options["mode"],
+        step_name,
+        artifact.name,
+    )
+    return result
@@ -42,6 +42,7 @@ class EnvironmentsConfig(BaseModel):
     local: EnvironmentConfig = EnvironmentConfig(tags=["local", "development"])
     staging: EnvironmentConfig = EnvironmentConfig(tags=["staging", "pre-release"])
     production: EnvironmentConfig = EnvironmentConfig(tags=["production", "release"])
+    smoke: EnvironmentConfig = EnvironmentConfig(tags=["smoke"])
 
 
 class ProjectInfo(BaseModel):
@@ -190,6 +191,7 @@ def get_snapshot_name(environment: str, git_sha: Optional[str] = None) -> str:
         "local": "LOCAL",
         "staging": "STG",
         "production": "PROD",
+        "smoke": "SMOKE",
     }
     env_prefix = prefix_map.get(environment, environment.upper())
     
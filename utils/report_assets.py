@@ -0,0 +1,189 @@
+"""
+Static assets and page templates for the HTML reports.
+
+The reports need plotly.js and a small stylesheet. Rather than pulling
+`plotly-latest` and Bootstrap from public CDNs on every page load, the
+plotly.js bundle that ships with the installed `plotly` package is vendored
+once into a local, content-hashed cache, and the stylesheet is a tiny file
+in `utils/templates/` that is always inlined.
+
+How plotly.js is referenced is controlled by `REPORT_ASSETS_MODE`:
+
+- `inline` (default): the vendored bundle is embedded into every report,
+  which makes reports fully self-contained for air-gapped dashboards.
+- `cdn`: a `<script>` tag pointing at the CDN build of exactly the vendored
+  version, for small reports on dashboards with internet access.
+- `url`: the report references the content-hashed file under
+  `REPORT_ASSETS_BASE_URL`. Serve (or sync) the cache directory from an
+  internal host to share one browser-cacheable bundle across all reports.
+
+The cache lives in `REPORT_ASSETS_DIR` (default:
+`~/.cache/zenml-gitflow/report-assets`). Run `python -m utils.report_assets`
+to prime it and print the vendored file.
+"""
+
+import functools
+import hashlib
+import os
+from pathlib import Path
+from string import Template
+from typing import NamedTuple, Optional
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+ASSETS_MODE_ENV = "REPORT_ASSETS_MODE"
+ASSETS_DIR_ENV = "REPORT_ASSETS_DIR"
+ASSETS_BASE_URL_ENV = "REPORT_ASSETS_BASE_URL"
+
+DEFAULT_ASSETS_DIR = Path.home() / ".cache" / "zenml-gitflow" / "report-assets"
+PLOTLY_CDN_URL = "https://cdn.plot.ly/plotly-{version}.min.js"
+ASSET_MODES = ("cdn", "inline", "url")
+DEFAULT_ASSET_MODE = "inline"
+
+
+class VendoredAsset(NamedTuple):
+    """A vendored, content-hashed asset file."""
+
+    name: str
+    version: str
+    digest: str
+    path: Path
+
+
+def get_assets_dir() -> Path:
+    """Get the directory holding the vendored report assets."""
+    return Path(os.environ.get(ASSETS_DIR_ENV) or DEFAULT_ASSETS_DIR)
+
+
+@functools.lru_cache(maxsize=None)
+def load_template(name: str) -> Template:
+    """
+    Load and compile a page template from `utils/templates`.
+
+    Templates use `string.Template` syntax (`${name}`, `$$` for a literal
+    dollar sign) so the HTML/JS can use braces without escaping. Every
+    template is read and compiled once per process.
+
+    Args:
+        name: File name of the template.
+
+    Returns:
+        The compiled template.
+    """
+    return Template((TEMPLATES_DIR / name).read_text(encoding="utf-8"))
+
+
+@functools.lru_cache(maxsize=None)
+def _read_text(path: Path) -> str:
+    """Read a (static) text file once per process."""
+    return path.read_text(encoding="utf-8")
+
+
+@functools.lru_cache(maxsize=None)
+def vendor_plotly(assets_dir: Optional[Path] = None) -> VendoredAsset:
+    """
+    Vendor the plotly.js bundle of the installed `plotly` package.
+
+    The bundle is written once as `plotly-<version>.<sha256 prefix>.min.js`.
+    Later processes reuse the existing file if its content still matches
+    the hash in its name. Truncated or modified files are removed and the
+    bundle is vendored again.
+
+    Args:
+        assets_dir: Target directory, defaults to `get_assets_dir()`.
+
+    Returns:
+        The vendored plotly.js file.
+    """
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    assets_dir = Path(assets_dir or get_assets_dir())
+    version = get_plotlyjs_version()
+    prefix, suffix = f"plotly-{version}.", ".min.js"
+
+    for path in sorted(assets_dir.glob(f"{prefix}*{suffix}")):
+        digest = path.name[len(prefix) : -len(suffix)]
+        if hashlib.sha256(path.read_bytes()).hexdigest()[:16] == digest:
+            return VendoredAsset("plotly", version, digest, path)
+        # Another process may have removed it already
+        path.unlink(missing_ok=True)
+
+    content = get_plotlyjs().encode("utf-8")
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    path = assets_dir / f"{prefix}{digest}{suffix}"
+
+    # Write to a temporary file first so concurrent builds never see a
+    # partially written bundle
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+    return VendoredAsset("plotly", version, digest, path)
+
+
+def asset_tags(mode: Optional[str] = None) -> str:
+    """
+    Render the `<head>` tags loading the report assets.
+
+    Args:
+        mode: One of `cdn`, `inline` or `url`. Defaults to the
+            `REPORT_ASSETS_MODE` environment variable, or `inline`.
+
+    Returns:
+        The HTML tags for the stylesheet and plotly.js.
+
+    Raises:
+        ValueError: If the mode is unknown, or `url` mode is used without a
+            base URL.
+    """
+    mode = mode or os.environ.get(ASSETS_MODE_ENV) or DEFAULT_ASSET_MODE
+    if mode not in ASSET_MODES:
+        raise ValueError(
+            f"Unknown report asset mode `{mode}`, expected one of "
+            f"{', '.join(ASSET_MODES)}."
+        )
+
+    style = f"<style>\n{_read_text(TEMPLATES_DIR / 'report.css')}</style>"
+
+    if mode == "cdn":
+        from plotly.offline import get_plotlyjs_version
+
+        url = PLOTLY_CDN_URL.format(version=get_plotlyjs_version())
+        return f'{style}\n    <script src="{url}"></script>'
+
+    plotly_js = vendor_plotly()
+    if mode == "inline":
+        return f"{style}\n    <script>{_read_text(plotly_js.path)}</script>"
+
+    base_url = os.environ.get(ASSETS_BASE_URL_ENV)
+    if not base_url:
+        raise ValueError(
+            f"`{ASSETS_BASE_URL_ENV}` must be set when using the `url` "
+            "report asset mode."
+        )
+    url = f"{base_url.rstrip('/')}/{plotly_js.path.name}"
+    return f'{style}\n    <script src="{url}"></script>'
+
+
+def render_report(
+    template_name: str, mode: Optional[str] = None, **context
+) -> str:
+    """
+    Render a report page from its template.
+
+    Args:
+        template_name: File name of the template in `utils/templates`.
+        mode: Asset mode, see `asset_tags`.
+        **context: Values for the template placeholders.
+
+    Returns:
+        The rendered HTML page.
+    """
+    return load_template(template_name).substitute(
+        assets=asset_tags(mode), **context
+    )
+
+
+if __name__ == "__main__":
+    asset = vendor_plotly()
+    print(f"plotly.js {asset.version} vendored at {asset.path}")
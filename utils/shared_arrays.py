@@ -0,0 +1,117 @@
+"""
+Float arrays in shared memory, read by worker processes without copies.
+
+The parent copies the arrays into shared memory blocks once and passes the
+small `specs` (block names and shapes) to the workers, which map the blocks
+as numpy arrays:
+
+    with SharedArrays({"X": X, "y": y}) as shared:
+        pool.submit(work, shared.specs)
+
+    def work(specs):
+        with attach(specs) as arrays:
+            ...  # arrays["X"], arrays["y"]
+"""
+
+import contextlib
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+ArraySpecs = Dict[str, Tuple[str, Tuple[int, ...]]]
+
+
+def dense(array: Any) -> np.ndarray:
+    """A C-contiguous float64 array from a dense or sparse matrix or vector."""
+    if hasattr(array, "toarray"):
+        array = array.toarray()
+    return np.ascontiguousarray(array, dtype=np.float64)
+
+
+class SharedArrays:
+    """Copies of float arrays in shared memory, freed on exit."""
+
+    def __init__(self, arrays: Dict[str, Any]) -> None:
+        """
+        Copy the arrays into shared memory.
+
+        Args:
+            arrays: The arrays by name, converted with `dense`.
+        """
+        self.blocks = []
+        self.specs: ArraySpecs = {}
+        for name, array in arrays.items():
+            array = dense(array)
+            block = shared_memory.SharedMemory(
+                create=True, size=max(array.nbytes, 1)
+            )
+            np.copyto(
+                np.ndarray(array.shape, dtype=np.float64, buffer=block.buf),
+                array,
+            )
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape)
+
+    def __enter__(self) -> "SharedArrays":
+        """Use the arrays."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Free the shared memory."""
+        self.close()
+
+    def close(self) -> None:
+        """Free the shared memory."""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def open_arrays(
+    specs: ArraySpecs,
+) -> Tuple[List[shared_memory.SharedMemory], Dict[str, np.ndarray]]:
+    """
+    Map shared arrays into this process until it exits.
+
+    Args:
+        specs: The `specs` of `SharedArrays`.
+
+    Returns:
+        The shared memory blocks, which must be kept referenced while the
+        arrays are used, and the arrays by name.
+    """
+    blocks = [
+        shared_memory.SharedMemory(name=name) for name, _ in specs.values()
+    ]
+    arrays = {
+        name: np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        for (name, (_, shape)), block in zip(specs.items(), blocks)
+    }
+    return blocks, arrays
+
+
+@contextlib.contextmanager
+def attach(specs: ArraySpecs) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Map shared arrays into this process.
+
+    Args:
+        specs: The `specs` of `SharedArrays`.
+
+    Yields:
+        The arrays by name. They are only valid inside the block.
+    """
+    blocks, arrays = open_arrays(specs)
+    try:
+        yield arrays
+    finally:
+        arrays.clear()
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                # A traceback still references an array, the block is closed
+                # when the process exits
+                pass
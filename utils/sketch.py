@@ -0,0 +1,230 @@
+"""
+Compact per-feature sketches of a dataset, and drift scores between them.
+
+A sketch summarizes every feature in a few hundred numbers, so the data of a
+run can be compared with the training data of another one without loading
+it again:
+
+- numeric features: row and null counts, a fixed-bin histogram over
+  `[min, max]` and a quantile sketch (every percentile),
+- categorical features (strings, booleans, with at most `MAX_CATEGORIES`
+  distinct values): row and null counts and the frequency of every value.
+
+`compare_sketches` scores every feature in O(bins):
+
+- `psi`: population stability index over the deciles of the reference
+  (numeric) or over the categories (categorical),
+- `distance`: Kolmogorov-Smirnov statistic (numeric) or total variation
+  distance (categorical), both between 0 and 1.
+
+The distributions of numeric features are interpolated linearly inside the
+histogram bins, so sketches with different bin edges can be compared.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+SKETCH_VERSION = 1
+HISTOGRAM_BINS = 64
+QUANTILES = np.linspace(0, 1, 101)
+
+# Columns with more distinct values (e.g. IDs) are not sketched. The first
+# rows are checked first, so IDs are skipped without counting all of them.
+MAX_CATEGORIES = 100
+CARDINALITY_SAMPLE_ROWS = 10_000
+
+# Share floor of empty bins and categories, which keeps the PSI finite
+PSI_EPSILON = 1e-4
+
+# Rule of thumb: PSI below 0.1 is no significant change, above 0.25 a major
+# shift
+DEFAULT_PSI_THRESHOLD = 0.1
+DEFAULT_DISTANCE_THRESHOLD = 0.1
+
+
+def _quantiles(values: np.ndarray) -> np.ndarray:
+    """
+    Quantiles of every column of a 2D array, ignoring missing values.
+
+    Same result as `np.nanquantile(values, QUANTILES, axis=0)`, but all
+    columns are sorted in one call (NaNs are sorted last), which is about 5x
+    faster when values are missing.
+
+    Args:
+        values: The values, one column per feature.
+
+    Returns:
+        One row per quantile, one column per feature (NaN for columns
+        without values).
+    """
+    ordered = np.sort(values, axis=0)
+    last = np.maximum((~np.isnan(values)).sum(axis=0) - 1, 0)
+    positions = QUANTILES[:, None] * last
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, last)
+    weights = positions - lower
+    return (
+        np.take_along_axis(ordered, lower, axis=0) * (1 - weights)
+        + np.take_along_axis(ordered, upper, axis=0) * weights
+    )
+
+
+def build_sketch(data: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Sketch every numeric and low-cardinality categorical column.
+
+    Args:
+        data: The data.
+
+    Returns:
+        The JSON-serializable sketch.
+    """
+    numeric = data.select_dtypes(include=[np.number])
+    values = numeric.to_numpy(dtype=float)
+    quantiles = (
+        _quantiles(values)
+        if len(values)
+        else np.full((len(QUANTILES), values.shape[1]), np.nan)
+    )
+
+    features = {}
+    for index, column in enumerate(numeric.columns):
+        column_values = values[:, index]
+        present = column_values[~np.isnan(column_values)]
+        counts, edges = np.histogram(
+            present,
+            bins=HISTOGRAM_BINS,
+            range=(present.min(), present.max()) if len(present) else (0, 1),
+        )
+        features[column] = {
+            "type": "numeric",
+            "count": int(len(column_values)),
+            "nulls": int(len(column_values) - len(present)),
+            "edges": edges.tolist(),
+            "counts": counts.tolist(),
+            "quantiles": quantiles[:, index].tolist(),
+        }
+
+    for column in data.columns.difference(numeric.columns, sort=False):
+        head = data[column].iloc[:CARDINALITY_SAMPLE_ROWS]
+        if head.nunique() > MAX_CATEGORIES:
+            continue
+        frequencies = data[column].value_counts()
+        if len(frequencies) > MAX_CATEGORIES:
+            continue
+        features[column] = {
+            "type": "categorical",
+            "count": int(len(data)),
+            "nulls": int(data[column].isna().sum()),
+            "frequencies": {
+                str(value): int(count) for value, count in frequencies.items()
+            },
+        }
+
+    return {
+        "version": SKETCH_VERSION,
+        "rows": int(len(data)),
+        "features": features,
+    }
+
+
+def _cdf(feature: Dict[str, Any], points: np.ndarray) -> np.ndarray:
+    """Fraction of non-null values below the points, from the histogram."""
+    counts = np.asarray(feature["counts"], dtype=float)
+    cumulative = np.concatenate([[0.0], np.cumsum(counts)])
+    total = cumulative[-1] or 1.0
+    return np.interp(points, feature["edges"], cumulative / total)
+
+
+def _psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population stability index of two arrays of shares."""
+    expected = np.maximum(expected, PSI_EPSILON)
+    actual = np.maximum(actual, PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def compare_numeric(
+    reference: Dict[str, Any], current: Dict[str, Any]
+) -> Dict[str, float]:
+    """Score the drift of a numeric feature."""
+    # Deciles of the reference: every bin holds 10% of the reference values
+    deciles = np.unique(np.asarray(reference["quantiles"])[10:-10:10])
+    edges = np.concatenate([[-np.inf], deciles, [np.inf]])
+    expected = np.diff(_cdf(reference, edges))
+    actual = np.diff(_cdf(current, edges))
+
+    points = np.union1d(reference["edges"], current["edges"])
+    distance = np.max(np.abs(_cdf(reference, points) - _cdf(current, points)))
+    return {"psi": _psi(expected, actual), "distance": float(distance)}
+
+
+def compare_categorical(
+    reference: Dict[str, Any], current: Dict[str, Any]
+) -> Dict[str, float]:
+    """Score the drift of a categorical feature."""
+    categories = sorted(
+        set(reference["frequencies"]) | set(current["frequencies"])
+    )
+    expected, actual = (
+        np.array([sketch["frequencies"].get(c, 0) for c in categories], float)
+        for sketch in (reference, current)
+    )
+    expected /= expected.sum() or 1.0
+    actual /= actual.sum() or 1.0
+    return {
+        "psi": _psi(expected, actual),
+        "distance": float(np.abs(expected - actual).sum() / 2),
+    }
+
+
+def compare_sketches(
+    reference: Dict[str, Any], current: Dict[str, Any]
+) -> Dict[str, Dict[str, float]]:
+    """
+    Score the drift of every feature present in both sketches.
+
+    Args:
+        reference: Sketch of the reference data (e.g. the training data of
+            the production model).
+        current: Sketch of the new data.
+
+    Returns:
+        Per feature: `psi`, `distance` and the change of the null share.
+    """
+    scores = {}
+    for name, feature in current["features"].items():
+        reference_feature = reference["features"].get(name)
+        if (
+            reference_feature is None
+            or reference_feature["type"] != feature["type"]
+        ):
+            continue
+        compare = (
+            compare_numeric
+            if feature["type"] == "numeric"
+            else compare_categorical
+        )
+        feature_scores = compare(reference_feature, feature)
+        feature_scores["null_share_change"] = feature["nulls"] / max(
+            feature["count"], 1
+        ) - reference_feature["nulls"] / max(reference_feature["count"], 1)
+        scores[name] = {
+            key: round(value, 4) for key, value in feature_scores.items()
+        }
+    return scores
+
+
+def drifted_features(
+    scores: Dict[str, Dict[str, float]],
+    psi_threshold: float = DEFAULT_PSI_THRESHOLD,
+    distance_threshold: float = DEFAULT_DISTANCE_THRESHOLD,
+) -> List[str]:
+    """Features whose PSI or distance exceeds its threshold."""
+    return [
+        name
+        for name, feature_scores in scores.items()
+        if feature_scores["psi"] > psi_threshold
+        or feature_scores["distance"] > distance_threshold
+    ]
@@ -0,0 +1,193 @@
+"""
+Smoke runs: scaled-down training checked against guard bands.
+
+A smoke run (`configs/smoke.yml`) trains on a stratified subsample of the
+cleaned data with proportionally fewer estimators, so a pull request can be
+checked in seconds. Its model is evaluated on held-out rows, and the
+bootstrap confidence interval of every guard metric is compared with a band
+around the metric of the last full run:
+
+- higher-is-better metrics (R²) fail when the upper end of the interval is
+  below `reference - tolerance * |reference|`,
+- lower-is-better metrics (RMSE) fail when the lower end of the interval is
+  above `reference + tolerance * |reference|`.
+
+So a smoke run only fails when a regression beyond the expected loss of the
+scaled-down model is statistically significant at the `CONFIDENCE` level,
+and a noisy subsample does not fail it by chance.
+
+Model versions of smoke runs are tagged with `SMOKE_TAG`, so they are
+neither used as the reference nor promoted by `promote.py --best`.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SMOKE_TAG = "smoke"
+
+# Guard metrics and whether higher (1) or lower (-1) values are better
+GUARD_METRICS = {"r2_score": 1, "rmse": -1}
+
+# Default relative loss allowed against the last full run, which covers the
+# gap between the scaled-down and the full model
+DEFAULT_TOLERANCES = {"r2_score": 0.05, "rmse": 0.3}
+
+CONFIDENCE = 0.95
+BOOTSTRAP_SAMPLES = 1000
+
+# Elements of the resample index matrix drawn at a time (8 MB of int64)
+BOOTSTRAP_BATCH_ELEMENTS = 1_000_000
+
+# Artifact whose metadata holds the `metrics` logged by `train_model`
+MODEL_ARTIFACT_NAME = "price_prediction_model"
+
+
+def stratified_sample(
+    data: pd.DataFrame,
+    fraction: float,
+    by: List[str],
+    max_rows: Optional[int] = None,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """
+    Sample the same fraction of rows from every stratum.
+
+    Args:
+        data: The data.
+        fraction: Fraction of the rows of every stratum to sample.
+        by: Columns defining the strata.
+        max_rows: Cap on the sampled rows, the fraction is lowered to fit.
+        seed: Seed of the sample.
+
+    Returns:
+        The sampled rows, in their original order.
+    """
+    if max_rows is not None and len(data):
+        fraction = min(fraction, max_rows / len(data))
+    sample = data.groupby(by, group_keys=False, observed=True).sample(
+        frac=fraction, random_state=seed
+    )
+    return sample.sort_index()
+
+
+def scaled_epochs(epochs: int, fraction: float) -> int:
+    """Scale the `epochs` (and with it the estimators) to a data fraction."""
+    return max(1, round(epochs * fraction))
+
+
+def bootstrap_intervals(
+    y_true,
+    y_pred,
+    confidence: float = CONFIDENCE,
+    n_samples: int = BOOTSTRAP_SAMPLES,
+    seed: int = 0,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Bootstrap confidence intervals of the guard metrics.
+
+    The resamples are evaluated in batches of (resamples x rows) index
+    matrices of at most `BOOTSTRAP_BATCH_ELEMENTS` elements, so memory stays
+    linear in the number of rows.
+
+    Args:
+        y_true: True values.
+        y_pred: Predicted values.
+        confidence: Confidence level of the two-sided intervals.
+        n_samples: Number of bootstrap resamples.
+        seed: Seed of the resamples.
+
+    Returns:
+        The lower and upper bound of every metric in `GUARD_METRICS`.
+    """
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    rng = np.random.default_rng(seed)
+    batch_samples = max(1, BOOTSTRAP_BATCH_ELEMENTS // max(len(y_true), 1))
+    squared_error = np.empty(n_samples)
+    variance = np.empty(n_samples)
+    for start in range(0, n_samples, batch_samples):
+        stop = min(start + batch_samples, n_samples)
+        index = rng.integers(0, len(y_true), size=(stop - start, len(y_true)))
+        true = y_true[index]
+        errors = true - y_pred[index]
+        squared_error[start:stop] = np.mean(errors**2, axis=1)
+        variance[start:stop] = np.var(true, axis=1)
+    variance[variance == 0] = np.nan
+    values = {
+        "r2_score": 1 - squared_error / variance,
+        "rmse": np.sqrt(squared_error),
+    }
+    tail = (1 - confidence) / 2 * 100
+    intervals = {}
+    for metric, samples in values.items():
+        low, high = np.nanpercentile(samples, [tail, 100 - tail])
+        intervals[metric] = (float(low), float(high))
+    return intervals
+
+
+def check_guard_bands(
+    intervals: Dict[str, Tuple[float, float]],
+    reference: Optional[Dict[str, float]],
+    tolerances: Dict[str, float],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Check the confidence intervals of the guard metrics against their bands.
+
+    Args:
+        intervals: Confidence interval of every guard metric.
+        reference: Metrics of the last full run, None if there is none.
+        tolerances: Relative loss allowed per metric.
+
+    Returns:
+        Per metric: the interval, the reference value, the band limit and
+        whether the check passed. Metrics without a reference pass.
+    """
+    results = {}
+    for metric, direction in GUARD_METRICS.items():
+        low, high = intervals[metric]
+        value = (reference or {}).get(metric)
+        limit, passed = None, True
+        if value is not None:
+            limit = value - direction * tolerances[metric] * abs(value)
+            passed = high >= limit if direction > 0 else low <= limit
+        results[metric] = {
+            "interval": [round(low, 4), round(high, 4)],
+            "reference": value,
+            "limit": round(limit, 4) if limit is not None else None,
+            "passed": passed,
+        }
+    return results
+
+
+def reference_metrics(
+    client, model_name: str, candidates: int = 20
+) -> Tuple[Optional[str], Optional[Dict[str, float]]]:
+    """
+    Find the metrics of the last full (non-smoke) training run.
+
+    Args:
+        client: The ZenML client.
+        model_name: Name of the model.
+        candidates: Number of latest model versions to look through.
+
+    Returns:
+        The model version and its metrics, or None and None if none of the
+        candidates has a trained model.
+    """
+    for model_version in client.list_model_versions(
+        model=model_name, sort_by="desc:number", size=candidates, hydrate=True
+    ).items:
+        if SMOKE_TAG in {tag.name for tag in model_version.tags}:
+            continue
+        artifacts = client.list_artifact_versions(
+            sort_by="desc:created",
+            size=1,
+            artifact=MODEL_ARTIFACT_NAME,
+            model_version_id=model_version.id,
+            hydrate=True,
+        ).items
+        if artifacts and artifacts[0].run_metadata.get("metrics"):
+            return model_version.name, artifacts[0].run_metadata["metrics"]
+    return None, None
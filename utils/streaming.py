@@ -0,0 +1,86 @@
+"""
+Helpers to train on data read in chunks of rows, in bounded memory.
+
+Every pass over the data must treat every row the same way, whatever the
+chunk size and order, without shuffling or even holding the whole data:
+
+- `row_hashes` gives every row a stable 64-bit hash of a key column, e.g.
+  the product ID. All rows of a key share the hash.
+- `holdout_mask` puts a fixed fraction of the hash range into the hold-out
+  set, so a row is held out in every pass or in none, and rows of one key
+  never end up on both sides of the split.
+- `BottomKSample` keeps the rows with the smallest hashes seen so far, a
+  uniform sample of fixed size of all the rows passed to it.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Resolution of the hold-out fraction
+HOLDOUT_BUCKETS = 1000
+
+
+def row_hashes(chunk: pd.DataFrame, column: str) -> np.ndarray:
+    """
+    Hash the key of every row.
+
+    Args:
+        chunk: The rows.
+        column: The key column.
+
+    Returns:
+        The unsigned 64-bit hash of every row, the same in every process.
+    """
+    return pd.util.hash_pandas_object(chunk[column], index=False).to_numpy()
+
+
+def holdout_mask(hashes: np.ndarray, fraction: float) -> np.ndarray:
+    """
+    Decide which rows are held out.
+
+    Args:
+        hashes: The hashes of `row_hashes`.
+        fraction: Fraction of the rows to hold out.
+
+    Returns:
+        Whether every row is held out.
+    """
+    threshold = round(fraction * HOLDOUT_BUCKETS)
+    return hashes % np.uint64(HOLDOUT_BUCKETS) < np.uint64(threshold)
+
+
+class BottomKSample:
+    """Uniform sample of a fixed number of rows, fed in chunks."""
+
+    def __init__(self, size: int) -> None:
+        """
+        Start an empty sample.
+
+        Args:
+            size: Maximum number of rows kept.
+        """
+        self.size = size
+        self.rows: Optional[pd.DataFrame] = None
+        self._hashes = np.empty(0, dtype=np.uint64)
+
+    def update(self, rows: pd.DataFrame, hashes: np.ndarray) -> None:
+        """
+        Add rows, keeping those with the smallest hashes.
+
+        Args:
+            rows: The rows.
+            hashes: The hashes of `row_hashes`, aligned with `rows`.
+        """
+        if len(self._hashes) >= self.size:
+            # Only rows below the largest kept hash can enter the sample
+            candidates = hashes < self._hashes.max()
+            rows, hashes = rows[candidates], hashes[candidates]
+        if self.rows is not None:
+            rows = pd.concat([self.rows, rows])
+            hashes = np.concatenate([self._hashes, hashes])
+        if len(hashes) > self.size:
+            keep = np.sort(np.argpartition(hashes, self.size - 1)[: self.size])
+            rows, hashes = rows.iloc[keep], hashes[keep]
+        self.rows, self._hashes = rows, hashes
@@ -1,73 +1,86 @@
+import base64
 import datetime
+import json
+
 import numpy as np
 import pandas as pd
 
+from utils.report_assets import render_report
+
+# Product categories of the data, the schema and the report palette
+CATEGORIES = ("Electronics", "Clothing", "Home", "Books", "Sports")
+
+
 def mock_data(n_samples: int = 1000) -> pd.DataFrame:
     # First generate the categories
-    categories = np.random.choice(["Electronics", "Clothing", "Home", "Books", "Sports"], n_samples)
-    
+    categories = np.random.choice(CATEGORIES, n_samples)
+
     # Define category-specific distribution parameters
     category_params = {
         "Electronics": {
             "price": {"mean": 200, "std": 50},
             "manufacturing_cost": {"mean": 80, "std": 20},
-            "shipping_weight": {"mean": 2.5, "std": 1.2}
+            "shipping_weight": {"mean": 2.5, "std": 1.2},
         },
         "Clothing": {
             "price": {"mean": 80, "std": 30},
             "manufacturing_cost": {"mean": 40, "std": 12},
-            "shipping_weight": {"mean": 0.8, "std": 0.3}
+            "shipping_weight": {"mean": 0.8, "std": 0.3},
         },
         "Home": {
             "price": {"mean": 150, "std": 45},
             "manufacturing_cost": {"mean": 60, "std": 18},
-            "shipping_weight": {"mean": 5, "std": 2.5}
+            "shipping_weight": {"mean": 5, "std": 2.5},
         },
         "Books": {
             "price": {"mean": 30, "std": 15},
             "manufacturing_cost": {"mean": 15, "std": 5},
-            "shipping_weight": {"mean": 1.5, "std": 0.5}
+            "shipping_weight": {"mean": 1.5, "std": 0.5},
         },
         "Sports": {
             "price": {"mean": 120, "std": 40},
             "manufacturing_cost": {"mean": 50, "std": 15},
-            "shipping_weight": {"mean": 3, "std": 1.0}
-        }
+            "shipping_weight": {"mean": 3, "std": 1.0},
+        },
     }
-    
+
     # Initialize empty arrays for category-specific attributes
     prices = np.zeros(n_samples)
     manufacturing_costs = np.zeros(n_samples)
     shipping_weights = np.zeros(n_samples)
-    
+
     # Generate data for each category
     for category in category_params:
         mask = categories == category
         category_count = np.sum(mask)
-        
+
         prices[mask] = np.random.normal(
             category_params[category]["price"]["mean"],
             category_params[category]["price"]["std"],
-            category_count
+            category_count,
         )
-        
+
         manufacturing_costs[mask] = np.random.normal(
             category_params[category]["manufacturing_cost"]["mean"],
             category_params[category]["manufacturing_cost"]["std"],
-            category_count
+            category_count,
         )
-        
+
         shipping_weights[mask] = np.random.normal(
             category_params[category]["shipping_weight"]["mean"],
             category_params[category]["shipping_weight"]["std"],
-            category_count
+            category_count,
         )
-    
+
     # Ensure all values are positive
     prices = np.maximum(prices, 10)  # Minimum price of $10
-    manufacturing_costs = np.maximum(manufacturing_costs, 5)  # Minimum cost of $5
-    shipping_weights = np.maximum(shipping_weights, 0.1)  # Minimum weight of 0.1 kg
-    
+    manufacturing_costs = np.maximum(
+        manufacturing_costs, 5
+    )  # Minimum cost of $5
+    shipping_weights = np.maximum(
+        shipping_weights, 0.1
+    )  # Minimum weight of 0.1 kg
+
     # Generate remaining data
     data = {
         "product_id": [f"PROD-{i:04d}" for i in range(n_samples)],
@@ -77,586 +90,395 @@ def mock_data(n_samples: int = 1000) -> pd.DataFrame:
         "days_since_release": np.random.randint(1, 1000, n_samples),
         "discount_offered": np.random.choice([True, False], n_samples),
         "shipping_weight": shipping_weights,
-        "competitors_price": prices * np.random.uniform(0.8, 1.2, n_samples),  # Competitors price varies around our price
+        "competitors_price": prices
+        * np.random.uniform(
+            0.8, 1.2, n_samples
+        ),  # Competitors price varies around our price
         "manufacturing_cost": manufacturing_costs,
-        "price": prices
+        "price": prices,
     }
-    
+
     # Introduce some missing values
     for col in ["brand_rating", "num_reviews", "shipping_weight"]:
-        missing_indices = np.random.choice(range(n_samples), size=int(n_samples * 0.05), replace=False)
+        missing_indices = np.random.choice(
+            range(n_samples), size=int(n_samples * 0.05), replace=False
+        )
         data[col] = pd.Series(data[col])
         data[col].iloc[missing_indices] = None
-    
+
     df = pd.DataFrame(data)
     return df
 
-def make_category_boxplot_data(field, variable_name, data: pd.DataFrame):
-    """Generate boxplot data for a specific field by category.
-    
+
+CATEGORY_COLORS = dict(
+    zip(
+        CATEGORIES,
+        [
+            "rgba(255, 99, 132, 0.7)",
+            "rgba(54, 162, 235, 0.7)",
+            "rgba(255, 206, 86, 0.7)",
+            "rgba(75, 192, 192, 0.7)",
+            "rgba(153, 102, 255, 0.7)",
+        ],
+    )
+)
+
+# Upper bound on the number of outlier points embedded per category and field
+MAX_OUTLIERS_PER_CATEGORY = 50
+
+# Number of bins used for pre-aggregated histograms
+HISTOGRAM_BINS = 50
+
+# Point budget for the actual-vs-predicted scatter plot
+MAX_SCATTER_POINTS = 2000
+MIN_POINTS_PER_CATEGORY = 20
+
+
+def to_plotly_array(values, dtype: str = "f8", binary: bool = True):
+    """Encode a numeric series for embedding into a Plotly trace.
+
+    With `binary=True` the values are packed as a little-endian typed array
+    and base64-encoded using Plotly's `{dtype, bdata}` format, which takes
+    4/3 bytes per byte of data and is decoded without any number parsing in
+    the browser. Otherwise a plain JSON list is returned.
+
+    Args:
+        values: Any array-like of numbers.
+        dtype: Plotly typed array code (e.g. `f8`, `f4`, `i4`, `u4`).
+        binary: Whether to emit the binary encoding.
+
+    Returns:
+        A JSON-serializable object to use as a trace data array.
+    """
+    array = np.asarray(values, dtype=np.dtype(dtype).newbyteorder("<"))
+    if not binary:
+        return array.tolist()
+    return {
+        "dtype": dtype,
+        "bdata": base64.b64encode(np.ascontiguousarray(array).tobytes()).decode(
+            "ascii"
+        ),
+    }
+
+
+def compute_category_box_stats(
+    data: pd.DataFrame, fields, max_outliers: int = MAX_OUTLIERS_PER_CATEGORY
+) -> dict:
+    """Compute Tukey box statistics for several fields by category.
+
+    All quartiles and summary statistics come out of a single groupby over
+    the requested fields, so the cost is one pass regardless of the number of
+    categories. Only a capped sample of the most extreme outliers is kept,
+    which bounds the size of anything rendered from the result.
+
+    Args:
+        data: The dataframe holding a `category` column and the fields.
+        fields: The numeric columns to summarize.
+        max_outliers: Maximum number of outlier values kept per category.
+
+    Returns:
+        Mapping of field -> category -> box statistics.
+    """
+    fields = list(fields)
+    grouped = data.groupby("category", sort=False)[fields]
+    summary = grouped.agg(["mean", "min", "max", "count"])
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+
+    codes = data["category"]
+    stats = {}
+    for field in fields:
+        q1 = quartiles[(field, 0.25)]
+        q3 = quartiles[(field, 0.75)]
+        iqr = q3 - q1
+        low = codes.map(q1 - 1.5 * iqr)
+        high = codes.map(q3 + 1.5 * iqr)
+        values = data[field]
+
+        inside = values.between(low, high)
+        fences = (
+            values[inside]
+            .groupby(codes[inside], sort=False)
+            .agg(["min", "max"])
+        )
+
+        outside = values.notna() & ~inside
+        distance = (
+            values[outside] - codes[outside].map(quartiles[(field, 0.5)])
+        ).abs()
+        extreme = (
+            distance.sort_values(ascending=False)
+            .groupby(codes[outside], sort=False)
+            .head(max_outliers)
+        )
+        outliers = values[extreme.index].groupby(
+            codes[extreme.index], sort=False
+        )
+
+        stats[field] = {}
+        for category in summary.index:
+            stats[field][category] = {
+                "q1": float(q1[category]),
+                "median": float(quartiles[(field, 0.5)][category]),
+                "q3": float(q3[category]),
+                "lowerfence": float(fences["min"].get(category, q1[category])),
+                "upperfence": float(fences["max"].get(category, q3[category])),
+                "mean": float(summary[(field, "mean")][category]),
+                "min": float(summary[(field, "min")][category]),
+                "max": float(summary[(field, "max")][category]),
+                "count": int(summary[(field, "count")][category]),
+                "outliers": (
+                    [round(float(v), 4) for v in outliers.get_group(category)]
+                    if category in outliers.groups
+                    else []
+                ),
+            }
+    return stats
+
+
+def make_category_boxplot_data(field, box_stats: dict, binary: bool = True):
+    """Generate boxplot traces for a specific field by category.
+
+    The boxes are drawn from precomputed statistics (see
+    `compute_category_box_stats`), so the generated traces have a fixed size
+    per category no matter how many rows the underlying data has.
+
     Args:
         field: The dataframe column to plot
-        variable_name: The JavaScript variable name to push data to
+        box_stats: Per-category statistics for `field`
+        binary: Whether to embed the outliers as a binary typed array
     """
-    colors = {
-        "Electronics": "rgba(255, 99, 132, 0.7)",
-        "Clothing": "rgba(54, 162, 235, 0.7)",
-        "Home": "rgba(255, 206, 86, 0.7)",
-        "Books": "rgba(75, 192, 192, 0.7)",
-        "Sports": "rgba(153, 102, 255, 0.7)"
+    field_unit = (
+        "$"
+        if field in ["price", "manufacturing_cost", "competitors_price"]
+        else ""
+    )
+    traces = []
+    for category, cat_stats in box_stats.items():
+        color = CATEGORY_COLORS.get(category, "rgba(100, 100, 100, 0.7)")
+        traces.append(
+            {
+                "x": [category],
+                "q1": [cat_stats["q1"]],
+                "median": [cat_stats["median"]],
+                "q3": [cat_stats["q3"]],
+                "lowerfence": [cat_stats["lowerfence"]],
+                "upperfence": [cat_stats["upperfence"]],
+                "mean": [cat_stats["mean"]],
+                "type": "box",
+                "name": category,
+                "legendgroup": category,
+                "marker": {"color": color},
+                "hoverinfo": "all",
+                "hovertemplate": (
+                    f"<b>{category}</b><br>"
+                    f"Mean: {field_unit}{cat_stats['mean']:.2f}<br>"
+                    f"Median: {field_unit}{cat_stats['median']:.2f}<br>"
+                    f"Min: {field_unit}{cat_stats['min']:.2f}<br>"
+                    f"Max: {field_unit}{cat_stats['max']:.2f}<br>"
+                    f"Count: {cat_stats['count']}<extra></extra>"
+                ),
+            }
+        )
+        traces.append(
+            {
+                "x": [category] * len(cat_stats["outliers"]),
+                "y": to_plotly_array(cat_stats["outliers"], "f4", binary),
+                "type": "scatter",
+                "mode": "markers",
+                "name": f"{category} outliers",
+                "legendgroup": category,
+                "showlegend": False,
+                "marker": {"color": color, "size": 5},
+                "hovertemplate": f"<b>{category}</b><br>Outlier: {field_unit}%{{y:.2f}}<extra></extra>",
+            }
+        )
+    return traces
+
+
+def make_histogram_data(values: pd.Series, bins: int = HISTOGRAM_BINS):
+    """Bin a series server-side so the report only embeds bin edges and counts."""
+    counts, edges = np.histogram(values.dropna(), bins=bins)
+    return {
+        "centers": (edges[:-1] + edges[1:]) / 2,
+        "widths": np.diff(edges),
+        "counts": counts,
     }
-    
-    js_code = []
-    for category in data['category'].unique():
-        cat_data = data[data['category'] == category][field].tolist()
-        cat_stats = {
-            "mean": float(data[data['category'] == category][field].mean()),
-            "median": float(data[data['category'] == category][field].median()),
-            "min": float(data[data['category'] == category][field].min()),
-            "max": float(data[data['category'] == category][field].max()),
-            "count": len(cat_data)
-        }
-        
-        field_unit = "$" if field in ["price", "manufacturing_cost", "competitors_price"] else ""
-        
-        js_code.append(f"""
-            {variable_name}.push({{
-                y: {cat_data},
-                type: 'box',
-                name: '{category}',
-                boxpoints: 'outliers',
-                marker: {{
-                    color: '{colors.get(category, "rgba(100, 100, 100, 0.7)")}'
-                }},
-                hoverinfo: 'all',
-                hovertemplate: 
-                    '<b>{category}</b><br>' +
-                    'Mean: {field_unit}{cat_stats["mean"]:.2f}<br>' +
-                    'Median: {field_unit}{cat_stats["median"]:.2f}<br>' +
-                    'Min: {field_unit}{cat_stats["min"]:.2f}<br>' +
-                    'Max: {field_unit}{cat_stats["max"]:.2f}<br>' +
-                    'Count: {cat_stats["count"]}<extra></extra>'
-            }});
-        """)
-    return "\n".join(js_code)
+
 
 def make_profit_margin_data(data: pd.DataFrame):
-    colors = {
-        "Electronics": "rgba(255, 99, 132, 0.7)",
-        "Clothing": "rgba(54, 162, 235, 0.7)",
-        "Home": "rgba(255, 206, 86, 0.7)",
-        "Books": "rgba(75, 192, 192, 0.7)",
-        "Sports": "rgba(153, 102, 255, 0.7)"
-    }
-    
-    # Calculate profit margins for each category
-    categories = data['category'].unique()
-    margins = []
-    for category in categories:
-        cat_df = data[data['category'] == category]
-        margin = ((cat_df['price'] - cat_df['manufacturing_cost']) / cat_df['price']).mean()
-        margins.append(margin)
-    
-    return f"""
-    profitMarginData.push({{
-        x: {list(categories)},
-        y: {margins},
-        type: 'bar',
-        marker: {{
-            color: {[colors.get(cat, "rgba(100, 100, 100, 0.7)") for cat in categories]}
-        }},
-        hovertemplate: 
-            '<b>%{{x}}</b><br>' +
-            'Profit Margin: %{{y:.1%}}<extra></extra>'
-    }});
+    # Calculate profit margins for each category in one grouped reduction
+    margins = (
+        ((data["price"] - data["manufacturing_cost"]) / data["price"])
+        .groupby(data["category"], sort=False)
+        .mean()
+    )
+    categories = margins.index.tolist()
+
+    return [
+        {
+            "x": categories,
+            "y": margins.tolist(),
+            "type": "bar",
+            "marker": {
+                "color": [
+                    CATEGORY_COLORS.get(cat, "rgba(100, 100, 100, 0.7)")
+                    for cat in categories
+                ]
+            },
+            "hovertemplate": "<b>%{x}</b><br>Profit Margin: %{y:.1%}<extra></extra>",
+        }
+    ]
+
+
+def downsample_predictions(
+    actual,
+    predicted,
+    categories,
+    max_points: int = MAX_SCATTER_POINTS,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """Stratified downsampling of held-out predictions to a fixed point budget.
+
+    Every category keeps a share of the budget proportional to its size (and
+    at least a handful of points), so small categories stay visible while the
+    total number of points never exceeds `max_points` by more than the
+    per-category floor.
+
+    Args:
+        actual: True target values.
+        predicted: Model predictions, aligned with `actual`.
+        categories: Category label of every row, aligned with `actual`.
+        max_points: Total number of points to keep.
+        seed: Seed for the random selection within each category.
+
+    Returns:
+        Dataframe with `actual`, `predicted` and `category` columns.
     """
+    frame = pd.DataFrame(
+        {
+            "actual": np.asarray(actual, dtype=float),
+            "predicted": np.asarray(predicted, dtype=float),
+            "category": np.asarray(categories),
+        }
+    )
+    if len(frame) <= max_points:
+        return frame
+
+    counts = frame["category"].value_counts()
+    quota = np.maximum(
+        np.floor(counts * max_points / len(frame)),
+        min(MIN_POINTS_PER_CATEGORY, max_points),
+    ).astype(int)
+
+    # Rank rows within their category in a random order and keep the first
+    # `quota` of each, which is a uniform sample per category.
+    order = np.random.default_rng(seed).random(len(frame))
+    rank = (
+        pd.Series(order).groupby(frame["category"].values).rank(method="first")
+    )
+    keep = rank.values <= frame["category"].map(quota).values
+    return frame[keep].reset_index(drop=True)
+
+
+def generate_data_report(
+    cleaned_data: pd.DataFrame,
+    raw_data: pd.DataFrame,
+    analysis: dict,
+    binary_arrays: bool = True,
+) -> str:
+    """Generate HTML report focused on data analysis.
 
-def generate_data_report(cleaned_data: pd.DataFrame, raw_data: pd.DataFrame, analysis: dict) -> str:
-    """Generate HTML report focused on data analysis."""
-    # Pre-generate all the JavaScript code for the charts
-    price_boxplot_js = make_category_boxplot_data('price', 'categoryPriceData', cleaned_data)
-    cost_boxplot_js = make_category_boxplot_data('manufacturing_cost', 'categoryCostData', cleaned_data)
-    weight_boxplot_js = make_category_boxplot_data('shipping_weight', 'categoryWeightData', cleaned_data)
-    profit_margin_js = make_profit_margin_data(cleaned_data)
-    
-    # Create HTML content
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Data Analysis Report</title>
-        <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-        <style>
-            body {{ padding: 20px; }}
-            .card {{ margin-bottom: 20px; }}
-            .metric-card {{ text-align: center; padding: 15px; }}
-            .metric-value {{ font-size: 24px; font-weight: bold; }}
-            .metric-label {{ font-size: 14px; color: #666; }}
-            .chart-container {{ height: 400px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1 class="my-4">Product Data Analysis Report</h1>
-            <p class="lead">Generated on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-            
-            <div class="row mb-4">
-                <div class="col-md-3">
-                    <div class="card metric-card">
-                        <div class="metric-value">{raw_data.shape[0]}</div>
-                        <div class="metric-label">Total Products</div>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="card metric-card">
-                        <div class="metric-value">{len(raw_data['category'].unique())}</div>
-                        <div class="metric-label">Product Categories</div>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="card metric-card">
-                        <div class="metric-value">${cleaned_data['price'].mean():.2f}</div>
-                        <div class="metric-label">Avg. Price</div>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="card metric-card">
-                        <div class="metric-value">{sum(raw_data.isnull().sum())}</div>
-                        <div class="metric-label">Missing Values</div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="row">
-                <div class="col-md-12">
-                    <div class="card">
-                        <div class="card-header">
-                            <h5>Price by Category</h5>
-                        </div>
-                        <div class="card-body">
-                            <div id="category-price-chart" class="chart-container"></div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="row">
-                <div class="col-md-12">
-                    <div class="card">
-                        <div class="card-header">
-                            <h5>Manufacturing Cost by Category</h5>
-                        </div>
-                        <div class="card-body">
-                            <div id="category-cost-chart" class="chart-container"></div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="row">
-                <div class="col-md-12">
-                    <div class="card">
-                        <div class="card-header">
-                            <h5>Shipping Weight by Category</h5>
-                        </div>
-                        <div class="card-body">
-                            <div id="category-weight-chart" class="chart-container"></div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="row">
-                <div class="col-md-12">
-                    <div class="card">
-                        <div class="card-header">
-                            <h5>Profit Margin by Category</h5>
-                        </div>
-                        <div class="card-body">
-                            <div id="profit-margin-chart" class="chart-container"></div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="row">
-                <div class="col-md-12">
-                    <div class="card">
-                        <div class="card-header">
-                            <h5>Price Distribution</h5>
-                        </div>
-                        <div class="card-body">
-                            <div id="price-dist-chart"></div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-        
-        <script>
-            // Price Distribution Chart
-            var priceData = {cleaned_data["price"].tolist()};
-            var priceLayout = {{
-                height: 400,
-                margin: {{ t: 10 }},
-                xaxis: {{ title: "Price ($)" }}
-            }};
-            Plotly.newPlot('price-dist-chart', [{{
-                x: priceData,
-                type: 'histogram',
-                marker: {{
-                    color: 'rgba(75, 192, 192, 0.7)',
-                    line: {{
-                        color: 'rgba(75, 192, 192, 1.0)',
-                        width: 1
-                    }}
-                }},
-                hovertemplate: 'Price: $%{{x}}<br>Count: %{{y}}<extra></extra>'
-            }}], priceLayout);
-            
-            // Category-specific price boxplots
-            var categoryPriceData = [];
-            {price_boxplot_js}
-            
-            var categoryPriceLayout = {{
-                height: 400,
-                margin: {{ t: 10 }},
-                xaxis: {{ title: "Category" }},
-                yaxis: {{ title: "Price ($)" }}
-            }};
-            
-            Plotly.newPlot('category-price-chart', categoryPriceData, categoryPriceLayout);
-            
-            // Category-specific cost boxplots
-            var categoryCostData = [];
-            {cost_boxplot_js}
-            
-            var categoryCostLayout = {{
-                height: 400,
-                margin: {{ t: 10 }},
-                xaxis: {{ title: "Category" }},
-                yaxis: {{ title: "Manufacturing Cost ($)" }}
-            }};
-            
-            Plotly.newPlot('category-cost-chart', categoryCostData, categoryCostLayout);
-            
-            // Category-specific weight boxplots
-            var categoryWeightData = [];
-            {weight_boxplot_js}
-            
-            var categoryWeightLayout = {{
-                height: 400, 
-                margin: {{ t: 10 }},
-                xaxis: {{ title: "Category" }},
-                yaxis: {{ title: "Shipping Weight (kg)" }}
-            }};
-            
-            Plotly.newPlot('category-weight-chart', categoryWeightData, categoryWeightLayout);
-            
-            // Profit margin by category
-            var profitMarginData = [];
-            {profit_margin_js}
-            
-            var profitMarginLayout = {{
-                height: 400,
-                margin: {{ t: 10 }},
-                xaxis: {{ title: "Category" }},
-                yaxis: {{ 
-                    title: "Profit Margin (%)",
-                    tickformat: '.0%'
-                }}
-            }};
-            
-            Plotly.newPlot('profit-margin-chart', profitMarginData, profitMarginLayout);
-        </script>
-    </body>
-    </html>
+    Numeric series are embedded as base64 typed arrays unless
+    `binary_arrays` is disabled.
     """
-    return html_content
-
-def generate_model_report(model: dict, data: pd.DataFrame) -> str:
-    """Generate HTML report focused on model training results."""
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Model Training Report</title>
-        <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0-alpha1/dist/css/bootstrap.min.css" rel="stylesheet">
-        <style>
-            body {{ padding: 20px; }}
-            .card {{ margin-bottom: 20px; }}
-            .metric-card {{ text-align: center; padding: 15px; }}
-            .metric-value {{ font-size: 24px; font-weight: bold; }}
-            .metric-label {{ font-size: 14px; color: #666; }}
-            .chart-container {{ height: 400px; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1 class="my-4">Price Prediction Model Report</h1>
-            <p class="lead">Generated on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-            
-            <div class="row mb-4">
-                <div class="col-md-3">
-                    <div class="card metric-card">
-                        <div class="metric-value">{model["metrics"]["r2_score"]:.2f}</div>
-                        <div class="metric-label">R² Score</div>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="card metric-card">
-                        <div class="metric-value">${model["metrics"]["rmse"]:.2f}</div>
-                        <div class="metric-label">RMSE</div>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="card metric-card">
-                        <div class="metric-value">${model["metrics"]["mae"]:.2f}</div>
-                        <div class="metric-label">MAE</div>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="card metric-card">
-                        <div class="metric-value">{model["model_params"]["epochs"]}</div>
-                        <div class="metric-label">Training Epochs</div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="row">
-                <div class="col-md-6">
-                    <div class="card">
-                        <div class="card-header">
-                            <h5>Feature Importance</h5>
-                        </div>
-                        <div class="card-body">
-                            <div id="feature-importance-chart" class="chart-container"></div>
-                        </div>
-                    </div>
-                </div>
-                
-                <div class="col-md-6">
-                    <div class="card">
-                        <div class="card-header">
-                            <h5>Learning Curve</h5>
-                        </div>
-                        <div class="card-body">
-                            <div id="learning-curve-chart" class="chart-container"></div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="row">
-                <div class="col-md-12">
-                    <div class="card">
-                        <div class="card-header">
-                            <h5>Actual vs Predicted Prices</h5>
-                        </div>
-                        <div class="card-body">
-                            <div id="prediction-scatter" class="chart-container"></div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="row">
-                <div class="col-md-12">
-                    <div class="card">
-                        <div class="card-header">
-                            <h5>Model Performance by Category</h5>
-                        </div>
-                        <div class="card-body">
-                            <div id="category-performance" class="chart-container"></div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-        
-        <script>
-            // Feature Importance Chart
-            var featureNames = Object.keys({model["feature_importance"]});
-            var importanceValues = Object.values({model["feature_importance"]});
-            
-            var featureImportanceLayout = {{
-                height: 400,
-                margin: {{ t: 10, l: 150 }},
-                xaxis: {{ title: "Importance" }}
-            }};
-            
-            Plotly.newPlot('feature-importance-chart', [{{
-                x: importanceValues,
-                y: featureNames,
-                type: 'bar',
-                orientation: 'h',
-                marker: {{
-                    color: 'rgba(153, 102, 255, 0.7)',
-                    line: {{
-                        color: 'rgba(153, 102, 255, 1.0)',
-                        width: 1
-                    }}
-                }},
-                hovertemplate: '<b>%{{y}}</b><br>Importance: %{{x:.2f}}<extra></extra>'
-            }}], featureImportanceLayout);
-            
-            // Learning Curve Chart
-            var learningCurveLayout = {{
-                height: 400,
-                margin: {{ t: 10 }},
-                xaxis: {{ title: "Epochs" }},
-                yaxis: {{ title: "Loss" }}
-            }};
-            
-            Plotly.newPlot('learning-curve-chart', [
-                {{
-                    x: {model["learning_curve"]["epochs"]},
-                    y: {model["learning_curve"]["train_loss"]},
-                    type: 'scatter',
-                    mode: 'lines+markers',
-                    name: 'Training Loss',
-                    line: {{ color: 'rgba(255, 99, 132, 1)' }},
-                    hovertemplate: 'Epoch: %{{x}}<br>Training Loss: %{{y:.2f}}<extra></extra>'
-                }},
-                {{
-                    x: {model["learning_curve"]["epochs"]},
-                    y: {model["learning_curve"]["val_loss"]},
-                    type: 'scatter',
-                    mode: 'lines+markers',
-                    name: 'Validation Loss',
-                    line: {{ color: 'rgba(54, 162, 235, 1)' }},
-                    hovertemplate: 'Epoch: %{{x}}<br>Validation Loss: %{{y:.2f}}<extra></extra>'
-                }}
-            ], learningCurveLayout);
-            
-            // Generate simulated predictions for the scatter plot
-            function simulatePredictions(actual, error) {{
-                return actual.map(value => value * (1 + (Math.random() * 2 - 1) * error));
-            }}
-            
-            var actualPrices = {data["price"].tolist()};
-            var predictedPrices = simulatePredictions(actualPrices, {0.2 - (model["metrics"]["r2_score"] * 0.15)});
-            var categories = {data["category"].tolist()};
-            var uniqueCategories = {list(data["category"].unique())};
-            
-            // Define colors for each category
-            var categoryColors = {{
-                "Electronics": "rgba(255, 99, 132, 0.7)",
-                "Clothing": "rgba(54, 162, 235, 0.7)",
-                "Home": "rgba(255, 206, 86, 0.7)",
-                "Books": "rgba(75, 192, 192, 0.7)",
-                "Sports": "rgba(153, 102, 255, 0.7)"
-            }};
-            
-            // Create traces for each category
-            var scatterTraces = [];
-            
-            uniqueCategories.forEach(category => {{
-                var categoryIndices = [];
-                for (var i = 0; i < categories.length; i++) {{
-                    if (categories[i] === category) {{
-                        categoryIndices.push(i);
-                    }}
-                }}
-                
-                var categoryActualPrices = categoryIndices.map(i => actualPrices[i]);
-                var categoryPredictedPrices = categoryIndices.map(i => predictedPrices[i]);
-                
-                scatterTraces.push({{
-                    x: categoryActualPrices,
-                    y: categoryPredictedPrices,
-                    mode: 'markers',
-                    type: 'scatter',
-                    name: category,
-                    marker: {{
-                        color: categoryColors[category] || "rgba(100, 100, 100, 0.7)",
-                        size: 8,
-                        line: {{
-                            color: categoryColors[category]?.replace('0.7', '1.0') || "rgba(100, 100, 100, 1.0)",
-                            width: 1
-                        }}
-                    }},
-                    hovertemplate: '<b>' + category + '</b><br>Actual: $%{{x:.2f}}<br>Predicted: $%{{y:.2f}}<extra></extra>'
-                }});
-            }});
-            
-            // Add the perfect prediction line
-            scatterTraces.push({{
-                x: [0, {data["price"].max() * 1.1}],
-                y: [0, {data["price"].max() * 1.1}],
-                mode: 'lines',
-                type: 'scatter',
-                name: 'Perfect Prediction',
-                line: {{
-                    color: 'rgba(0, 0, 0, 0.5)',
-                    dash: 'dash'
-                }}
-            }});
-            
-            var scatterLayout = {{
-                height: 500,
-                margin: {{ t: 10 }},
-                xaxis: {{ title: "Actual Price ($)" }},
-                yaxis: {{ title: "Predicted Price ($)" }},
-                legend: {{ 
-                    orientation: 'h',
-                    yanchor: 'bottom',
-                    y: 1.02,
-                    xanchor: 'right',
-                    x: 1
-                }}
-            }};
-            
-            Plotly.newPlot('prediction-scatter', scatterTraces, scatterLayout);
-            
-            // Performance by Category
-            var categoryPerformance = [];
-            
-            // Simulate RMSE for each category based on overall RMSE
-            var baseRMSE = {model["metrics"]["rmse"]};
-            
-            uniqueCategories.forEach(category => {{
-                // Simulate slightly different performance per category
-                var categoryRMSE = baseRMSE * (0.8 + Math.random() * 0.4);
-                categoryPerformance.push(categoryRMSE);
-            }});
-            
-            var categoryPerformanceLayout = {{
-                height: 400,
-                margin: {{ t: 10 }},
-                xaxis: {{ title: "Category" }},
-                yaxis: {{ title: "RMSE ($)" }}
-            }};
-            
-            Plotly.newPlot('category-performance', [{{
-                x: uniqueCategories,
-                y: categoryPerformance,
-                type: 'bar',
-                marker: {{
-                    color: [
-                        'rgba(255, 99, 132, 0.7)',
-                        'rgba(54, 162, 235, 0.7)',
-                        'rgba(255, 206, 86, 0.7)',
-                        'rgba(75, 192, 192, 0.7)',
-                        'rgba(153, 102, 255, 0.7)'
-                    ],
-                    line: {{
-                        color: [
-                            'rgba(255, 99, 132, 1.0)',
-                            'rgba(54, 162, 235, 1.0)',
-                            'rgba(255, 206, 86, 1.0)',
-                            'rgba(75, 192, 192, 1.0)',
-                            'rgba(153, 102, 255, 1.0)'
-                        ],
-                        width: 1
-                    }}
-                }},
-                hovertemplate: '<b>%{{x}}</b><br>RMSE: $%{{y:.2f}}<extra></extra>'
-            }}], categoryPerformanceLayout);
-        </script>
-    </body>
-    </html>
+    # Pre-compute all chart data, the page itself comes from a template
+    box_stats = compute_category_box_stats(
+        cleaned_data, ["price", "manufacturing_cost", "shipping_weight"]
+    )
+    price_histogram = make_histogram_data(cleaned_data["price"])
+
+    return render_report(
+        "data_report.html",
+        generated_at=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        total_products=raw_data.shape[0],
+        n_categories=raw_data["category"].nunique(),
+        avg_price=f"{cleaned_data['price'].mean():.2f}",
+        missing_values=int(raw_data.isnull().sum().sum()),
+        histogram_x=json.dumps(
+            to_plotly_array(price_histogram["centers"], "f8", binary_arrays)
+        ),
+        histogram_y=json.dumps(
+            to_plotly_array(price_histogram["counts"], "i4", binary_arrays)
+        ),
+        histogram_width=json.dumps(
+            to_plotly_array(price_histogram["widths"], "f8", binary_arrays)
+        ),
+        price_box_traces=json.dumps(
+            make_category_boxplot_data(
+                "price", box_stats["price"], binary_arrays
+            )
+        ),
+        cost_box_traces=json.dumps(
+            make_category_boxplot_data(
+                "manufacturing_cost",
+                box_stats["manufacturing_cost"],
+                binary_arrays,
+            )
+        ),
+        weight_box_traces=json.dumps(
+            make_category_boxplot_data(
+                "shipping_weight", box_stats["shipping_weight"], binary_arrays
+            )
+        ),
+        profit_margin_traces=json.dumps(make_profit_margin_data(cleaned_data)),
+    )
+
+
+def generate_model_report(
+    model: dict, predictions: pd.DataFrame, binary_arrays: bool = True
+) -> str:
+    """Generate HTML report focused on model training results.
+
+    The report is a pure function of its inputs (no timestamps), so it can be
+    cached together with the model.
+
+    Args:
+        model: Metrics, feature importance and learning curve of the model,
+            and the fingerprint of the training data.
+        predictions: Held-out `actual`/`predicted` prices with their
+            `category`, already downsampled (see `downsample_predictions`).
+        binary_arrays: Whether to embed numeric series as base64 typed arrays.
     """
-    return html_content
\ No newline at end of file
+    scatter_points = {
+        category: {
+            "actual": to_plotly_array(group["actual"], "f4", binary_arrays),
+            "predicted": to_plotly_array(
+                group["predicted"], "f4", binary_arrays
+            ),
+        }
+        for category, group in predictions.groupby("category", sort=False)
+    }
+    curve = model["learning_curve"]
+
+    return render_report(
+        "model_report.html",
+        data_fingerprint=model.get("data_fingerprint", "n/a")[:12],
+        r2_score=f"{model['metrics']['r2_score']:.2f}",
+        rmse=f"{model['metrics']['rmse']:.2f}",
+        mae=f"{model['metrics']['mae']:.2f}",
+        epochs=model["model_params"]["epochs"],
+        feature_importance=json.dumps(model["feature_importance"]),
+        curve_x=json.dumps(
+            to_plotly_array(curve["train_rows"], "f8", binary_arrays)
+        ),
+        train_loss=json.dumps(
+            to_plotly_array(curve["train_loss"], "f8", binary_arrays)
+        ),
+        val_loss=json.dumps(
+            to_plotly_array(curve["val_loss"], "f8", binary_arrays)
+        ),
+        categories=json.dumps(list(scatter_points)),
+        scatter_points=json.dumps(scatter_points),
+        axis_max=round(float(model["prediction_range"]) * 1.1, 2),
+        segment_metrics=json.dumps(model.get("segment_metrics", {})),
+    )
@@ -0,0 +1,208 @@
+"""
+Vectorized schema validation of DataFrames.
+
+A schema is a list of `ColumnRule`s. It is compiled once into arrays of
+bounds and null budgets, so a chunk of rows is checked with a handful of
+array operations: all numeric columns are checked together on one 2D array,
+and every categorical column with one hash lookup. Large frames are checked
+chunk by chunk, which bounds the temporary memory, and the violation counts
+are added up:
+
+    schema = CompiledSchema([
+        ColumnRule("price", "numeric", min=0),
+        ColumnRule("category", "category", allowed=("Books", "Home")),
+    ])
+    report = schema.validate(data)
+    if report["violations"]:
+        ...
+
+Checks per column: its dtype (`kind`), missing values against the null
+budget, values outside `[min, max]` and categories outside `allowed`.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas.api import types
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+KIND_CHECKS = {
+    "numeric": lambda dtype: types.is_numeric_dtype(dtype)
+    and not types.is_bool_dtype(dtype),
+    "bool": types.is_bool_dtype,
+    "category": lambda dtype: types.is_object_dtype(dtype)
+    or types.is_string_dtype(dtype)
+    or isinstance(dtype, pd.CategoricalDtype),
+    "string": lambda dtype: types.is_object_dtype(dtype)
+    or types.is_string_dtype(dtype),
+}
+
+
+class ColumnRule(NamedTuple):
+    """Expectations on one column."""
+
+    name: str
+    kind: str
+    min: Optional[float] = None
+    max: Optional[float] = None
+    allowed: Optional[Sequence[Any]] = None
+    max_null_fraction: float = 0.0
+
+
+class CompiledSchema:
+    """A schema compiled into arrays for chunked, vectorized checks."""
+
+    def __init__(self, rules: List[ColumnRule]) -> None:
+        """
+        Compile the rules of a schema.
+
+        Args:
+            rules: One rule per expected column.
+        """
+        for rule in rules:
+            if rule.kind not in KIND_CHECKS:
+                raise ValueError(
+                    f"Unknown kind `{rule.kind}` of column `{rule.name}`, "
+                    f"expected one of {', '.join(KIND_CHECKS)}."
+                )
+        self.rules = {rule.name: rule for rule in rules}
+
+        numeric = [rule for rule in rules if rule.kind == "numeric"]
+        self.numeric_columns = [rule.name for rule in numeric]
+        # Missing bounds never reject a value
+        self.numeric_min = np.array(
+            [-np.inf if rule.min is None else rule.min for rule in numeric]
+        )
+        self.numeric_max = np.array(
+            [np.inf if rule.max is None else rule.max for rule in numeric]
+        )
+        self.allowed = {
+            rule.name: pd.Index(rule.allowed)
+            for rule in rules
+            if rule.allowed is not None
+        }
+        self.other_columns = [
+            rule.name for rule in rules if rule.kind != "numeric"
+        ]
+
+    def check_chunk(self, chunk: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Count the violations in a chunk of rows.
+
+        Args:
+            chunk: The rows, with all columns of the schema.
+
+        Returns:
+            The missing, out of range and unknown values per column, in the
+            order of the numeric columns followed by the other columns.
+        """
+        values = chunk[self.numeric_columns].to_numpy(dtype=float)
+        # NaN compares False, so missing values are only counted as missing
+        numeric_nulls = np.isnan(values).sum(axis=0)
+        out_of_range = (values < self.numeric_min).sum(axis=0) + (
+            values > self.numeric_max
+        ).sum(axis=0)
+
+        other_nulls, unknown = [], []
+        for name in self.other_columns:
+            column = chunk[name]
+            missing = column.isna()
+            other_nulls.append(int(missing.sum()))
+            if name in self.allowed:
+                unknown.append(
+                    int((~(column.isin(self.allowed[name]) | missing)).sum())
+                )
+            else:
+                unknown.append(0)
+
+        return {
+            "nulls": np.concatenate([numeric_nulls, other_nulls]),
+            "out_of_range": np.concatenate(
+                [out_of_range, np.zeros(len(self.other_columns), dtype=int)]
+            ),
+            "unknown": np.concatenate(
+                [np.zeros(len(self.numeric_columns), dtype=int), unknown]
+            ),
+        }
+
+    def validate(
+        self, data: pd.DataFrame, chunk_rows: int = DEFAULT_CHUNK_ROWS
+    ) -> Dict[str, Any]:
+        """
+        Validate a DataFrame chunk by chunk.
+
+        Args:
+            data: The data.
+            chunk_rows: Number of rows checked at once.
+
+        Returns:
+            The number of rows and chunks, the violation counts per column
+            (columns without violations are left out) and a description of
+            every violation.
+        """
+        violations = []
+        missing_columns = [name for name in self.rules if name not in data]
+        for name in missing_columns:
+            violations.append(f"Column `{name}` is missing.")
+        for name, rule in self.rules.items():
+            if name in data and not KIND_CHECKS[rule.kind](data[name].dtype):
+                violations.append(
+                    f"Column `{name}` has dtype {data[name].dtype}, expected "
+                    f"{rule.kind}."
+                )
+        if violations:
+            return {
+                "rows": len(data),
+                "chunks": 0,
+                "counts": {},
+                "violations": violations,
+            }
+
+        columns = self.numeric_columns + self.other_columns
+        totals = {
+            check: np.zeros(len(columns), dtype=np.int64)
+            for check in ("nulls", "out_of_range", "unknown")
+        }
+        chunks = 0
+        for start in range(0, len(data), chunk_rows):
+            counts = self.check_chunk(data.iloc[start : start + chunk_rows])
+            for check, values in counts.items():
+                totals[check] += values
+            chunks += 1
+
+        counts = {}
+        for index, name in enumerate(columns):
+            rule = self.rules[name]
+            column_counts = {
+                check: int(values[index])
+                for check, values in totals.items()
+                if values[index]
+            }
+            if column_counts:
+                counts[name] = column_counts
+
+            nulls = int(totals["nulls"][index])
+            if nulls > rule.max_null_fraction * len(data):
+                violations.append(
+                    f"Column `{name}` has {nulls} missing values, the budget "
+                    f"is {rule.max_null_fraction:.1%} of the rows."
+                )
+            if totals["out_of_range"][index]:
+                violations.append(
+                    f"Column `{name}` has {totals['out_of_range'][index]} "
+                    f"values outside [{rule.min}, {rule.max}]."
+                )
+            if totals["unknown"][index]:
+                violations.append(
+                    f"Column `{name}` has {totals['unknown'][index]} values "
+                    f"outside {list(rule.allowed)}."
+                )
+
+        return {
+            "rows": len(data),
+            "chunks": chunks,
+            "counts": counts,
+            "violations": violations,
+        }